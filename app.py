@@ -13,58 +13,63 @@ from typing import Optional, Dict, Any, List
 import time
 import random
 import json
-import uuid
 import re
 import requests
 import threading
 from streamlit.runtime.scriptrunner import add_script_run_ctx
-import uuid
 # Import module
 from config import Config, ModelRouter
 from character import CharacterSheet, roll_dice, update_stats
-from ui_components import inject_css, render_header, render_sidebar, display_story
-from llm_handler import fix_romanian_grammar, generate_narrative_with_progress
-from models import GameState, CharacterStats, InventoryItem, ItemType, NarrativeResponse
+from ui_components import inject_css, render_header, render_sidebar, display_story, render_narration
+from llm_handler import generate_narrative_with_progress
+from session_store import new_session_id
+from turn_journal import journal_append, open_journal, persist_snapshot, restore_session
+from engine import new_game_state, run_turn
+from state_cell import GameStateCell
+from image_scheduler import get_image_scheduler
+from session_memory import evict_session, format_footprint, get_session_registry, session_footprint
+from workers import get_worker_pool
+from prewarm import start_prewarm
+from narration import Narration, get_narrator
+
+get_worker_pool().warm_up()  # procesele pornesc o singură dată, nu la primul export al unui jucător
 # =========================
 # — Session State Initialization
 # =========================
 def init_session():
     """Initialize all session state variables with Pydantic models"""
     if "session_id" not in st.session_state:
-        st.session_state.session_id = str(uuid.uuid4())[:8]  # ⭕ GENEREAZĂ ID UNIC
+        # ⭕ ID-ul vine din URL (?sid=...) ca orice proces din spatele load balancer-ului să reia sesiunea
+        sid = st.query_params.get("sid", "")
+        if not (sid.isalnum() and len(sid) <= 64):
+            sid = new_session_id()  # ⭕ GENEREAZĂ ID UNIC
+        st.session_state.session_id = sid
+        st.query_params["sid"] = sid
+    registry = get_session_registry()
+    registry.start()
+    if "game_state" not in st.session_state:
+        # ⭕ Procesul ăsta nu are sesiunea în memorie (alt proces, sau evacuată cât a stat inactivă): o reîncărcăm din store
+        restored = restore_session(st.session_state.session_id)
+        if restored is not None:
+            st.session_state.game_state, st.session_state.journal = restored
+            st.session_state.last_image_turn = st.session_state.game_state.last_image_turn
     if "game_state" not in st.session_state:
-        # ⭕ DEFINIM italic_flavour AICI - variabila locală necesară
-        italic_flavour = (
-            "*Personaj (TU): Ești un aventurier aflat în anul 1456. Te afli la marginea cetății Târgoviște, pe o noapte rece de toamnă. "
-            "Flăcările torțelor dansează în vânt, proiectând umbre lungi pe zidurile masive. "
-            "Porțile de stejar se ridică încet, cu un scârțâit apăsat, iar aerul miroase "
-            "a fum, fier și pământ ud. În depărtare se aud cai și voci ale străjerilor. "
-            "Fiecare decizie poate naște o legendă sau poate rămâne doar o filă de cronică...*\n\n"
-        )
         print(f"[SESSION {st.session_state.session_id}] 🎮 NEW SESSION INITIALIZED")  # ⭕ LOG
-        # Inițializăm game_state cu Pydantic
-        st.session_state.game_state = GameState(
-            character=CharacterStats(),
-            inventory=[
-                InventoryItem(name="Pumnal valah", type=ItemType.weapon, value=3, quantity=1),
-                InventoryItem(name="Hartă ruptă", type=ItemType.misc, value=0, quantity=1),
-                InventoryItem(name="5 galbeni", type=ItemType.currency, value=5, quantity=1),
-            ],
-            story=[
-                {
-                    "role": "ai", 
-                    "text": f"{Config.make_intro_text(5)}{italic_flavour}**Ce vrei să faci?**", 
-                    "turn": 0, 
-                    "image": None
-                }
-            ],
-            turn=0,
-            last_image_turn=-10
-        )
+        # Inițializăm game_state cu Pydantic (intro + inventarul de start, vezi engine.new_game_state)
+        st.session_state.game_state = new_game_state(5)
+        # 💾 Snapshot inițial: de aici încolo fiecare tură adaugă o singură înregistrare în jurnal
+        st.session_state.journal = open_journal(st.session_state.session_id)
+        persist_snapshot(st.session_state.journal, st.session_state.game_state)
+    if "journal" not in st.session_state:
+        st.session_state.journal = open_journal(st.session_state.session_id)
+    if "state_cell" not in st.session_state:
+        st.session_state.state_cell = GameStateCell(st.session_state.game_state)
+    registry.touch(st.session_state.session_id, st.session_state.state_cell)
+    # ⭕ Fiecare rulare citește versiunea comisă (include imaginile atașate între timp de firul de imagini)
+    st.session_state.game_state = st.session_state.state_cell.gs
+    st.session_state.story = st.session_state.game_state.story
     
     # Restul variabilelor session_state (compatibilitate)
-    if "story" not in st.session_state:
-        st.session_state.story = st.session_state.game_state.story
     if "turn" not in st.session_state:
         st.session_state.turn = st.session_state.game_state.turn
     if "character" not in st.session_state:
@@ -134,6 +139,64 @@ def main():
     # 🔥 Procesează input-ul jucătorului (folosește legend_scale din session_state)
     handle_player_input()
 
+    # 🔊 Narațiunea ultimei replici: după formular, ca jucătorul să poată scrie cât se aude
+    play_narration()
+
+    # 🧠 Verificarea periodică a inactivității (fragment, fără rerun complet)
+    if get_session_registry().enabled:
+        idle_eviction()
+
+    # 🔥 Pagina e trimisă: dependențele grele (modelul local etc.) se încarcă acum, în fundal
+    start_prewarm()
+
+@st.fragment(run_every=Config.SESSION_SWEEP_INTERVAL)
+def idle_eviction():
+    """
+    Rulează periodic pe firul sesiunii, și cât jucătorul nu face nimic: dacă sweep-ul a marcat-o
+    inactivă, cheile grele se eliberează acum; init_session le reface din store la următoarea interacțiune.
+    """
+    sid = st.session_state.session_id
+    registry = get_session_registry()
+    if not registry.take_eviction(sid):
+        return
+    footprint = evict_session(st.session_state)
+    if footprint is not None:
+        registry.evicted(sid, footprint, session_footprint(st.session_state)["total"])
+
+def play_narration():
+    """Citește ultima replică a naratorului o singură dată per tură (inclusiv introducerea)"""
+    gs = st.session_state.game_state
+    narration = st.session_state.get("narration")
+    if not st.session_state.get("narration_enabled"):
+        if narration is not None:
+            narration.cancel()
+            st.session_state.narration = None
+        return
+    narrator = get_narrator()
+    if narrator is None:
+        return
+    if st.session_state.get("narrated_turn") != gs.turn:
+        st.session_state.narrated_turn = gs.turn
+        text = next((m["text"] for m in reversed(gs.story) if m["role"] == "ai"), "")
+        if narration is not None:
+            narration.cancel()
+        narration = st.session_state.narration = narrator.narrate(
+            text, key=f"{st.session_state.session_id}:{gs.turn}", session_id=st.session_state.session_id
+        )
+    if narration is None:
+        return
+    if narration.done:  # terminată între două reîmprospătări ale fragmentului
+        st.session_state.narration = None
+        log_narration(narration)
+        return
+    # Fără blocare: fragmentul trimite ce e gata și revine singur pentru restul, deci pagina se termină imediat
+    render_narration(on_finished=log_narration)
+
+def log_narration(narration: "Narration"):
+    first = f"{narration.first_at:.2f}s" if narration.first_at is not None else "-"
+    print(f"[SESSION {st.session_state.session_id}] 🔊 NARRATION {narration.key}: {narration.delivered} segmente, "
+          f"primul în {first}, {narration.cached} din cache, {narration.failed} eșuate")
+
 def start_image_worker():
     """Pornește thread-ul de imagine dacă e necesar"""
     if st.session_state.image_queue and not st.session_state.get("image_worker_active"):
@@ -145,22 +208,39 @@ def start_image_worker():
 def background_image_gen():
     """Generează imagine și o atașează - FĂRĂ st.rerun()"""
     from image_handler import generate_scene_image
+    scheduler = get_image_scheduler()
+    job, seconds = None, None
     try:
-        text, turn = st.session_state.image_queue.pop(0)
-        location = st.session_state.character.get("location", "Târgoviște")
-        img_bytes = generate_scene_image(text, is_initial=False)
-        
-        if img_bytes:
-            # Căutăm de la sfârșit spre început (ultimul mesaj AI)
-            for i in range(len(st.session_state.story) - 1, -1, -1):
-                msg = st.session_state.story[i]
-                if msg.get("turn") == turn and msg["role"] == "ai":
-                    st.session_state.story[i]["image"] = img_bytes
-                    print(f"✅ Imagine atașată la turul {turn}")
-                    break
+        cell = st.session_state.state_cell
+        # Doar jobul cel mai relevant: cele rămase în urmă se aruncă, restul se comasează
+        job = scheduler.take(st.session_state.session_id, st.session_state.image_queue, cell.gs.turn)
+        if job is None:
+            return
+        text, turn, _ = job
+        final = {}
+        # Schița se atașează imediat (fără jurnal); imaginea finală o înlocuiește mai jos
+        img_bytes = generate_scene_image(
+            text, cell.gs.character.location, is_initial=False,
+            on_draft=lambda draft: cell.attach_image(turn, draft),
+            on_final=lambda s: final.update(seconds=s),
+        )
+        # Cadența se adaptează doar după randarea finală HF (fără hit-uri din cache și fără schiță)
+        seconds = final.get("seconds")
+
+        # Atașare pe versiunea comisă curentă (copy-on-write), nu pe story-ul citit la început
+        if img_bytes and cell.attach_image(turn, img_bytes):
+            print(f"✅ Imagine atașată la turul {turn} (versiunea {cell.version})")
+            journal = st.session_state.get("journal")
+            if journal is not None:
+                try:
+                    journal.attach_image(turn, img_bytes)  # 💾 blob + referință în jurnal
+                except Exception as e:
+                    print(f"⚠️ JOURNAL IMAGE FAILED: {e}")
     except Exception as e:
         print(f"❌ BG image error: {e}")
     finally:
+        if job is not None:
+            scheduler.finished(seconds)
         st.session_state.image_worker_active = False
         # 🔧 FĂRĂ st.rerun() aici! Streamlit va detecta automat modificarea
 
@@ -168,8 +248,6 @@ def background_image_gen():
 
 def handle_player_input():
     """Procesează acțiunile jucătorului și APPEND sugestii la textul narativ"""
-    from models import InventoryItem, ItemType
-    
     # 🔥 GAME OVER CHECK - BLOCHEAZĂ ORICE ACȚIUNE DACĂ PLAYER-UL ESTE MORT
     if st.session_state.game_state.character.health <= 0:
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -211,107 +289,62 @@ def handle_player_input():
             print(f"[SESSION {st.session_state.session_id}] 📝 USER ACTION: {user_action}")  # ⭕ LOG USER INPUT
             st.session_state.is_generating = True
             try:
-                # Salvează acțiunea jucătorului
-                current_turn = st.session_state.game_state.turn
-                st.session_state.game_state.story.append(
-                    {"role": "user", "text": user_action, "turn": current_turn, "image": None}
-                )
-                
-                # 1. PREGĂTIREA DATELOR (Extragem datele simple din Session State)
+                # Tura rulează în engine (fără Streamlit) pe o copie; starea comisă se schimbă doar la commit
                 legend_scale = st.session_state.get("legend_scale", 5)
-                gs_data = st.session_state.game_state
-
-                # Verificăm dacă e obiect sau dict și extragem datele necesare pentru config
-                if hasattr(gs_data, 'character'):
-                    # Dacă e obiect Pydantic
-                    character_data = gs_data.character.model_dump()
-                    story_data = gs_data.story
-                else:
-                    # Dacă e deja dicționar (cum îl face uneori Streamlit)
-                    character_data = gs_data['character']
-                    story_data = gs_data['story']
-
-                # 2. CONSTRUIREA PROMPTULUI (Returnează un string)
-                # Aici se apelează funcția din config.py
-                full_prompt_text = Config.build_dnd_prompt(
-                    story=story_data, 
-                    character=character_data, 
-                    legend_scale=legend_scale
+                cell = st.session_state.state_cell
+                base_version, gs = cell.fork()
+                current_turn = gs.turn
+                gs.last_image_turn = st.session_state.last_image_turn
+                result = run_turn(
+                    gs, user_action,
+                    generate=lambda prompt, sid: generate_narrative_with_progress(prompt, session_id=sid, turn=current_turn),
+                    legend_scale=legend_scale,
+                    session_id=st.session_state.session_id,
+                    image_policy=get_image_scheduler().is_due
                 )
-                print(f"[SESSION {st.session_state.session_id}] 🤖 LLM PROMPT: {full_prompt_text}")  # ⭕ LOG PROMPT
-                # 3. GENERAREA NARAȚIUNII (Se apelează API-ul cu textul construit mai sus)
-                # Aici se apelează funcția din llm_handler.py
-                response = generate_narrative_with_progress(full_prompt_text)
-                # Corectează greșelile gramaticale
-                corrected_narrative = fix_romanian_grammar(response.narrative)
-                corrected_suggestions = [
-                    fix_romanian_grammar(s) for s in response.suggestions 
-                    if s and len(s) > 5
-                ]
-                print(f"[SESSION {st.session_state.session_id}] ✅ LLM RESPONSE: {corrected_narrative[:250]} | Suggestions: {corrected_suggestions}")  # ⭕ LOG RĂSPUNS
-                # Fallback sugestii dacă LLM nu returnează
-                if not corrected_suggestions:
-                    corrected_suggestions = [
-                        "Cauți un loc sigur pentru odihnă.",
-                        "Cerți informații de la un localnic.",
-                        "Explorezi zona cu atenție."
-                    ]
-                
-                # 🔥 🔥 🔥 APPEND SUGESTII LA NARRATIV 🔥 🔥 🔥
-                # Acesta este nucleul modificării - concatenăm sugestiile direct în text
-                narrative_with_suggestions = corrected_narrative
-                if corrected_suggestions:
-                    narrative_with_suggestions += "\n\n**Sugestii:**"
-                    narrative_with_suggestions += "\n".join([f"• {s}" for s in corrected_suggestions])
-                
-                # Update game state din response
-                gs = st.session_state.game_state
-                gs.character.health = max(0, min(100, gs.character.health + (response.health_change or 0)))
-                gs.character.reputation = max(0, min(100, gs.character.reputation + (response.reputation_change or 0)))
-                gs.character.gold = max(0, gs.character.gold + (response.gold_change or 0))
+                response = result.response
+                narrative_with_suggestions = result.text
+                commit = cell.commit(result.record, base_version, prepared=gs)
+                if not commit.applied:
+                    # Dublu-click / rerun: tura asta e deja comisă de cealaltă rulare
+                    print(f"[SESSION {st.session_state.session_id}] 🔁 TURN {current_turn} ALREADY COMMITTED - ignorat")
+                    st.rerun()
+                if commit.rebased:
+                    print(f"[SESSION {st.session_state.session_id}] 🔀 TURN {current_turn} REBASED on version {commit.version - 1}")
+                gs = st.session_state.game_state = commit.gs
+                st.session_state.story = gs.story
+                print(f"[SESSION {st.session_state.session_id}] 🤖 LLM PROMPT: {result.prompt}")  # ⭕ LOG PROMPT
+                ps = result.prompt_stats
+                print(f"[SESSION {st.session_state.session_id}] 🔢 PROMPT SIZE: {ps.get('prompt_tokens')} tokeni "
+                      f"(context {ps.get('context_tokens')}, {ps.get('messages')} replici, {ps.get('dropped')} omise)")
+                footprint = session_footprint(st.session_state)
+                get_session_registry().record_footprint(st.session_state.session_id, footprint)
+                print(f"[SESSION {st.session_state.session_id}] 🧠 SESSION MEMORY: {format_footprint(footprint)}")
+                print(f"[SESSION {st.session_state.session_id}] ✅ LLM RESPONSE: {result.narrative[:250]} | Suggestions: {response.suggestions}")  # ⭕ LOG RĂSPUNS
                 
-                # Update inventory
-                for item in response.items_gained:
-                    existing = next((i for i in gs.inventory if i.name == item.name), None)
-                    if existing:
-                        existing.quantity += item.quantity
-                    else:
-                        gs.inventory.append(item)
-                gs.inventory = [i for i in gs.inventory if i.name not in response.items_lost]
+                # Coadă imagine
+                if result.image_due:
+                    get_image_scheduler().enqueue(
+                        st.session_state.session_id, st.session_state.image_queue,
+                        (result.narrative, current_turn, bool(response.location_change))
+                    )
+                    st.session_state.last_image_turn = current_turn
                 
-                # Update locație
                 if response.location_change:
-                    gs.character.location = response.location_change
                     st.toast(f"📍 Locație nouă: {response.location_change}", icon="🗺️")
                 
-                # Adaugă efecte de status
-                if response.status_effects:
-                    gs.character.status_effects.extend(response.status_effects)
-                
-                # 🔥 ADĂUGĂ TEXTUL COMBINAT (NARRATIV + SUGESTII) LA STORY
-                st.session_state.game_state.story.append({
-                    "role": "ai",
-                    "text": narrative_with_suggestions,  # AICI este textul final cu sugestii incluse
-                    "turn": current_turn,
-                    "image": None
-                })
-                
                 # 🔥 DEBUG CONSOLĂ - Șterge sau comentează după testare
                 print(f"\n{'='*60}")
                 print(f"📤 NARRATIV FINAL (cu sugestii):")
                 print(narrative_with_suggestions)
                 print(f"{'='*60}\n")
                 
-                # Coadă imagine
-                if (current_turn - st.session_state.last_image_turn) >= Config.IMAGE_INTERVAL:
-                    st.session_state.image_queue.append((corrected_narrative, current_turn))
-                    st.session_state.last_image_turn = current_turn
-                
-                # Increment turn și verifică game over
-                gs.turn += 1
-                if response.game_over or gs.character.health <= 0:
+                # Verifică game over (turn-ul a fost incrementat de apply_record)
+                if result.game_over:
                     st.error("💀 **Aventura s-a încheiat.**")
                     st.session_state.is_game_over = True
+                # 💾 O singură înregistrare în jurnal, indiferent de lungimea aventurii
+                journal_append(st.session_state.journal, result.record, gs)
                 print(f"[SESSION {st.session_state.session_id}] 🔄 STORY UPDATED - TURN {gs.turn}")  # ⭕ LOG STORY UPDATE
                 # Rerun pentru a afișa noul conținut
                 st.rerun()
@@ -331,9 +364,11 @@ def handle_player_input():
             time.sleep(0.5)
 
         elif heal_clicked:
-            gs = st.session_state.game_state
             heal = roll_dice(8) + 5
-            gs.character.health = min(100, gs.character.health + heal)
+            heal_record = {"k": "heal", "v": heal}
+            gs = st.session_state.game_state = st.session_state.state_cell.commit(heal_record).gs
+            st.session_state.story = gs.story
+            journal_append(st.session_state.journal, heal_record, gs)
             st.toast(f"❤️ Te-ai vindecat cu {heal} puncte!", icon="✨")
             time.sleep(0.5)
 
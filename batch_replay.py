@@ -0,0 +1,187 @@
+# batch_replay.py - Rulează în paralel mii de secvențe de acțiuni prin engine.run_turn (fără Streamlit)
+#
+#   python batch_replay.py --synthetic 2000 --turns 20 --generator stub --workers 16
+#   python batch_replay.py --scripts scenarii.jsonl --generator local --workers 8 --out rezultate.jsonl
+#
+# Fișierul de scenarii are câte un obiect JSON pe linie: {"id": "...", "actions": ["...", ...]}
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List
+
+os.environ.setdefault("LOCAL_WARM_START", "0")  # backend-ul local pornește doar dacă e folosit
+
+from engine import GENERATORS, run_script
+
+SYNTHETIC_ACTIONS = [
+    "Mă apropii de poartă și vorbesc cu străjerul.",
+    "Intru în han și cer o cană de vin.",
+    "Ajut un țăran să-și scoată căruța din noroi.",
+    "Cercetez urmele de copite de pe drum.",
+    "Cer audiență la căpitanul gărzii.",
+    "Mă ascund în umbra zidului și ascult.",
+    "Cumpăr merinde de la negustor.",
+    "Pornesc spre mănăstirea din codru.",
+    "Îl amenință pe hoțul prins la piață.",
+    "Mă odihnesc lângă foc până în zori.",
+]
+
+
+def synthetic_scripts(count: int, turns: int, seed: int) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {"id": f"syn-{i}", "actions": [rng.choice(SYNTHETIC_ACTIONS) for _ in range(turns)]}
+
+
+def load_scripts(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if isinstance(data, list):
+                data = {"id": f"script-{n}", "actions": data}
+            yield data
+
+
+def play(script: Dict, generator: str, generator_kwargs: Dict, legend_scale: int) -> Dict:
+    """Un scenariu complet; rezultatul e un dict simplu (trece și între procese)"""
+    generate = _generator(generator, generator_kwargs)
+    t0 = time.perf_counter()
+    try:
+        out = run_script(script["actions"], generate, legend_scale=legend_scale, session_id=script["id"])
+    except Exception as e:
+        return {"id": script["id"], "error": str(e), "seconds": time.perf_counter() - t0}
+    gs = out["game_state"]
+    narratives = [m["text"].split("\n\n**Sugestii:**")[0] for m in gs.story[1:] if m["role"] == "ai"]
+    return {
+        "id": script["id"],
+        "turns": len(out["latencies"]),
+        "game_over": out["game_over"],
+        "seconds": time.perf_counter() - t0,
+        "latencies": out["latencies"],
+        "prompt_tokens": out["prompt_tokens"],
+        "health": gs.character.health,
+        "reputation": gs.character.reputation,
+        "gold": gs.character.gold,
+        "location": gs.character.location,
+        "inventory": len(gs.inventory),
+        "avg_narrative_len": statistics.mean(len(n) for n in narratives) if narratives else 0,
+        # cât de des se repetă narațiunea între ture consecutive (semnal de calitate)
+        "repeats": sum(1 for a, b in zip(narratives, narratives[1:]) if a == b),
+    }
+
+
+_generators: Dict[str, object] = {}
+
+def _generator(name: str, kwargs: Dict):
+    """Un generator per proces (modelul local se încarcă o singură dată)"""
+    key = f"{name}:{json.dumps(kwargs, sort_keys=True)}"
+    if key not in _generators:
+        _generators[key] = GENERATORS[name](**kwargs)
+    return _generators[key]
+
+
+def _play_chunk(scripts: List[Dict], generator: str, generator_kwargs: Dict, legend_scale: int,
+                threads: int) -> List[Dict]:
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda s: play(s, generator, generator_kwargs, legend_scale), scripts))
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_batch(scripts: List[Dict], generator: str = "stub", generator_kwargs: Dict = None,
+              workers: int = 8, processes: int = 0, legend_scale: int = 5) -> List[Dict]:
+    """
+    Fire de execuție într-un singur proces (implicit: generarea e I/O sau eliberează GIL-ul,
+    iar modelul local grupează cererile concurente în micro-batch-uri), sau `processes`
+    procese cu câte `workers` fire fiecare, pentru generatoare legate de CPU în Python.
+    """
+    generator_kwargs = generator_kwargs or {}
+    if processes <= 1:
+        return _play_chunk(scripts, generator, generator_kwargs, legend_scale, workers)
+    chunks = [scripts[i::processes] for i in range(processes)]
+    results: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_play_chunk, chunk, generator, generator_kwargs, legend_scale, workers)
+            for chunk in chunks if chunk
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def summarize(results: List[Dict], wall: float) -> Dict:
+    ok = [r for r in results if "error" not in r]
+    latencies = [lat for r in ok for lat in r["latencies"]]
+    turns = sum(r["turns"] for r in ok)
+    prompt_tokens = [n for r in ok for n in r["prompt_tokens"]]
+    return {
+        "scripts": len(results),
+        "errors": len(results) - len(ok),
+        "turns": turns,
+        "wall_seconds": wall,
+        "turns_per_sec": turns / wall if wall else 0.0,
+        "turn_p50_ms": percentile(latencies, 0.50) * 1000,
+        "turn_p95_ms": percentile(latencies, 0.95) * 1000,
+        "turn_p99_ms": percentile(latencies, 0.99) * 1000,
+        "prompt_tokens_avg": statistics.mean(prompt_tokens) if prompt_tokens else 0.0,
+        "prompt_tokens_p95": float(percentile(prompt_tokens, 0.95)),
+        "prompt_tokens_max": max(prompt_tokens, default=0),
+        "game_over_rate": sum(r["game_over"] for r in ok) / len(ok) if ok else 0.0,
+        "avg_narrative_len": statistics.mean(r["avg_narrative_len"] for r in ok) if ok else 0.0,
+        "repeat_rate": sum(r["repeats"] for r in ok) / turns if turns else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay în lot al aventurilor, fără Streamlit")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--scripts", help="fișier JSONL cu scenarii")
+    src.add_argument("--synthetic", type=int, help="numărul de scenarii generate aleator")
+    ap.add_argument("--turns", type=int, default=20, help="ture per scenariu sintetic")
+    ap.add_argument("--generator", choices=sorted(GENERATORS), default="stub")
+    ap.add_argument("--latency", type=float, default=0.0, help="latență simulată a generatorului stub (s)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=8, help="fire de execuție (per proces)")
+    ap.add_argument("--processes", type=int, default=0)
+    ap.add_argument("--legend-scale", type=int, default=5)
+    ap.add_argument("--out", help="rezultatele per scenariu (JSONL)")
+    args = ap.parse_args()
+
+    if args.scripts:
+        scripts = list(load_scripts(args.scripts))
+    else:
+        scripts = list(synthetic_scripts(args.synthetic, args.turns, args.seed))
+    kwargs = {"seed": args.seed, "latency": args.latency} if args.generator == "stub" else {}
+
+    print(f"▶️ {len(scripts)} scenarii, generator={args.generator}, "
+          f"{args.workers} fire x {max(1, args.processes)} procese")
+    t0 = time.perf_counter()
+    results = run_batch(scripts, args.generator, kwargs, args.workers, args.processes, args.legend_scale)
+    summary = summarize(results, time.perf_counter() - t0)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    for key, value in summary.items():
+        print(f"{key:<18} {value:.3f}" if isinstance(value, float) else f"{key:<18} {value}")
+    if summary["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
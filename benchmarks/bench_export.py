@@ -0,0 +1,89 @@
+# bench_export.py - Export HTML pentru o aventură lungă: concatenare `html +=` vs. scriere în flux
+#
+#   python benchmarks/bench_export.py --turns 500
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_html import export_story, write_story_html
+
+NARRATIVE = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă.\n\n**Sugestii:**"
+    "• Intri în han.\n• Cercetezi urmele.\n• Ceri audiență la căpitan."
+)
+
+
+def make_story(turns: int, image_every: int, image_kb: int, distinct: int):
+    # imaginile se repetă (ex. imaginea de rezervă din modul offline) → `distinct` variante
+    images = [b"\x89PNG\r\n\x1a\n" + os.urandom(image_kb * 1024) for _ in range(distinct)]
+    story = [{"role": "ai", "text": "Intro " * 50, "turn": 0, "image": images[0]}]
+    for t in range(turns):
+        story.append({"role": "user", "text": f"Acțiunea {t}", "turn": t, "image": None})
+        image = images[t % distinct] if t % image_every == 0 else None
+        story.append({"role": "ai", "text": NARRATIVE, "turn": t, "image": image})
+    return story
+
+
+def legacy_export(story) -> bytes:
+    """Implementarea veche: generate_pdf_html cu `html +=` + încă un f-string în sidebar"""
+    html = "<html><head><meta charset=\"UTF-8\"><style>body { padding: 40px; }</style></head><body>"
+    for m in story:
+        role_class = "ai" if m["role"] == "ai" else "user"
+        html += f"""
+        <div class="message {role_class}">
+            <strong>{m['role'].capitalize()}:</strong><br/>
+            {m['text']}
+        </div>
+        """
+        if "image" in m and m["image"]:
+            b64 = base64.b64encode(m["image"]).decode()
+            html += f'<img src="data:image/png;base64,{b64}" />'
+    html += "</body></html>"
+    standalone = f"""<!DOCTYPE html><html><head></head><body><h1>Aventura</h1>{html}</body></html>"""
+    return standalone.encode("utf-8")
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:8.1f}ms  vârf memorie={peak / 1e6:7.1f}MB  rezultat={size / 1e6:6.1f}MB")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=500)
+    ap.add_argument("--image-every", type=int, default=3)
+    ap.add_argument("--image-kb", type=int, default=400)
+    ap.add_argument("--distinct", type=int, default=40, help="imagini distincte în poveste")
+    args = ap.parse_args()
+    story = make_story(args.turns, args.image_every, args.image_kb, args.distinct)
+    n_images = sum(1 for m in story if m["image"])
+    print(f"{len(story)} mesaje, {n_images} imagini ({args.distinct} distincte, {args.image_kb}KB)")
+
+    measure("vechi (html +=, base64)", lambda: len(legacy_export(story)))
+    measure("flux inline (bytes)", lambda: len(export_story(story, "inline")[0]))
+    measure("flux zip (bytes)", lambda: len(export_story(story, "zip")[0]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def to_file(images):
+            path = os.path.join(tmp, f"export_{images}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                write_story_html(story, f, images=images, image_dir=os.path.join(tmp, "images"))
+            return os.path.getsize(path)
+        measure("flux inline → fișier", lambda: to_file("inline"))
+        measure("flux external → fișier", lambda: to_file("external"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_imports.py - Costul importurilor la pornire (cold start), per modul, cu buget
+#
+#   python benchmarks/bench_imports.py
+#   python benchmarks/bench_imports.py --modules app --budget-ms 1500 --top 20
+#
+# Fiecare rulare pornește un interpretor nou cu `-X importtime`, deci măsoară un container rece
+# (fișierele .pyc există deja; prima rulare după o instalare e mai lentă).
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ce importă app.py la pornire (fără a rula main() și fără pool-ul de procese)
+DEFAULT_MODULES = [
+    "config", "character", "ui_components", "llm_handler", "models", "session_store",
+    "turn_journal", "engine", "state_cell", "workers", "prewarm", "image_handler",
+]
+HEAVY = ("torch", "transformers", "deep_translator", "huggingface_hub", "streamlit", "pydantic", "PIL")
+
+
+def import_times(modules: List[str]) -> List[Tuple[str, int, int, int]]:
+    """(nume, adâncime, self µs, cumulativ µs) pentru fiecare import, în ordinea din -X importtime"""
+    env = dict(os.environ, WORKER_PROCESSES="0", LOCAL_WARM_START="0", PREWARM="0")
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative, raw_name = line.split("|", 2)
+        self_us = int(head.split(":")[1])
+        cumulative = int(cumulative)
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        rows.append((raw_name.strip(), depth, self_us, cumulative))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Raport al timpului de import la pornire")
+    ap.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    ap.add_argument("--runs", type=int, default=3, help="rulări (se păstrează cea mai rapidă)")
+    ap.add_argument("--top", type=int, default=15, help="câte dependențe externe afișăm")
+    ap.add_argument("--budget-ms", type=float, default=0, help="eșuează dacă totalul depășește bugetul")
+    args = ap.parse_args()
+
+    best: List[Tuple[str, int, int, int]] = []
+    best_total = None
+    for _ in range(max(1, args.runs)):
+        rows = import_times(args.modules)
+        total = sum(cum for _, depth, _, cum in rows if depth == 0)
+        if best_total is None or total < best_total:
+            best, best_total = rows, total
+
+    project = {os.path.splitext(f)[0] for f in os.listdir(ROOT) if f.endswith(".py")}
+    print("Module din proiect (cumulativ, include dependențele importate prima dată de ele):")
+    for name, depth, self_us, cum in best:
+        if depth == 0 and name in project:
+            print(f"  {name:<24} {cum / 1000:8.1f}ms")
+
+    external: Dict[str, int] = {}
+    for name, depth, self_us, cum in best:
+        top = name.split(".")[0]
+        if top not in project and "." not in name:
+            external[top] = max(external.get(top, 0), cum)
+    print(f"\nDependențe externe (top {args.top}):")
+    for name, cum in sorted(external.items(), key=lambda kv: -kv[1])[:args.top]:
+        flag = "  ⚠️ grea" if name in HEAVY and cum > 200_000 else ""
+        print(f"  {name:<24} {cum / 1000:8.1f}ms{flag}")
+
+    print(f"\nTotal import (inclusiv pornirea interpretorului): {best_total / 1000:.1f}ms")
+    if args.budget_ms and best_total / 1000 > args.budget_ms:
+        print(f"❌ Peste bugetul de {args.budget_ms:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
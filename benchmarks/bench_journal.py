@@ -0,0 +1,126 @@
+# bench_journal.py - Costul persistării per tură: jurnal append-only vs. re-serializarea întregii stări
+#
+#   python benchmarks/bench_journal.py --turns 1000
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CharacterStats, GameState, InventoryItem, ItemType, NarrativeResponse
+from session_store import FileSessionStore, SQLiteSessionStore
+from turn_journal import SessionJournal, apply_record, make_turn_record, replay
+
+NARRATIVE = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă. "
+) * 3
+IMAGE = os.urandom(40_000)  # cât o imagine PNG mică
+
+
+def new_state() -> GameState:
+    return GameState(
+        character=CharacterStats(),
+        inventory=[InventoryItem(name="Sabie", type=ItemType.weapon, value=3)],
+        story=[{"role": "ai", "text": NARRATIVE, "turn": 0, "image": None}],
+        turn=0,
+        last_image_turn=-10,
+    )
+
+
+def turn_response(i: int) -> NarrativeResponse:
+    return NarrativeResponse(
+        narrative=NARRATIVE,
+        health_change=-1 if i % 3 else 0,
+        gold_change=2 if i % 5 == 0 else 0,
+        items_gained=[InventoryItem(name=f"Obiect {i % 7}", type=ItemType.misc)] if i % 10 == 0 else [],
+    )
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_full(store, turns: int, image_every: int):
+    """Comportamentul vechi: tot GameState-ul (cu imagini base64) rescris la fiecare tură"""
+    gs = new_state()
+    lat = []
+    for i in range(turns):
+        record = make_turn_record(gs.turn, f"Acțiunea {i}", NARRATIVE, turn_response(i))
+        apply_record(gs, record)
+        if image_every and i % image_every == 0:
+            gs.story[-1]["image"] = IMAGE
+        t0 = time.perf_counter()
+        store.save("bench", gs.to_save_dict())
+        lat.append(time.perf_counter() - t0)
+    return lat
+
+
+def run_journal(store, turns: int, image_every: int, snapshot_every: int):
+    gs = new_state()
+    journal = SessionJournal("bench", store, snapshot_every=snapshot_every)
+    journal.snapshot(gs)
+    lat = []
+    for i in range(turns):
+        record = make_turn_record(gs.turn, f"Acțiunea {i}", NARRATIVE, turn_response(i))
+        apply_record(gs, record)
+        t0 = time.perf_counter()
+        journal.append(record)
+        if image_every and i % image_every == 0:
+            gs.story[-1]["image"] = IMAGE
+            journal.attach_image(record["t"], IMAGE)
+        if journal.needs_snapshot():
+            journal.snapshot(gs)
+        lat.append(time.perf_counter() - t0)
+    return lat
+
+
+def report(label: str, lat, window: int):
+    early, late = lat[:window], lat[-window:]
+    print(
+        f"{label:<26} primele {window}: {statistics.mean(early) * 1000:7.2f}ms  "
+        f"ultimele {window}: {statistics.mean(late) * 1000:7.2f}ms  "
+        f"p99={percentile(lat, 0.99) * 1000:7.2f}ms"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=1000)
+    ap.add_argument("--image-every", type=int, default=5)
+    ap.add_argument("--snapshot-every", type=int, default=25)
+    args = ap.parse_args()
+    window = min(10, args.turns)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "file": lambda name: FileSessionStore(os.path.join(tmp, name)),
+            "sqlite": lambda name: SQLiteSessionStore(os.path.join(tmp, f"{name}.sqlite3")),
+        }
+        for backend, make_store in stores.items():
+            report(f"{backend} snapshot complet", run_full(make_store("full"), args.turns, args.image_every), window)
+            store = make_store("journal")
+            report(f"{backend} jurnal", run_journal(store, args.turns, args.image_every, args.snapshot_every), window)
+
+            # Replay: ultimul snapshot + coada jurnalului, și jurnalul integral (fără compactare)
+            t0 = time.perf_counter()
+            gs, _ = replay(store, "bench")
+            t_snap = time.perf_counter() - t0
+            raw = make_store("raw")
+            run_journal(raw, args.turns, args.image_every, snapshot_every=args.turns + 1)
+            t0 = time.perf_counter()
+            gs_raw, _ = replay(raw, "bench")
+            t_raw = time.perf_counter() - t0
+            assert gs.turn == gs_raw.turn == args.turns
+            print(
+                f"{backend} replay {args.turns} ture: snapshot+coadă={t_snap * 1000:.1f}ms  "
+                f"jurnal integral={t_raw * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# bench_keywords.py - update_stats: implementarea veche (any(...) pe liste) vs. motorul de reguli
+#
+#   python benchmarks/bench_keywords.py --length 6000
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from character import STAT_RULES, roll_dice, update_stats
+from keyword_engine import AhoCorasick, KeywordEngine
+
+FILLER = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă. "
+)
+ENDINGS = [
+    "",
+    " Un atac din umbră te lasă rănit și simți durere.",
+    " După o noapte de odihnă te simți mai bine.",
+    " Negustorul zâmbește: primești o sabie veche și 12 galbeni.",
+]
+ACTIONS = ["Ajută bătrânul cu curaj", "Îl amenință pe negustor", "Merg mai departe", "Protejează copilul"]
+
+
+def _names(inventory) -> set:
+    return {item["name"] if isinstance(item, dict) else item for item in inventory}
+
+
+def legacy_update_stats(character, action, response, notify):
+    """Copia implementării dinainte de motorul de reguli (comparație + verificare de echivalență)"""
+    action_lower = action.lower()
+    response_lower = response.lower()
+    if any(word in action_lower for word in ["onor", "noblețe", "datorie", "curaj", "ajută"]):
+        rep_gain = roll_dice(10) + 2
+        character["reputation"] = min(100, character["reputation"] + rep_gain)
+        notify(f"👑 Reputație +{rep_gain}!", icon="⭐")
+    elif any(word in action_lower for word in ["trădare", "laș", "minciună", "furt", "amenință"]):
+        rep_loss = roll_dice(10) + 3
+        character["reputation"] = max(0, character["reputation"] - rep_loss)
+        notify(f"👑 Reputație -{rep_loss}!", icon="⬇️")
+    if any(word in response_lower for word in ["rănit", "sânge", "atac", "răni", "durere", "te pierzi", "cazi"]):
+        damage = roll_dice(10)
+        character["health"] = max(0, character["health"] - damage)
+        notify(f"💔 Ai pierdut {damage} puncte de viață!", icon="⚔️")
+    elif any(word in response_lower for word in ["vindecat", "odihnă", "sigur", "refăcut", "te simți mai bine"]):
+        heal = roll_dice(8)
+        character["health"] = min(100, character["health"] + heal)
+        notify(f"❤️ Te-ai vindecat cu {heal} puncte!", icon="✨")
+    if any(word in action_lower for word in ["onor", "noblețe", "datorie", "curaj", "ajută", "protejează", "nobil"]):
+        rep_gain = roll_dice(6)
+        character["reputation"] = min(100, character["reputation"] + rep_gain)
+        notify(f"👑 Reputație +{rep_gain}!", icon="⭐")
+    elif any(word in action_lower for word in ["trădare", "laș", "minciună", "furt", "amenință", "ucide"]):
+        rep_loss = roll_dice(6)
+        character["reputation"] = max(0, character["reputation"] - rep_loss)
+        notify(f"👑 Reputație -{rep_loss}!", icon="⬇️")
+    if "primești" in response_lower:
+        item_match = re.search(r'primești (?:un|o|unui|niște) ([\w\s]+)', response_lower)
+        if item_match:
+            new_item = item_match.group(1).strip()
+            if new_item not in _names(character["inventory"]):
+                character["inventory"].append(new_item)
+                notify(f"🎒 Obiect nou: {new_item}!", icon="📦")
+    if "găsește" in response_lower or "primești" in response_lower:
+        gold_match = re.search(r'(\d+)\s*galben[i]', response_lower)
+        if gold_match:
+            gold_amount = int(gold_match.group(1))
+            character["gold"] = character.get("gold", 0) + gold_amount
+            notify(f"💰 +{gold_amount} galbeni!", icon="🪙")
+        item_match = re.search(r'primești (?:un|o|niște) ([\w\s\-]+)', response_lower)
+        if item_match:
+            new_item = item_match.group(1).strip()
+            existing_names = _names(character["inventory"])
+            if new_item not in existing_names:
+                character["inventory"].append({"name": new_item, "type": "obiect", "value": 0})
+                notify(f"🎒 Obiect nou: {new_item}!", icon="📦")
+
+
+def silent(*args, **kwargs):
+    pass
+
+
+def new_character():
+    return {"health": 60, "reputation": 40, "gold": 5, "inventory": [{"name": "5 galbeni"}]}
+
+
+def timed(fn, cases, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for action, response in cases:
+            fn(new_character(), action, response, silent)
+    return (time.perf_counter() - t0) / (repeat * len(cases)) * 1e6
+
+
+def check_equivalence(cases):
+    for action, response in cases:
+        for seed in range(3):
+            old, new = new_character(), new_character()
+            random.seed(seed)
+            legacy_update_stats(old, action, response, silent)
+            random.seed(seed)
+            update_stats(new, action, response, notify=silent)
+            assert old == new, (action, response[-80:], old, new)
+
+
+def scan_scaling(length: int, repeat: int):
+    """Costul unei scanări când tabelul crește: `in` per cuvânt vs. automat"""
+    text = (FILLER * (length // len(FILLER) + 1))[:length].lower()
+    rng = random.Random(0)
+    letters = "abcdefghilmnoprstuvăâîșț"
+    for n_words in (32, 64, 128, 256, 512):
+        words = ["".join(rng.choice(letters) for _ in range(rng.randint(5, 9))) for _ in range(n_words)]
+        automaton = AhoCorasick(words)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            {w for w in words if w in text}
+        t_in = (time.perf_counter() - t0) / repeat * 1e6
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            automaton.scan(text)
+        t_ac = (time.perf_counter() - t0) / repeat * 1e6
+        print(f"  {n_words:>4} cuvinte: `in`={t_in:8.1f}µs  automat={t_ac:8.1f}µs")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--length", type=int, default=6000, help="lungimea narațiunii (caractere)")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    body = (FILLER * (args.length // len(FILLER) + 1))[:args.length]
+    cases = [(action, body + ending) for action in ACTIONS for ending in ENDINGS]
+    check_equivalence(cases)
+    print(f"✅ Rezultate identice cu implementarea veche ({len(cases)} cazuri, narațiuni de {args.length} caractere)")
+
+    t_old = timed(legacy_update_stats, cases, args.repeat)
+    t_new = timed(lambda c, a, r, n: update_stats(c, a, r, notify=n), cases, args.repeat)
+    automaton_engine = KeywordEngine(STAT_RULES, extra_words={"response": ["primești", "găsește"]},
+                                     automaton_min_words=1)
+    texts = [{"action": a.lower(), "response": r.lower()} for a, r in cases]
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for t in texts:
+            automaton_engine.match(automaton_engine.scan(t))
+    t_ac = (time.perf_counter() - t0) / (args.repeat * len(texts)) * 1e6
+    print(f"vechi (any pe liste)      {t_old:8.1f}µs / apel")
+    print(f"motor de reguli           {t_new:8.1f}µs / apel")
+    print(f"motor, forțat pe automat  {t_ac:8.1f}µs / scanare+potrivire")
+    print("Scalare cu numărul de cuvinte cheie:")
+    scan_scaling(args.length, max(1, args.repeat // 4))
+
+
+if __name__ == "__main__":
+    main()
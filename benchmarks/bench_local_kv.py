@@ -0,0 +1,63 @@
+# bench_local_kv.py - Latența per tură cu și fără reutilizarea prefixului (KV cache)
+#
+#   python benchmarks/bench_local_kv.py --turns 12
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOCAL_WARM_START", "0")
+
+from local_backend import LocalModelBackend
+
+INTRO = (
+    "Fantasy story: Vlad Țepeș Drăculea, domn al Țării Românești. Te afli la marginea cetății "
+    "Târgoviște, pe o noapte rece de toamnă. Flăcările torțelor dansează în vânt. "
+)
+TURN = "TU: Mă apropii de poartă și vorbesc cu străjerul. NARATOR: Străjerul te privește bănuitor. "
+
+
+def session_prompts(turns: int):
+    prompt = INTRO
+    for i in range(turns):
+        prompt += f"[Tura {i}] " + TURN
+        yield prompt
+
+
+def run(backend: LocalModelBackend, turns: int, max_new_tokens: int, session_id):
+    latencies = []
+    for prompt in session_prompts(turns):
+        t0 = time.perf_counter()
+        backend.generate(prompt, max_new_tokens=max_new_tokens, session_id=session_id)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default=os.getenv("LOCAL_FALLBACK_MODEL", "distilgpt2"))
+    ap.add_argument("--turns", type=int, default=12)
+    ap.add_argument("--max-new-tokens", type=int, default=8)
+    ap.add_argument("--quantize", action="store_true")
+    args = ap.parse_args()
+
+    for label, kv_mb in (("fără prefix", 0), ("cu prefix", 256)):
+        backend = LocalModelBackend(args.model, quantize=args.quantize, kv_cache_mb=kv_mb, batch_wait_ms=0)
+        if not backend.wait_ready():
+            print(f"❌ Modelul nu s-a încărcat: {backend.load_error}")
+            return
+        backend.generate(INTRO, max_new_tokens=2)  # warm-up
+        lat = run(backend, args.turns, args.max_new_tokens, session_id="bench")
+        s = backend.stats()
+        print(
+            f"{label:<12} medie={statistics.mean(lat) * 1000:7.1f}ms  "
+            f"ultima tură={lat[-1] * 1000:7.1f}ms  "
+            f"hits={s['kv_hits']} tokeni reutilizați={s['kv_reused_tokens']} "
+            f"kv={s['kv_bytes'] / 1024:.0f}KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
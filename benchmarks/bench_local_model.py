@@ -0,0 +1,72 @@
+# bench_local_model.py - Tokens/sec și latență pentru backend-ul local (CPU)
+#
+#   python benchmarks/bench_local_model.py --concurrency 1 4 8
+#   python benchmarks/bench_local_model.py --model distilgpt2 --no-quantize
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOCAL_WARM_START", "0")
+
+from local_backend import LocalModelBackend
+
+PROMPT = (
+    "Fantasy story: Te afli la marginea cetății Târgoviște, pe o noapte rece de toamnă. "
+    "Porțile de stejar se ridică încet, iar în depărtare se aud cai și voci ale străjerilor."
+)
+
+
+def run(backend: LocalModelBackend, concurrency: int, requests_total: int, max_new_tokens: int):
+    before = backend.stats()
+    latencies = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        backend.generate(PROMPT, max_new_tokens=max_new_tokens)
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    wall = time.perf_counter() - t0
+    after = backend.stats()
+
+    tokens = after["new_tokens"] - before["new_tokens"]
+    batches = after["batches"] - before["batches"]
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"  concurrency={concurrency:<3} req={requests_total:<4} "
+        f"tok/s={tokens / wall:8.1f}  avg_batch={requests_total / max(1, batches):4.1f}  "
+        f"p50={statistics.median(latencies) * 1000:7.0f}ms  p95={p95 * 1000:7.0f}ms"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default=os.getenv("LOCAL_FALLBACK_MODEL", "distilgpt2"))
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--requests", type=int, default=16)
+    ap.add_argument("--max-new-tokens", type=int, default=40)
+    ap.add_argument("--no-quantize", action="store_true", help="doar float32")
+    args = ap.parse_args()
+
+    modes = [False] if args.no_quantize else [False, True]
+    for quantize in modes:
+        backend = LocalModelBackend(args.model, quantize=quantize, max_batch=max(args.concurrency))
+        t0 = time.perf_counter()
+        if not backend.wait_ready():
+            print(f"❌ Modelul nu s-a încărcat: {backend.load_error}")
+            return
+        print(f"\n{args.model} int8={quantize} (load {time.perf_counter() - t0:.1f}s)")
+        backend.generate(PROMPT, max_new_tokens=4)  # warm-up
+        for c in args.concurrency:
+            run(backend, c, args.requests, args.max_new_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench_narration.py - Latența narațiunii audio: sinteză secvențială vs. pe propoziții în paralel, cu cache
+#
+#   python benchmarks/bench_narration.py --latency 0.4 --concurrency 4
+#
+# Backend-ul offline (ton local) cu `--latency` secunde per cerere ține locul unui serviciu TTS real.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LOCAL_WARM_START", "0")
+os.environ.setdefault("WORKER_PROCESSES", "0")
+
+from config import Config
+from narration import AudioCache, Narrator, OfflineBackend, split_sentences
+
+NARRATIVE = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă. "
+    "Un negustor sas își strânge în grabă tarabele, cu ochii la cerul care se întunecă. "
+    "Din turnul bisericii, un clopot bate de trei ori, deși nu e încă vremea vecerniei.\n\n"
+    "**Sugestii:**\n- Intri în han.\n- Ceri audiență la căpitan."
+)
+
+
+def run(narrator: Narrator, text: str, key: str) -> dict:
+    t0 = time.perf_counter()
+    narration = narrator.narrate(text, key=key)
+    segments = sum(1 for _ in narration.segments())
+    return {
+        "first": narration.first_at or 0.0,
+        "total": time.perf_counter() - t0,
+        "segments": segments,
+        "cached": narration.cached,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Narațiune audio: latența până la primul sunet și totală")
+    ap.add_argument("--latency", type=float, default=0.4, help="secunde per cerere TTS (simulat)")
+    ap.add_argument("--concurrency", type=int, default=Config.TTS_CONCURRENCY)
+    args = ap.parse_args()
+
+    turn = NARRATIVE
+    intro = Config.make_intro_text(5)
+    print(f"▶️ Replică: {len(split_sentences(turn))} propoziții; introducere: {len(split_sentences(intro))}")
+    print(f"{'caz':<40} {'primul sunet':>13} {'total':>8} {'din cache':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = OfflineBackend(latency=args.latency)
+        cases = [
+            # O singură cerere TTS deodată: propozițiile așteaptă una după alta
+            ("replică, secvențial", Narrator(backend, AudioCache(os.path.join(tmp, "seq")), 1), turn),
+            (f"replică, {args.concurrency} în paralel", Narrator(backend, AudioCache(os.path.join(tmp, "par")),
+                                                                args.concurrency), turn),
+        ]
+        shared = Narrator(backend, AudioCache(os.path.join(tmp, "shared")), args.concurrency)
+        cases += [
+            ("introducere, sesiunea 1 (cache rece)", shared, intro),
+            # Altă sesiune, alt amestec de propoziții din același set: cele comune vin din cache
+            ("introducere, sesiunea 2", shared, Config.make_intro_text(5)),
+            ("introducere, sesiunea 1 din nou", shared, intro),
+        ]
+        for i, (label, narrator, text) in enumerate(cases):
+            r = run(narrator, text, key=f"bench:{i}")
+            print(f"{label:<40} {r['first']:>12.2f}s {r['total']:>7.2f}s {r['cached']:>5}/{r['segments']}",
+                  flush=True)
+        stats = shared.stats()
+        print(f"{'':<40} cache: {stats['hits']} hit / {stats['misses']} miss, "
+              f"~{stats['seconds_saved']:.1f}s de sinteză economisite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# bench_prompt.py - Config.build_dnd_prompt: implementarea veche vs. fragmentele precalculate + fereastra de context
+#
+#   python benchmarks/bench_prompt.py --iterations 20000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models import NarrativeResponse
+
+
+def legacy_build_dnd_prompt(story, character, legend_scale=5):
+    """Copia implementării dinainte de registrul de fragmente (comparație + verificare de echivalență)"""
+    ratio = legend_scale / 10.0
+    if ratio < 0.3:
+        style_prefix = "Stil STRICT ISTORIC. Fără magie, fără creaturi fantastice. "
+    elif ratio > 0.7:
+        style_prefix = "Stil LEGENDAR VAMPIRIC. Umbre, mister, folklore întunecat. "
+    else:
+        style_prefix = "Stil echilibrat istoric și legendar. "
+    context = "\n".join([f"{m['role'].upper()}: {m['text']}" for m in story[-4:]])
+    char_health = character.get('health', 100)
+    char_rep = character.get('reputation', 20)
+    char_gold = character.get('gold', 0)
+    char_loc = character.get('location', 'Târgoviște')
+    power_desc = 'SLABĂ'
+    if char_rep >= 60: power_desc = 'CRESCUTĂ'
+    elif char_rep >= 30: power_desc = 'MEDIE'
+    char_info = (
+        f"\n\nSTATISTICI CRITICE: Viață={char_health} | "
+        f"Reputație={char_rep} | "
+        f"Locație={char_loc} | "
+        f"Galbeni={char_gold} | "
+        f"Puterea ta este {power_desc}\n"
+    )
+    if char_rep < 20:
+        restrictions = "Jucătorul are reputație FOARTE JOSĂ. Este tratat cu suspiciune. Nu poate intra în audiență la boieri. "
+    elif char_rep < 50:
+        restrictions = "Jucătorul are reputație MEDIE. Poate interacționa cu negustori și soldați, dar nu cu înalta nobilime. "
+    else:
+        restrictions = "Jucătorul are reputație BUNĂ. Poate cere audiențe, dar ȚEPEȘ este INACCESIBIL direct fără motiv întemeiat. "
+    schema = NarrativeResponse.model_json_schema()
+    instructions = (
+        f"\n{style_prefix}{restrictions}"
+        "REGULI OBLIGATORII:\n"
+        "- 'narrative': 2-3 propoziții, fără greșeli gramaticale, în română medievală\n"
+        "- 'suggestions': Listă de EXACT 2-3 string-uri, fără numere, fără bullet points\n"
+        "  EXEMPLU: [\"Cere audiență la curte.\", \"Caută informații în târg.\", \"Explorezi adâncul pădurii.\"]\n"
+        "- Respectă gramatica: 'unei păsări', 'unor boieri', nu 'unui păsări'\n"
+        "VLAD ȚEPEȘ NU POATE FI ÎNVINS – orice tentativă = game_over instant\n"
+        "Reputația sub 20 = nu poți interacționa cu nobilii\n\n"
+        f"Răspunde STRICT în format JSON conform schemei:\n"
+        f"STRICT JSON SCHEMA:\n"
+        f"```json\n{schema}\n```\n"
+    )
+    return context + char_info + instructions
+
+
+def make_cases(count: int, seed: int):
+    rng = random.Random(seed)
+    story = [{"role": "ai", "text": Config.make_intro_text(5), "turn": 0, "image": None}]
+    for turn in range(1, 8):
+        story.append({"role": "user", "text": f"Acțiunea {turn}: merg spre cetate.", "turn": turn, "image": None})
+        story.append({"role": "ai", "text": f"Narațiunea turei {turn}.\n\n**Sugestii:**• Intri în han.", "turn": turn, "image": None})
+    cases = []
+    for _ in range(count):
+        character = {
+            "health": rng.randint(0, 100),
+            "reputation": rng.randint(0, 100),
+            "gold": rng.randint(0, 50),
+            "location": rng.choice(["Târgoviște", "Poenari", "Snagov"]),
+        }
+        cases.append((story[:rng.randint(1, len(story))], character, rng.randint(0, 10)))
+    return cases
+
+
+def bench(fn, cases, iterations: int) -> float:
+    t0 = time.perf_counter()
+    n = len(cases)
+    for i in range(iterations):
+        story, character, scale = cases[i % n]
+        fn(story, character, scale)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Debitul build_dnd_prompt (prompturi/s)")
+    ap.add_argument("--iterations", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    cases = make_cases(500, args.seed)
+    marker = "\n\nSTATISTICI CRITICE"
+    for story, character, scale in cases:
+        # contextul diferă intenționat (fereastra pe buget de tokeni); restul promptului e identic
+        new = Config.build_dnd_prompt(story, character, scale).split(marker, 1)[1]
+        assert new == legacy_build_dnd_prompt(story, character, scale).split(marker, 1)[1]
+    print(f"✅ statisticile, stilul și regulile sunt identice cu implementarea veche pe {len(cases)} cazuri")
+
+    for name, fn in (("legacy", legacy_build_dnd_prompt), ("fragments", Config.build_dnd_prompt)):
+        seconds = bench(fn, cases, args.iterations)
+        print(f"{name:<10} {args.iterations / seconds:>10.0f} prompturi/s   {seconds / args.iterations * 1e6:7.1f} µs/prompt")
+
+    from prompt_context import count_tokens, get_prompt_stats
+
+    legacy_sizes = sorted(count_tokens(legacy_build_dnd_prompt(*case)) for case in cases)
+    print(f"{'tokeni':<10} vechi: medie {sum(legacy_sizes) / len(legacy_sizes):.0f}, max {legacy_sizes[-1]}   "
+          f"fereastră: {get_prompt_stats().stats()}")
+
+    t0 = time.perf_counter()
+    for i in range(args.iterations):
+        Config.make_intro_text(i % 11)
+    seconds = time.perf_counter() - t0
+    print(f"{'intro':<10} {args.iterations / seconds:>10.0f} texte/s      {seconds / args.iterations * 1e6:7.1f} µs/text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# bench_save_loader.py - Încărcarea salvărilor mari: json.loads pe tot fișierul vs. save_loader în flux
+#
+#   python benchmarks/bench_save_loader.py --sizes 100 300
+#
+# Fiecare variantă rulează într-un proces separat, ca memoria maximă (ru_maxrss) să fie doar a ei.
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LOCAL_WARM_START", "0")
+os.environ.setdefault("WORKER_PROCESSES", "0")
+
+from engine import new_game_state
+
+NARRATIVE = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă. "
+)
+IMAGE_BYTES = 300_000  # cât o imagine PNG 768x512
+
+
+def write_save(path: str, megabytes: int) -> int:
+    """Scrie un fișier de salvare de ~`megabytes` MB (o imagine la fiecare tură), fără să-l țină în memorie"""
+    gs = new_game_state(5)
+    header = gs.to_save_dict()
+    image = base64.b64encode(os.urandom(IMAGE_BYTES)).decode("ascii")
+    per_turn = len(image) + 2 * len(NARRATIVE.encode("utf-8")) + 200
+    turns = max(1, megabytes * 1_000_000 // per_turn)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"character": ' + json.dumps(header["character"], ensure_ascii=False))
+        f.write(', "inventory": ' + json.dumps(header["inventory"], ensure_ascii=False))
+        f.write(', "story": [')
+        f.write(json.dumps({"role": "ai", "text": NARRATIVE, "turn": 0, "image": None}, ensure_ascii=False))
+        for t in range(1, turns + 1):
+            f.write(",\n  " + json.dumps({"role": "user", "text": f"Acțiunea {t}", "turn": t}, ensure_ascii=False))
+            f.write(",\n  " + json.dumps({"role": "ai", "text": NARRATIVE, "turn": t, "image": image},
+                                         ensure_ascii=False))
+        f.write(f'], "turn": {turns}, "last_image_turn": {turns}, "session_id": "bench"}}')
+    return turns
+
+
+def child(variant: str, path: str, limit_mb: float):
+    """Rulează o singură variantă și tipărește JSON cu timpul și memoria maximă"""
+    from models import GameState
+    from save_loader import SaveFileError, load_save
+
+    t0 = time.perf_counter()
+    outcome = "ok"
+    if variant == "legacy":
+        with open(path, "rb") as f:
+            gs = GameState.from_save_dict(json.loads(f.read()))
+    else:
+        try:
+            with open(path, "rb") as f:
+                gs, _ = load_save(f, os.path.getsize(path) if variant == "stream" else None,
+                                  max_bytes=int(limit_mb * 1_000_000), max_turns=10 ** 6)
+        except SaveFileError as e:
+            gs, outcome = None, f"respins: {e}"
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "seconds": elapsed,
+        "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "turns": gs.turn if gs is not None else None,
+        "outcome": outcome,
+    }))
+
+
+def run_child(variant: str, path: str, limit_mb: float) -> dict:
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", variant, path, "--limit-mb", str(limit_mb)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Încărcarea salvărilor mari: vechi vs. în flux")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 300], help="mărimi de fișier (MB)")
+    ap.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    ap.add_argument("--limit-mb", type=float, default=10_000, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.limit_mb)
+        return
+
+    # Referința: interpretorul + importurile, fără nicio încărcare
+    baseline = run_child("stream", os.devnull, 1)["maxrss_mb"]
+    print(f"▶️ Proces gol (importuri): {baseline:.0f} MB RSS")
+    print(f"{'fișier':>8} {'variantă':<28} {'timp':>8} {'RSS max':>9} {'rezultat'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megabytes in args.sizes:
+            path = os.path.join(tmp, f"save_{megabytes}.json")
+            turns = write_save(path, megabytes)
+            size_mb = os.path.getsize(path) / 1e6
+            cases = [
+                ("legacy", "json.loads + from_save_dict", 10_000),
+                ("stream", "save_loader (în flux)", 10_000),
+                # Limita sub mărimea fișierului: mărimea declarată (upload) → respins înainte de citire
+                ("stream", "limită, mărime declarată", size_mb / 2),
+                # Fără mărime declarată (flux fără lungime): respins când citirea trece de limită
+                ("nosize", "limită, fără mărime", size_mb / 2),
+            ]
+            for variant, label, limit in cases:
+                r = run_child(variant, path, limit)
+                result = f"{r['turns']} ture" if r["turns"] is not None else r["outcome"][:48]
+                print(f"{size_mb:>6.0f}MB {label:<28} {r['seconds']:>7.2f}s {r['maxrss_mb']:>7.0f}MB  {result}",
+                      flush=True)
+            print(f"{'':>8} ({turns} ture, o imagine de {IMAGE_BYTES // 1000} KB per tură)")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_session_memory.py - Memoria sesiunilor inactive înainte și după evacuarea în session store
+#
+#   python benchmarks/bench_session_memory.py --sessions 20 --turns 60
+#
+# Fiecare sesiune e un dicționar cu aceleași chei ca st.session_state; evict_session rulează exact ca în
+# fragmentul app.idle_eviction. Scriptul se oprește cu eroare dacă memoria nu scade sau restaurarea diferă.
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SESSION_STORE"] = "file"
+os.environ["SESSION_DIR"] = _tmp.name
+os.environ.setdefault("LOCAL_WARM_START", "0")
+
+from engine import new_game_state
+from models import NarrativeResponse
+from session_memory import evict_session, format_footprint, session_footprint
+from state_cell import GameStateCell
+from turn_journal import apply_record, make_turn_record, open_journal, persist_snapshot, restore_session
+
+NARRATIVE = (
+    "Străjerul te privește bănuitor, apoi ridică lancea și îți face semn să treci. "
+    "Dincolo de poartă, ulițele Târgoviștei miros a fum și a pâine caldă. "
+) * 3
+
+
+def idle_session(session_id: str, turns: int, image_every: int, image_bytes: int) -> dict:
+    """Starea unei sesiuni după `turns` ture, cu cheile pe care le pune app.init_session"""
+    gs = new_game_state(5)
+    journal = open_journal(session_id)
+    persist_snapshot(journal, gs)
+    history = []
+    for i in range(turns):
+        record = make_turn_record(gs.turn, f"Acțiunea {i}", NARRATIVE, NarrativeResponse(narrative=NARRATIVE))
+        apply_record(gs, record)
+        journal.append(record)
+        if image_every and i % image_every == 0:
+            image = os.urandom(image_bytes)
+            gs.story[-1]["image"] = image
+            journal.attach_image(record["t"], image)
+        history.append({"action": f"Acțiunea {i}", "response": NARRATIVE})
+    cell = GameStateCell(gs)
+    return {
+        "session_id": session_id,
+        "state_cell": cell,
+        "game_state": cell.gs,
+        "story": cell.gs.story,
+        "character": cell.gs.character.model_dump(),
+        "story_history": history,
+        "image_queue": [],
+        "journal": journal,
+        "turn": gs.turn,
+        "last_image_turn": gs.last_image_turn,
+        "prompt_cache": NARRATIVE,
+        "is_generating": False,
+        "image_worker_active": False,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sesiuni inactive: memoria înainte și după evacuare")
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--turns", type=int, default=60)
+    ap.add_argument("--image-every", type=int, default=5)
+    ap.add_argument("--image-kb", type=int, default=400, help="cât un PNG 512x512")
+    args = ap.parse_args()
+
+    tracemalloc.start()
+    sessions = [idle_session(f"bench{i}", args.turns, args.image_every, args.image_kb * 1024)
+                for i in range(args.sessions)]
+    gc.collect()
+    before_mem = tracemalloc.get_traced_memory()[0]
+    before = sum(session_footprint(s)["total"] for s in sessions)
+    print(f"▶️ {args.sessions} sesiuni × {args.turns} ture: {before / 1e6:.1f} MB în session_state "
+          f"(prima: {format_footprint(session_footprint(sessions[0]))})")
+
+    evicted = sum(1 for s in sessions if evict_session(s) is not None)
+    gc.collect()
+    after_mem = tracemalloc.get_traced_memory()[0]
+    after = sum(session_footprint(s)["total"] for s in sessions)
+    print(f"💤 {evicted} evacuate: session_state {before / 1e6:.1f} → {after / 1e6:.2f} MB, "
+          f"heap Python {before_mem / 1e6:.1f} → {after_mem / 1e6:.1f} MB")
+
+    restored = restore_session("bench0")
+    assert restored is not None and restored[0].turn == args.turns, "restaurarea din store diferă"
+    assert evicted == args.sessions, "nu toate sesiunile inactive au fost evacuate"
+    # Cel puțin jumătate din amprenta sesiunilor trebuie să plece efectiv din heap
+    assert before_mem - after_mem > before / 2, "memoria nu a scăzut după evacuare"
+    print(f"♻️ bench0 restaurată la tura {restored[0].turn}")
+
+
+if __name__ == "__main__":
+    main()
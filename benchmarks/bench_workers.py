@@ -0,0 +1,73 @@
+# bench_workers.py - Cât blochează o sesiune grea (PNG / base64) o sesiune ușoară din același proces
+#
+#   python benchmarks/bench_workers.py --heavy 4 --seconds 5
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from workers import Job, WorkerPool, b64encode_many, encode_png
+
+
+def heavy_session(pool: WorkerPool, stop: threading.Event, done: list):
+    """Tură grea: codare PNG a unei imagini 1024x1024 + base64 pentru export"""
+    img = Image.effect_noise((1024, 1024), 64).convert("RGB")
+    while not stop.is_set():
+        png = pool.run(Job(encode_png, img))
+        pool.run(Job(b64encode_many, [png] * 4))
+        done.append(1)
+
+
+def light_session(stop: threading.Event, lat: list):
+    """Sesiune ușoară: un pas mic de Python la fiecare 5ms; măsurăm cât întârzie"""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        sum(range(2000))
+        time.sleep(0.005)
+        lat.append(time.perf_counter() - t0 - 0.005)
+
+
+def run(processes: int, heavy: int, seconds: float):
+    pool = WorkerPool(processes=processes)
+    pool.warm_up()
+    pool.run(Job(b64encode_many, [b"x"]))  # așteptăm pornirea workerilor
+    stop = threading.Event()
+    lat, done = [], []
+    threads = [threading.Thread(target=light_session, args=(stop, lat))]
+    threads += [threading.Thread(target=heavy_session, args=(pool, stop, done)) for _ in range(heavy)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    pool.shutdown()
+    ordered = sorted(lat)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    label = "inline" if processes == 0 else f"pool x{processes}"
+    print(
+        f"{label:<10} sesiune ușoară: medie={statistics.mean(lat) * 1000:6.2f}ms p99={p99 * 1000:7.2f}ms  "
+        f"ture grele={len(done) / seconds:6.1f}/s"
+    )
+    for name, s in pool.stats().items():
+        print(f"    {name:<16} jobs={s['jobs']:<5} run={s['avg_run_ms']:7.2f}ms wait={s['avg_wait_ms']:6.2f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--heavy", type=int, default=4, help="sesiuni grele concurente")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+    run(0, args.heavy, args.seconds)
+    run(args.processes, args.heavy, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
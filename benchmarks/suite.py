@@ -0,0 +1,236 @@
+# suite.py - Suita de benchmark-uri offline pentru căile calde ale unei ture, cu baseline și raport
+#
+#   python benchmarks/suite.py                    # rulează și compară cu benchmarks/baselines.json
+#   python benchmarks/suite.py --save             # rulează și scrie baseline-ul nou
+#   python benchmarks/suite.py --only prompt save --sizes 10 100
+#
+# Cazurile care depind de lungimea aventurii rulează pe povești de 10 / 100 / 1000 de ture;
+# cele care procesează o singură replică (gramatică, curățare, decodare) rulează o dată ("-").
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline și măsurat pe firul curent: fără model local, fără pool de procese (costul CPU, nu IPC)
+os.environ.setdefault("LOCAL_WARM_START", "0")
+os.environ.setdefault("WORKER_PROCESSES", "0")
+os.environ.setdefault("PROMPT_TOKENIZER", "none")
+
+from PIL import Image
+
+from character import update_stats
+from config import Config
+from engine import new_game_state, stub_generator, run_turn
+from image_handler import _draw_fallback_image, generate_fallback_image, pil_to_bytes
+from llm_handler import clean_ai_response, fix_romanian_grammar, parse_api_content
+from models import GameState
+from ui_components import generate_pdf_html
+from workers import decode_save_file, encode_save_file
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SIZES = (10, 100, 1000)
+
+ACTIONS = [
+    "Mă apropii de poartă și vorbesc cu străjerul.",
+    "Ajut un țăran să-și scoată căruța din noroi, cu curaj.",
+    "Îl amenință pe hoțul prins la piață.",
+    "Mă odihnesc lângă foc până în zori.",
+]
+RAW_LOCAL_OUTPUT = (
+    "Assistant: <|im_start|>Vântul *șuieră* printre crenelurile cetății, iar străjerul te privește lung.\n\n\n"
+    "System: Un sunet de copite se aude   dinspre drumul Brașovului. [END]"
+)
+API_CONTENT = json.dumps({
+    "narrative": "sa treci de poarta, turchi se apropie de cetate cu o forță mare iar străjerul te oprește",
+    "health_change": -5,
+    "reputation_change": 3,
+    "gold_change": 2,
+    "items_gained": [{"name": "Scrisoare sigilată"}, {"name": "Pumnal", "type": "armă", "value": 4}],
+    "items_lost": [],
+    "location_change": "Poenari",
+    "suggestions": ["Intri în han.", "Ceri audiență la căpitan.", "Urmezi cărarea spre codru."],
+}, ensure_ascii=False)
+API_CONTENT = f"```json\n{API_CONTENT}\n```"
+
+
+def make_game_state(turns: int, image_every: int = 5, distinct_images: int = 20) -> GameState:
+    """O aventură realistă de `turns` ture (generator determinist), cu o imagine la fiecare `image_every`"""
+    images = [_draw_fallback_image(f"scena {i}", i % 2 == 0) for i in range(min(distinct_images, turns))]
+    gs = new_game_state(5)
+    generate = stub_generator(seed=turns)
+    for t in range(turns):
+        run_turn(gs, ACTIONS[t % len(ACTIONS)], generate, image_interval=10 ** 9)
+        gs.character.health = max(gs.character.health, 50)  # aventura nu se oprește la game over
+        if images and t % image_every == 0:
+            gs.story[-1]["image"] = images[(t // image_every) % len(images)]
+    return gs
+
+
+class Case:
+    """Un benchmark: `setup(size)` pregătește datele (nemăsurat), `run(data)` e apelul măsurat"""
+    __slots__ = ("name", "setup", "run", "scales")
+
+    def __init__(self, name: str, setup: Callable[[int], Any], run: Callable[[Any], Any], scales: bool = True):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.scales = scales
+
+
+_states: Dict[int, GameState] = {}
+
+def _state(size: int) -> GameState:
+    if size not in _states:
+        _states[size] = make_game_state(size)
+    return _states[size]
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+CASES: List[Case] = [
+    Case("build_dnd_prompt",
+         lambda n: (_state(n).story, _state(n).character.model_dump()),
+         lambda d: Config.build_dnd_prompt(d[0], d[1], 5)),
+    Case("fix_romanian_grammar", lambda n: _state(10).story[-1]["text"].split("\n\n**Sugestii:**")[0],
+         fix_romanian_grammar, scales=False),
+    Case("clean_ai_response", lambda n: RAW_LOCAL_OUTPUT, clean_ai_response, scales=False),
+    Case("parse_api_content", lambda n: API_CONTENT, parse_api_content, scales=False),
+    Case("update_stats",
+         lambda n: (_state(10).character.model_dump(), _state(10).story[-1]["text"]),
+         lambda d: update_stats(dict(d[0]), ACTIONS[1], d[1], notify=_silent), scales=False),
+    Case("gamestate_validate",
+         lambda n: {
+             "character": _state(n).character.model_dump(),
+             "inventory": _state(n).inventory.to_list(),
+             "story": _state(n).story,
+             "turn": _state(n).turn,
+             "last_image_turn": _state(n).last_image_turn,
+         },
+         GameState.model_validate),
+    Case("save_encode", lambda n: _state(n), lambda gs: encode_save_file(gs, "bench")),
+    Case("save_decode", lambda n: encode_save_file(_state(n), "bench"), decode_save_file),
+    Case("generate_pdf_html", lambda n: _state(n).story, generate_pdf_html),
+    Case("pil_to_bytes", lambda n: Image.new("RGB", (768, 512), "#3a2a1a"), pil_to_bytes, scales=False),
+    Case("generate_fallback_image", lambda n: "Scenă", lambda text: generate_fallback_image(text, False),
+         scales=False),
+]
+
+
+def measure(fn: Callable[[Any], Any], data: Any, min_time: float, repeat: int) -> float:
+    """Cel mai bun timp per apel (µs) din `repeat` runde de câte cel puțin `min_time` secunde"""
+    fn(data)  # încălzire (cache-uri, importuri leneșe)
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(data)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(data)
+        best = min(best, (time.perf_counter() - t0) / loops)
+    return best * 1e6
+
+
+def run_suite(sizes: List[int], only: Optional[List[str]], min_time: float, repeat: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for case in CASES:
+        if only and not any(word in case.name for word in only):
+            continue
+        for size in (sizes if case.scales else [0]):
+            key = f"{case.name}@{size}" if case.scales else f"{case.name}@-"
+            results[key] = measure(case.run, case.setup(size or 10), min_time, repeat)
+            print(f"  {key:<32} {format_us(results[key]):>10}", flush=True)
+    return results
+
+
+def format_us(us: float) -> str:
+    if us >= 1e6:
+        return f"{us / 1e6:.2f}s"
+    if us >= 1e3:
+        return f"{us / 1e3:.2f}ms"
+    return f"{us:.1f}µs"
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> int:
+    """Raportul față de baseline; întoarce numărul de regresii (mai lent decât `tolerance` x)"""
+    regressions = 0
+    print(f"\n{'caz':<32} {'acum':>10} {'baseline':>10} {'raport':>7}")
+    for key, now in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32} {format_us(now):>10} {'-':>10} {'-':>7}  nou")
+            continue
+        ratio = now / base if base else float("inf")
+        status = ""
+        if ratio > tolerance:
+            status = "❌ REGRESIE"
+            regressions += 1
+        elif ratio < 1 / tolerance:
+            status = "✅ mai rapid"
+        print(f"{key:<32} {format_us(now):>10} {format_us(base):>10} {ratio:>6.2f}x  {status}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark-uri offline pentru căile calde ale unei ture")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="lungimi de poveste (ture)")
+    ap.add_argument("--only", nargs="+", help="doar cazurile care conțin aceste cuvinte")
+    ap.add_argument("--min-time", type=float, default=0.1, help="durata minimă a unei runde (s)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--tolerance", type=float, default=1.3, help="raportul peste care un caz e regresie")
+    ap.add_argument("--save", action="store_true", help="scrie rezultatele ca baseline nou")
+    ap.add_argument("--json", help="scrie rezultatele (µs per apel) în acest fișier")
+    args = ap.parse_args()
+
+    print(f"▶️ Python {platform.python_version()} pe {platform.machine()}, ture: {args.sizes}")
+    results = run_suite(args.sizes, args.only, args.min_time, args.repeat)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                stored = json.load(f).get("results", {})
+        stored.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "saved_at": time.strftime("%Y-%m-%d %H:%M"),
+                "results": {k: round(v, 2) for k, v in sorted(stored.items())},
+            }, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"💾 Baseline salvat în {args.baseline} ({len(results)} cazuri)")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ Nu există baseline ({args.baseline}); rulează cu --save")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print(f"\n❌ {regressions} regresii peste {args.tolerance}x față de baseline ({baseline.get('saved_at')})")
+        sys.exit(1)
+    print(f"\n✅ Fără regresii peste {args.tolerance}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 # character.py - Character management system
 import random
 import re
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 import streamlit as st
+from keyword_engine import KeywordEngine, KeywordRule
+from models import Inventory, InventoryItem, ItemType
 
 class CharacterSheet:
     def __init__(self):
@@ -58,64 +60,77 @@ class CharacterSheet:
 def roll_dice(sides: int = 20) -> int:
     return random.randint(1, sides)
 
-def update_stats(character: Dict, action: str, response: str):
+# Tabelul de reguli: fiecare grup e un lanț if/elif, grupurile se evaluează în ordine
+STAT_RULES = [
+    KeywordRule("rep_major", "action", ["onor", "noblețe", "datorie", "curaj", "ajută"],
+                "reputation", +1, dice=10, bonus=2, message="👑 Reputație +{v}!", icon="⭐"),  # VALORI CRESCUTE
+    # Penalități mai severe
+    KeywordRule("rep_major", "action", ["trădare", "laș", "minciună", "furt", "amenință"],
+                "reputation", -1, dice=10, bonus=3, message="👑 Reputație -{v}!", icon="⬇️"),
+    KeywordRule("health", "response", ["rănit", "sânge", "atac", "răni", "durere", "te pierzi", "cazi"],
+                "health", -1, dice=10, message="💔 Ai pierdut {v} puncte de viață!", icon="⚔️"),
+    KeywordRule("health", "response", ["vindecat", "odihnă", "sigur", "refăcut", "te simți mai bine"],
+                "health", +1, dice=8, message="❤️ Te-ai vindecat cu {v} puncte!", icon="✨"),
+    KeywordRule("rep_minor", "action", ["onor", "noblețe", "datorie", "curaj", "ajută", "protejează", "nobil"],
+                "reputation", +1, dice=6, message="👑 Reputație +{v}!", icon="⭐"),
+    KeywordRule("rep_minor", "action", ["trădare", "laș", "minciună", "furt", "amenință", "ucide"],
+                "reputation", -1, dice=6, message="👑 Reputație -{v}!", icon="⬇️"),
+]
+# Cuvintele care declanșează căutările regex (obiecte, galbeni) - detectate în aceeași trecere
+_stat_engine = KeywordEngine(STAT_RULES, extra_words={"response": ["primești", "găsește"]})
+_RECEIVED_ITEM_RE = re.compile(r'primești (?:un|o|unui|niște) ([\w\s]+)')
+_GOLD_RE = re.compile(r'(\d+)\s*galben[i]')
+_FOUND_ITEM_RE = re.compile(r'primești (?:un|o|niște) ([\w\s\-]+)')
+
+def _has_item(inventory, name: str) -> bool:
+    """Inventory caută în indexul după nume; lista veche (nume simple sau dicționare) se scanează până la prima potrivire"""
+    if isinstance(inventory, Inventory):
+        return name in inventory
+    return any((item["name"] if isinstance(item, dict) else item) == name for item in inventory)
+
+def _add_item(inventory, name: str, legacy_entry):
+    if isinstance(inventory, Inventory):
+        inventory.add(InventoryItem(name=name, type=ItemType.misc))
+    else:
+        inventory.append(legacy_entry)
+
+def update_stats(character: Dict, action: str, response: str, notify: Optional[Callable] = None):
+    notify = notify or st.toast
     action_lower = action.lower()
     response_lower = response.lower()
-    if any(word in action_lower for word in ["onor", "noblețe", "datorie", "curaj", "ajută"]):
-        rep_gain = roll_dice(10) + 2  # VALORI CRESCUTE
-        character["reputation"] = min(100, character["reputation"] + rep_gain)
-        st.toast(f"👑 Reputație +{rep_gain}!", icon="⭐")
-    
-    # Penalități mai severe
-    elif any(word in action_lower for word in ["trădare", "laș", "minciună", "furt", "amenință"]):
-        rep_loss = roll_dice(10) + 3
-        character["reputation"] = max(0, character["reputation"] - rep_loss)
-        st.toast(f"👑 Reputație -{rep_loss}!", icon="⬇️")
-    if any(word in response_lower for word in ["rănit", "sânge", "atac", "răni", "durere", "te pierzi", "cazi"]):
-        damage = roll_dice(10)
-        character["health"] = max(0, character["health"] - damage)
-        st.toast(f"💔 Ai pierdut {damage} puncte de viață!", icon="⚔️")
-    elif any(word in response_lower for word in ["vindecat", "odihnă", "sigur", "refăcut", "te simți mai bine"]):
-        heal = roll_dice(8)
-        character["health"] = min(100, character["health"] + heal)
-        st.toast(f"❤️ Te-ai vindecat cu {heal} puncte!", icon="✨")
-    if any(word in action_lower for word in ["onor", "noblețe", "datorie", "curaj", "ajută", "protejează", "nobil"]):
-        rep_gain = roll_dice(6)
-        character["reputation"] = min(100, character["reputation"] + rep_gain)
-        st.toast(f"👑 Reputație +{rep_gain}!", icon="⭐")
-    elif any(word in action_lower for word in ["trădare", "laș", "minciună", "furt", "amenință", "ucide"]):
-        rep_loss = roll_dice(6)
-        character["reputation"] = max(0, character["reputation"] - rep_loss)
-        st.toast(f"👑 Reputație -{rep_loss}!", icon="⬇️")
+    hits = _stat_engine.scan({"action": action_lower, "response": response_lower})
+    for rule in _stat_engine.match(hits):
+        value = roll_dice(rule.dice) + rule.bonus
+        character[rule.stat] = max(0, min(100, character[rule.stat] + rule.sign * value))
+        notify(rule.message.format(v=value), icon=rule.icon)
     # RESTRICȚIE PUTERNICĂ: Vlad Țepeș este invincibil
     # if "vlad" in response_lower and ("înfrânt" in response_lower or "învins" in response_lower):
     #     character["health"] = 0
     #     st.toast("💀 AI ÎNDRĂZNIT SĂ-L ÎNFRUNȚI PE VLAD?! MOARTE INSTANTANEE!", icon="☠️")
-    if "primești" in response_lower:
-        item_match = re.search(r'primești (?:un|o|unui|niște) ([\w\s]+)', response_lower)
+    if "primești" in hits["response"]:
+        item_match = _RECEIVED_ITEM_RE.search(response_lower)
         if item_match:
             new_item = item_match.group(1).strip()
-            if new_item not in character["inventory"]:
-                character["inventory"].append(new_item)
-                st.toast(f"🎒 Obiect nou: {new_item}!", icon="📦")
-    if "găsește" in response_lower or "primești" in response_lower:
+            if not _has_item(character["inventory"], new_item):
+                _add_item(character["inventory"], new_item, new_item)
+                notify(f"🎒 Obiect nou: {new_item}!", icon="📦")
+    if "găsește" in hits["response"] or "primești" in hits["response"]:
         # Gold pattern
-        gold_match = re.search(r'(\d+)\s*galben[i]', response_lower)
+        gold_match = _GOLD_RE.search(response_lower)
         if gold_match:
             gold_amount = int(gold_match.group(1))
             character["gold"] = character.get("gold", 0) + gold_amount
-            st.toast(f"💰 +{gold_amount} galbeni!", icon="🪙")
+            notify(f"💰 +{gold_amount} galbeni!", icon="🪙")
         
         # Item pattern
-        item_match = re.search(r'primești (?:un|o|niște) ([\w\s\-]+)', response_lower)
+        item_match = _FOUND_ITEM_RE.search(response_lower)
         if item_match:
             new_item = item_match.group(1).strip()
             # Evităm duplicatele
-            existing_names = [item["name"] for item in character["inventory"]]
-            if new_item not in existing_names:
-                character["inventory"].append({
+            if not _has_item(character["inventory"], new_item):
+                _add_item(character["inventory"], new_item, {
                     "name": new_item,
                     "type": "obiect",
                     "value": 0
                 })
-                st.toast(f"🎒 Obiect nou: {new_item}!", icon="📦")
\ No newline at end of file
+                notify(f"🎒 Obiect nou: {new_item}!", icon="📦")
\ No newline at end of file
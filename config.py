@@ -1,13 +1,110 @@
 # config.py - Model Router & Romanian-Aware Configuration
 import re
-import streamlit as st
-from typing import List, Dict, Any
-from deep_translator import GoogleTranslator
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import json
+import math
 import random
-import requests
+import threading
+import time
+from collections import deque
 from models import NarrativeResponse
 
+# ========== fragmente de prompt (construite o singură dată, la import) ==========
+# Propoziții istorice
+HISTORICAL_SENTENCES = (
+    "Prin forță și teroare, a restabilit ordinea internă și a consolidat autoritatea domnească.",
+    "Cetățile de la poalele Carpaților au fost întărite sub domnia lui, pentru a apăra țara de invazii.",
+    "Metodele sale dure i-au adus atât respect, cât și teamă în rândul dușmanilor și al supușilor.",
+    "A impus În țară o ordine strictă, pedepsind aspru hoția și nelegiuirea.",
+    "Cronici vechi îl descriu ca pe un strateg necruțător, dar drept.",
+)
+
+# Propoziții legendare
+LEGENDARY_SENTENCES = (
+    "Se spune că umbrele nopții prindeau viață în prezența lui.",
+    "Bătrânii șoptesc că putea chema creaturi ascunse în bezna pădurilor.",
+    "Legenda afirmă că aerul se răcea brusc când Vlad se mânia.",
+    "Unii credeau că străvechi spirite îl protejau în luptă.",
+    "Se povestește că sângele dușmanilor îi întărea puterea.",
+)
+
+INTRO_HEADER = "Vlad Țepeș Drăculea, domn al Țării Românești. "
+
+STYLE_STRICT = "Stil STRICT ISTORIC. Fără magie, fără creaturi fantastice. "
+STYLE_LEGENDARY = "Stil LEGENDAR VAMPIRIC. Umbre, mister, folklore întunecat. "
+STYLE_BALANCED = "Stil echilibrat istoric și legendar. "
+
+RESTRICTION_LOW = "Jucătorul are reputație FOARTE JOSĂ. Este tratat cu suspiciune. Nu poate intra în audiență la boieri. "
+RESTRICTION_MEDIUM = "Jucătorul are reputație MEDIE. Poate interacționa cu negustori și soldați, dar nu cu înalta nobilime. "
+RESTRICTION_HIGH = "Jucătorul are reputație BUNĂ. Poate cere audiențe, dar ȚEPEȘ este INACCESIBIL direct fără motiv întemeiat. "
+
+# Regulile + schema JSON: identice la fiecare tură, deci schema se randează o singură dată
+PROMPT_RULES = (
+    "REGULI OBLIGATORII:\n"
+    "- 'narrative': 2-3 propoziții, fără greșeli gramaticale, în română medievală\n"
+    "- 'suggestions': Listă de EXACT 2-3 string-uri, fără numere, fără bullet points\n"
+    "  EXEMPLU: [\"Cere audiență la curte.\", \"Caută informații în târg.\", \"Explorezi adâncul pădurii.\"]\n"
+    "- Respectă gramatica: 'unei păsări', 'unor boieri', nu 'unui păsări'\n"
+    "VLAD ȚEPEȘ NU POATE FI ÎNVINS – orice tentativă = game_over instant\n"
+    "Reputația sub 20 = nu poți interacționa cu nobilii\n\n"
+    "Răspunde STRICT în format JSON conform schemei:\n"
+    "STRICT JSON SCHEMA:\n"
+    f"```json\n{NarrativeResponse.model_json_schema()}\n```\n"
+)
+
+
+def _compute_intro_counts(scale: float):
+    # Transformăm scale într-un raport 0-1; număr de propoziții istorice vs legendare
+    ratio = min(max(scale / 10.0, 0), 1)
+    return max(1, int((1 - ratio) * 3)), max(1, int(ratio * 3))
+
+
+def _compute_style_prefix(legend_scale: float) -> str:
+    ratio = legend_scale / 10.0
+    if ratio < 0.3:
+        return STYLE_STRICT
+    if ratio > 0.7:
+        return STYLE_LEGENDARY
+    return STYLE_BALANCED
+
+
+def _compute_reputation_band(reputation: int):
+    """(puterea afișată, restricțiile) pentru o reputație"""
+    power_desc = 'SLABĂ'
+    if reputation >= 60: power_desc = 'CRESCUTĂ'
+    elif reputation >= 30: power_desc = 'MEDIE'
+    if reputation < 20:
+        return power_desc, RESTRICTION_LOW
+    if reputation < 50:
+        return power_desc, RESTRICTION_MEDIUM
+    return power_desc, RESTRICTION_HIGH
+
+
+# Slider-ul de legendă e 0..10 și reputația 0..100 (CharacterStats): tabele indexate direct
+_INTRO_COUNTS = tuple(_compute_intro_counts(s) for s in range(11))
+_STYLE_PREFIXES = tuple(_compute_style_prefix(s) for s in range(11))
+_REPUTATION_BANDS = tuple(_compute_reputation_band(r) for r in range(101))
+
+
+def _intro_counts(scale):
+    if type(scale) is int and 0 <= scale <= 10:
+        return _INTRO_COUNTS[scale]
+    return _compute_intro_counts(scale)
+
+
+def _style_prefix(legend_scale) -> str:
+    if type(legend_scale) is int and 0 <= legend_scale <= 10:
+        return _STYLE_PREFIXES[legend_scale]
+    return _compute_style_prefix(legend_scale)
+
+
+def _reputation_band(reputation):
+    if type(reputation) is int and 0 <= reputation <= 100:
+        return _REPUTATION_BANDS[reputation]
+    return _compute_reputation_band(reputation)
+
+
 class Config:
     """Central configuration with Romanian-optimized models"""
 
@@ -19,182 +116,182 @@ class Config:
     ]
     LOCAL_MODEL = "EleutherAI/gpt-neo-1.3B"
 
+    # Backend local (fallback): încărcat la pornirea procesului, nu la prima tură
+    LOCAL_FALLBACK_MODEL = os.getenv("LOCAL_FALLBACK_MODEL", "distilgpt2")
+    LOCAL_WARM_START = os.getenv("LOCAL_WARM_START", "1") == "1"
+    LOCAL_QUANTIZE_INT8 = os.getenv("LOCAL_QUANTIZE_INT8", "1") == "1"
+    LOCAL_MAX_BATCH = int(os.getenv("LOCAL_MAX_BATCH", "8"))
+    LOCAL_BATCH_WAIT_MS = int(os.getenv("LOCAL_BATCH_WAIT_MS", "25"))
+    LOCAL_MAX_INPUT_TOKENS = 512
+    LOCAL_MAX_NEW_TOKENS = 80
+    # KV cache per sesiune pentru prefixul comun între ture (0 = dezactivat)
+    LOCAL_KV_CACHE_MB = int(os.getenv("LOCAL_KV_CACHE_MB", "256"))
+    LOCAL_KV_MIN_PREFIX = 16
+
     IMAGE_MODEL = "stabilityai/stable-diffusion-2-1"
     IMAGE_INTERVAL = 3
+    # Cadența adaptivă (image_scheduler): intervalul crește cu coada și latența generării
+    IMAGE_MAX_INTERVAL = int(os.getenv("IMAGE_MAX_INTERVAL", "12"))
+    IMAGE_CAPACITY = int(os.getenv("IMAGE_CAPACITY", "4"))  # joburi în coadă/în lucru suportate fără încetinire
+    IMAGE_TARGET_LATENCY = float(os.getenv("IMAGE_TARGET_LATENCY", "20"))  # secunde per imagine
+    IMAGE_STALE_TURNS = int(os.getenv("IMAGE_STALE_TURNS", "3"))  # joburi mai vechi se aruncă
     IMAGE_NEGATIVE = "modern, cartoon, anime, text, watermark, lowres, blurry, extra limbs"
+    # Imagini progresive: schiță rapidă atașată imediat, înlocuită de randarea finală
+    IMAGE_PROGRESSIVE = os.getenv("IMAGE_PROGRESSIVE", "1") == "1"
+    IMAGE_DRAFT_STEPS = int(os.getenv("IMAGE_DRAFT_STEPS", "8"))
+    IMAGE_FINAL_STEPS = int(os.getenv("IMAGE_FINAL_STEPS", "30"))
+    IMAGE_DRAFT_WIDTH = int(os.getenv("IMAGE_DRAFT_WIDTH", "576"))
+    IMAGE_DRAFT_HEIGHT = int(os.getenv("IMAGE_DRAFT_HEIGHT", "384"))
+    # Cache semantic de scene: aceeași locație + termeni asemănători (Jaccard) → imaginea existentă
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(".cache", "scenes"))
+    IMAGE_CACHE_SIMILARITY = float(os.getenv("IMAGE_CACHE_SIMILARITY", "0.6"))  # > 1 = dezactivat
+    IMAGE_CACHE_MAX_FILES = int(os.getenv("IMAGE_CACHE_MAX_FILES", "500"))
+
+    # Cache persistent pentru prompturi de imagine și traduceri (partajat între procese)
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(".cache", "responses.sqlite3"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    TRANSLATION_CACHE_TTL = 30 * 24 * 3600
+    IMAGE_PROMPT_CACHE_TTL = 7 * 24 * 3600
+
+    # Starea sesiunilor în afara procesului: file | sqlite | redis://host:port/db | none
+    SESSION_STORE = os.getenv("SESSION_STORE", "file")
+    SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(".sessions"))
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(".sessions", "sessions.sqlite3"))
+    SESSION_TTL = 7 * 24 * 3600
+    # Sesiunile inactive sunt marcate și evacuate în store de fragmentul lor periodic (session_memory); 0 = niciodată
+    SESSION_IDLE_EVICT = int(os.getenv("SESSION_IDLE_EVICT", "900"))
+    SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+    # Fișierele de salvare încărcate (save_loader): limite verificate în timpul citirii
+    SAVE_MAX_BYTES = int(float(os.getenv("SAVE_MAX_MB", "300")) * 1_000_000)
+    SAVE_MAX_TURNS = int(os.getenv("SAVE_MAX_TURNS", "5000"))
+    SAVE_MAX_IMAGE_BYTES = int(float(os.getenv("SAVE_MAX_IMAGE_MB", "20")) * 1_000_000)
+    JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "25"))
+
+    # Pool de procese pentru munca CPU din ture (PNG, base64, validare); 0 = totul inline
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+    WORKER_START_METHOD = os.getenv("WORKER_START_METHOD", "forkserver")
+    WORKER_JOB_TIMEOUT = 60
+
+    # Export PDF în fundal, cu cache pe disc după (hash poveste, tură)
+    PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(".cache", "pdf"))
+    PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "50"))
+    PDF_RENDER_TIMEOUT = 600
+    # Randări PDF simultane în pool: restul procesoarelor rămân pentru joburile scurte ale turelor
+    PDF_MAX_CONCURRENT = int(os.getenv("PDF_MAX_CONCURRENT", "1"))
+
+    # Fereastra de context a promptului: replicile recente care încap în buget (tokeni)
+    PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "700"))
+    PROMPT_CONTEXT_MAX_MESSAGES = int(os.getenv("PROMPT_CONTEXT_MAX_MESSAGES", "12"))
+    PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", LOCAL_FALLBACK_MODEL)  # "none" = doar euristica
+
+    # Importurile grele (torch/transformers, traducere, clientul HF) nu mai blochează pornirea:
+    # se fac la prima folosire sau în fundal, după prima pagină servită
+    PREWARM = os.getenv("PREWARM", "1") == "1"
+    PREWARM_MODULES = tuple(
+        m for m in os.getenv("PREWARM_MODULES", "deep_translator,huggingface_hub,local_backend").split(",") if m
+    )
+
+    # Cereri LLM identice (sesiune, tură, prompt) în zbor sunt partajate; rezultatul mai rămâne N secunde
+    LLM_DEDUP_LINGER = float(os.getenv("LLM_DEDUP_LINGER", "15"))
+    # Pool-ul de chei Groq (groq_pool): clasele inferioare lasă cota pentru tura jucătorului
+    GROQ_RESERVE_IMAGE = float(os.getenv("GROQ_RESERVE_IMAGE", "0.25"))  # cotă minimă rămasă pe cheie
+    GROQ_RESERVE_BACKGROUND = float(os.getenv("GROQ_RESERVE_BACKGROUND", "0.5"))
+    GROQ_COOLDOWN = float(os.getenv("GROQ_COOLDOWN", "10"))  # după 429 fără Retry-After
+    GROQ_INTERACTIVE_WAIT = float(os.getenv("GROQ_INTERACTIVE_WAIT", "10"))  # toate cheile în răcire
+    # Router de modele Groq (ModelRouter): per clasă de sarcină, modelul principal apoi alternativele mai rapide.
+    # O sarcină necunoscută (sau cu lista goală) folosește ruta și ținta lui "narrative".
+    MODEL_ROUTES = {
+        "narrative": os.getenv("MODEL_NARRATIVE", "llama-3.3-70b-versatile,llama-3.1-8b-instant").split(","),
+        "short_reply": os.getenv("MODEL_SHORT_REPLY", "llama-3.1-8b-instant,llama-3.3-70b-versatile").split(","),
+        "image_prompt": os.getenv("MODEL_IMAGE_PROMPT", "llama-3.1-8b-instant,llama-3.3-70b-versatile").split(","),
+        "summary": os.getenv("MODEL_SUMMARY", "llama-3.1-8b-instant,llama-3.3-70b-versatile").split(","),
+    }
+    MODEL_TARGET_P95 = {  # secunde; peste ținta asta modelul principal cedează următorului
+        "narrative": float(os.getenv("MODEL_P95_NARRATIVE", "8")),
+        "short_reply": float(os.getenv("MODEL_P95_SHORT_REPLY", "3")),
+        "image_prompt": float(os.getenv("MODEL_P95_IMAGE_PROMPT", "3")),
+        "summary": float(os.getenv("MODEL_P95_SUMMARY", "10")),
+    }
+    MODEL_WINDOW = int(os.getenv("MODEL_WINDOW", "50"))  # ultimele N apeluri per model...
+    MODEL_WINDOW_SECONDS = float(os.getenv("MODEL_WINDOW_SECONDS", "300"))  # ...din ultimele N secunde
+    MODEL_MIN_SAMPLES = 5
+    MODEL_MAX_ERROR_RATE = float(os.getenv("MODEL_MAX_ERROR_RATE", "0.3"))
+    MODEL_PROBE_EVERY = int(os.getenv("MODEL_PROBE_EVERY", "10"))  # 1 din N cereri re-testează principalul
+    # Doar abaterile de la principal (failover, probe) ajung în jurnal; rotit la MODEL_ROUTE_LOG_MAX_KB
+    MODEL_ROUTE_LOG = os.getenv("MODEL_ROUTE_LOG", os.path.join(".cache", "routes.jsonl"))  # "" = fără jurnal
+    MODEL_ROUTE_LOG_MAX_KB = int(os.getenv("MODEL_ROUTE_LOG_MAX_KB", "1024"))
+    # Narațiune audio (narration): gtts | elevenlabs | offline (ton local, pentru teste) | none
+    TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+    TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "ro")
+    TTS_VOICE = os.getenv("TTS_VOICE", "")  # ElevenLabs: voice_id ("" = vocea implicită)
+    TTS_ELEVENLABS_MODEL = os.getenv("TTS_ELEVENLABS_MODEL", "eleven_multilingual_v2")
+    TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))  # propoziții sintetizate în paralel (per proces)
+    TTS_SEGMENT_TIMEOUT = float(os.getenv("TTS_SEGMENT_TIMEOUT", "15"))  # o propoziție mai lentă se sare
+    TTS_POLL_INTERVAL = float(os.getenv("TTS_POLL_INTERVAL", "0.5"))  # secunde între verificările UI-ului
+    TTS_MAX_SENTENCE_CHARS = int(os.getenv("TTS_MAX_SENTENCE_CHARS", "250"))
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "audio"))
+    TTS_CACHE_MAX_FILES = int(os.getenv("TTS_CACHE_MAX_FILES", "2000"))
     
 
     @staticmethod
     def make_intro_text(scale: int) -> str:
-        # Propoziții istorice
-        historical_sentences = [
-            "Prin forță și teroare, a restabilit ordinea internă și a consolidat autoritatea domnească.",
-            "Cetățile de la poalele Carpaților au fost întărite sub domnia lui, pentru a apăra țara de invazii.",
-            "Metodele sale dure i-au adus atât respect, cât și teamă în rândul dușmanilor și al supușilor.",
-            "A impus În țară o ordine strictă, pedepsind aspru hoția și nelegiuirea.",
-            "Cronici vechi îl descriu ca pe un strateg necruțător, dar drept."
-        ]
-
-        # Propoziții legendare
-        legendary_sentences = [
-            "Se spune că umbrele nopții prindeau viață în prezența lui.",
-            "Bătrânii șoptesc că putea chema creaturi ascunse în bezna pădurilor.",
-            "Legenda afirmă că aerul se răcea brusc când Vlad se mânia.",
-            "Unii credeau că străvechi spirite îl protejau în luptă.",
-            "Se povestește că sângele dușmanilor îi întărea puterea."
-        ]
-
-        # Transformăm scale într-un raport 0-1
-        ratio = min(max(scale / 10.0, 0), 1)
-
-        # Număr de propoziții istorice vs legendare
-        num_hist = max(1, int((1 - ratio) * 3))  
-        num_leg = max(1, int(ratio * 3))         
-
-        # Alegem propoziții random
-        chosen_hist = random.sample(historical_sentences, num_hist)
-        chosen_leg = random.sample(legendary_sentences, num_leg)
-
-        # Le mixăm
-        mixed_sentences = chosen_hist + chosen_leg
-        random.shuffle(mixed_sentences)
+        # Câte propoziții istorice vs legendare: precalculat pe scară (vezi _INTRO_COUNTS)
+        num_hist, num_leg = _intro_counts(scale)
 
-        mixed_text = " ".join(mixed_sentences)
+        # Alegem propoziții random și le mixăm
+        mixed_sentences = random.sample(HISTORICAL_SENTENCES, num_hist) + random.sample(LEGENDARY_SENTENCES, num_leg)
+        random.shuffle(mixed_sentences)
 
         # Intro narativ
-        return (
-        "Vlad Țepeș Drăculea, domn al Țării Românești. "
-        + mixed_text
-        + "\n\n"        
-        )
+        return INTRO_HEADER + " ".join(mixed_sentences) + "\n\n"
 
     @staticmethod
-    def build_dnd_prompt(story: List[Dict], character: Dict, legend_scale: int = 5) -> str:
-        """Construiește prompt pentru LLM folosind structuri de date simple (dict/list)"""
-        from models import NarrativeResponse # Import local
-        
-        # Calcul raport legend vs istoric
-        ratio = legend_scale / 10.0
-        
-        # Selectare prefix stil
-        if ratio < 0.3:
-            style_prefix = "Stil STRICT ISTORIC. Fără magie, fără creaturi fantastice. "
-        elif ratio > 0.7:
-            style_prefix = "Stil LEGENDAR VAMPIRIC. Umbre, mister, folklore întunecat. "
-        else:
-            style_prefix = "Stil echilibrat istoric și legendar. "
-        
-        # Construire context narativ din ultimele replici
-        context = "\n".join([f"{m['role'].upper()}: {m['text']}" for m in story[-4:]])
-        
-        # Construire Info caracter (Accesăm prin CHEI de dicționar ['key'], nu prin punct .attr)
+    def build_dnd_prompt(story: List[Dict], character: Dict, legend_scale: int = 5,
+                         stats: Optional[Dict] = None) -> str:
+        """
+        Construiește prompt pentru LLM din fragmentele precalculate la import: variază doar
+        contextul (replicile recente care încap în PROMPT_CONTEXT_TOKENS) și statisticile.
+        Dacă primește `stats`, îl completează cu mărimea promptului (tokeni, replici incluse).
+        """
+        from prompt_context import assemble_context, count_tokens, get_prompt_stats  # import local: ciclu cu config
+
+        context, info = assemble_context(story)
+
         # Verificăm existența cheilor cu .get() pentru siguranță
-        char_health = character.get('health', 100)
         char_rep = character.get('reputation', 20)
-        char_gold = character.get('gold', 0)
-        char_loc = character.get('location', 'Târgoviște')
-        
-        power_desc = 'SLABĂ'
-        if char_rep >= 60: power_desc = 'CRESCUTĂ'
-        elif char_rep >= 30: power_desc = 'MEDIE'
-
-        char_info = (
-            f"\n\nSTATISTICI CRITICE: Viață={char_health} | "
-            f"Reputație={char_rep} | "
-            f"Locație={char_loc} | "
-            f"Galbeni={char_gold} | "
-            f"Puterea ta este {power_desc}\n"
-        )
-        
-        # Restricții bazate pe reputație
-        restrictions = ""
-        if char_rep < 20:
-            restrictions = "Jucătorul are reputație FOARTE JOSĂ. Este tratat cu suspiciune. Nu poate intra în audiență la boieri. "
-        elif char_rep < 50:
-            restrictions = "Jucătorul are reputație MEDIE. Poate interacționa cu negustori și soldați, dar nu cu înalta nobilime. "
-        else:
-            restrictions = "Jucătorul are reputație BUNĂ. Poate cere audiențe, dar ȚEPEȘ este INACCESIBIL direct fără motiv întemeiat. "
-        
-        # Schema JSON
-        schema = NarrativeResponse.model_json_schema()
-        
-        # Construire instrucțiuni finale
-        instructions = (
-            f"\n{style_prefix}{restrictions}"            
-            "REGULI OBLIGATORII:\n"
-            "- 'narrative': 2-3 propoziții, fără greșeli gramaticale, în română medievală\n"
-            "- 'suggestions': Listă de EXACT 2-3 string-uri, fără numere, fără bullet points\n"
-            "  EXEMPLU: [\"Cere audiență la curte.\", \"Caută informații în târg.\", \"Explorezi adâncul pădurii.\"]\n"
-            "- Respectă gramatica: 'unei păsări', 'unor boieri', nu 'unui păsări'\n"
-            "VLAD ȚEPEȘ NU POATE FI ÎNVINS – orice tentativă = game_over instant\n"
-            "Reputația sub 20 = nu poți interacționa cu nobilii\n\n"
-            f"Răspunde STRICT în format JSON conform schemei:\n"
-            f"STRICT JSON SCHEMA:\n"
-            f"```json\n{schema}\n```\n"
-        )
-    
-        return context + char_info + instructions
-    
+        power_desc, restrictions = _reputation_band(char_rep)
+
+        turn_part = "".join((
+            "\n\nSTATISTICI CRITICE: Viață=", str(character.get('health', 100)),
+            " | Reputație=", str(char_rep),
+            " | Locație=", str(character.get('location', 'Târgoviște')),
+            " | Galbeni=", str(character.get('gold', 0)),
+            " | Puterea ta este ", power_desc, "\n",
+            "\n", _style_prefix(legend_scale), restrictions,
+        ))
+        info["prompt_tokens"] = info["context_tokens"] + count_tokens(turn_part) + count_tokens(PROMPT_RULES)
+        get_prompt_stats().record(info)
+        if stats is not None:
+            stats.update(info)
+        return context + turn_part + PROMPT_RULES
+
     @staticmethod
-    def generate_image_prompt_llm(text: str, location: str) -> str:
-        """Generează prompt pentru Stable Diffusion folosind LLM"""
-        token = os.getenv("GROQ_API_KEY") or st.secrets.get("GROQ_API_KEY", "")
-        if not token:
-            return Config.generate_image_prompt(text, location)
+    def translate_to_english(text: str) -> str:
+        """Traduce textul românesc în engleză pentru Stable Diffusion (cu cache persistent)"""
+        from response_cache import get_response_cache, normalize_key
 
-        system = (
-            "You are an assistant that writes short, highly detailed prompts "
-            "for Stable-Diffusion in English. "
-            "Include: time of day, number of people, context, weather, camera angle, lighting style. "
-            "Keep it under 200 characters. DO NOT include object names like 'candle'. "
-            "Describe LIGHTING EFFECTS only: 'warm dim lighting', 'soft glow', 'moonlight'."
-        )
+        def translate() -> Optional[str]:
+            try:
+                return _get_translator().translate(text)
+            except Exception as e:
+                print(f"⚠️ Eroare traducere: {e}")
+                return None  # nu memorăm eșecurile
 
-        user = (
-            f"Story fragment: {text}\n"
-            f"Exact place: {location}\n"
-            "Write one English Stable-Diffusion prompt with lighting effects, no objects."
+        translated = get_response_cache().get_or_compute(
+            "translate_ro_en", normalize_key(text), translate, Config.TRANSLATION_CACHE_TTL
         )
+        return translated or text  # Fallback la română
 
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user}
-            ],
-            "temperature": 0.75,
-            "max_tokens": 60,
-            "stream": False
-        }
-
-        try:
-            r = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=15
-            )
-            r.raise_for_status()
-            llm_prompt = r.json()["choices"][0]["message"]["content"].strip()
-            llm_prompt = llm_prompt.replace('"', '')
-            if llm_prompt.endswith('.'):
-                llm_prompt = llm_prompt[:-1]
-            
-            # Prompt final cu descriere de iluminare, nu obiecte
-            prompt = (
-                f"Romanian medieval Wallachia 1456, Vlad Tepes era, atmospheric, "
-                f"dark fantasy, {llm_prompt}, highly detailed, oil-on-canvas, "
-                f"warm dim lighting, soft orange glow, deep shadows, 4k, vintage parchment look"
-            )
-            return prompt
-        except Exception as e:
-            print("LLM image-prompt failed:", e)
-            # Fallback la metoda veche
-            return Config.generate_image_prompt(text, location)
-        
     @staticmethod
     def generate_image_prompt(text: str, location: str) -> str:
         # Extragem ultimele 3 propoziții sau primele 150 caractere
@@ -202,16 +299,9 @@ class Config:
         if len(short) < 20:
             short = text[:150]
 
-        def translate_to_english(text: str) -> str:
-            """Traduce textul românesc în engleză pentru Stable Diffusion"""
-            try:        
-                return GoogleTranslator(source='ro', target='en').translate(text)
-            except Exception as e:
-                print(f"⚠️ Eroare traducere: {e}")
-                return text  # Fallback la română
-        # **TRADUCERE în engleză**
-        short_en = translate_to_english(short)
-        location_en = translate_to_english(location)
+        # **TRADUCERE în engleză** (locația se repetă aproape mereu → cache)
+        short_en = Config.translate_to_english(short)
+        location_en = Config.translate_to_english(location)
         
         # Construim promptul în engleză
         prompt = (
@@ -229,10 +319,13 @@ class Config:
         Stable-Diffusion prompt in English, grounded in the *exact* place
         and current narrative moment.
         """
-        token = os.getenv("GROQ_API_KEY") or st.secrets.get("GROQ_API_KEY", "")
-        if not token:
-            # fallback to old method if somehow no key
-            return Config.generate_image_prompt(text, location)
+        from response_cache import get_response_cache, normalize_key
+
+        cache = get_response_cache()
+        cache_key = normalize_key(text, location)
+        cached = cache.get("image_prompt_llm", cache_key)
+        if cached is not None:
+            return cached
 
         system = (
             "You are an assistant that writes short, highly detailed prompts "
@@ -248,7 +341,7 @@ class Config:
         )
 
         payload = {
-            "model": "llama-3.3-70b-versatile",
+            "model": get_model_router().choose("image_prompt"),
             "messages": [
                 {"role": "system", "content": system},
                 {"role": "user", "content": user}
@@ -258,18 +351,14 @@ class Config:
             "stream": False
         }
 
+        # Prin pool-ul comun, clasa IMAGE: cedează cota turelor interactive când cheile sunt solicitate
+        from groq_pool import Priority, get_groq_pool
         try:
-            r = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=15
-            )
-            r.raise_for_status()
-            llm_prompt = r.json()["choices"][0]["message"]["content"].strip()
+            llm_prompt = get_groq_pool().chat(payload, Priority.IMAGE, timeout=15)
+            if llm_prompt is None:
+                # fără chei / cotă rezervată jucătorilor → metoda veche
+                return Config.generate_image_prompt(text, location)
+            llm_prompt = llm_prompt.strip()
             # 🔧 CLEAN: remove quotes and trailing period
             llm_prompt = llm_prompt.replace('"', '')
             if llm_prompt.endswith('.'):
@@ -279,6 +368,7 @@ class Config:
             f"dark fantasy, {llm_prompt}, highly detailed, oil-on-canvas, "
             f"warm dim lighting, deep shadows, 4k, vintage parchment look"
         )
+            cache.set("image_prompt_llm", cache_key, prompt, Config.IMAGE_PROMPT_CACHE_TTL)
             return prompt
         except Exception as e:
             print("LLM image-prompt failed:", e)
@@ -286,13 +376,188 @@ class Config:
             return Config.generate_image_prompt(text, location)
 
 
+_translator_local = threading.local()  # deep_translator.GoogleTranslator per fir, creat la prima traducere
+
+def _get_translator():
+    """
+    Un GoogleTranslator per fir, nu unul nou la fiecare imagine. Nu unul per proces:
+    translate() pune textul pe instanță înainte de cerere, deci firele de imagine
+    din sesiuni diferite și-ar putea schimba textele (și traducerea greșită ar ajunge în cache).
+    """
+    translator = getattr(_translator_local, "translator", None)
+    if translator is None:
+        from deep_translator import GoogleTranslator  # import leneș (vezi prewarm)
+
+        translator = _translator_local.translator = GoogleTranslator(source='ro', target='en')
+    return translator
+
+
+class ModelStats:
+    """
+    Apelurile recente ale unui model: cel mult `window` și nu mai vechi de `max_age` secunde,
+    ca un model lent doar o vreme să-și refacă statisticile și fără trafic (prin expirare)
+    """
+    __slots__ = ("samples", "max_age")
+
+    def __init__(self, window: int, max_age: float):
+        self.samples = deque(maxlen=window)  # (momentul, reușit, latența)
+        self.max_age = max_age
+
+    def prune(self, now: float):
+        cutoff = now - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        latencies = sorted(seconds for _, ok, seconds in self.samples if ok)
+        if len(latencies) < min_samples:
+            return None
+        return latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)]
+
+    def error_rate(self, min_samples: int) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        return sum(1 for _, ok, _ in self.samples if not ok) / len(self.samples)
+
+
 class ModelRouter:
-    def __init__(self):
-        self.api_models = Config.FALLBACK_API_MODELS.copy()
-        self.api_models.insert(0, Config.PRIMARY_API_MODEL)
-        self.current_api_index = 0
-
-    def get_next_api_model(self) -> str:
-        model = self.api_models[self.current_api_index]
-        self.current_api_index = (self.current_api_index + 1) % len(self.api_models)
-        return model
\ No newline at end of file
+    """
+    Alege modelul Groq per clasă de sarcină (Config.MODEL_ROUTES: principal, apoi alternative).
+    Principalul rămâne ales cât timp p95 al latenței e sub țintă și rata de erori e sub prag;
+    altfel se trece la primul model sănătos din listă. O cerere din MODEL_PROBE_EVERY merge
+    tot la principal, iar apelurile mai vechi de MODEL_WINDOW_SECONDS expiră, deci o încetinire
+    scurtă nu ține failover-ul la nesfârșit. Abaterile de la principal ajung în MODEL_ROUTE_LOG (JSONL).
+    """
+
+    def __init__(self, routes: Optional[Dict[str, List[str]]] = None,
+                 targets: Optional[Dict[str, float]] = None,
+                 window: int = Config.MODEL_WINDOW,
+                 window_seconds: float = Config.MODEL_WINDOW_SECONDS,
+                 min_samples: int = Config.MODEL_MIN_SAMPLES,
+                 max_error_rate: float = Config.MODEL_MAX_ERROR_RATE,
+                 probe_every: int = Config.MODEL_PROBE_EVERY,
+                 log_path: Optional[str] = Config.MODEL_ROUTE_LOG,
+                 log_max_bytes: int = Config.MODEL_ROUTE_LOG_MAX_KB * 1024):
+        routes = routes or Config.MODEL_ROUTES
+        self.routes = {task: [m.strip() for m in models if m.strip()] for task, models in routes.items()}
+        self.targets = targets or Config.MODEL_TARGET_P95
+        self.window = window
+        self.window_seconds = window_seconds
+        self.min_samples = max(1, min_samples)
+        self.max_error_rate = max_error_rate
+        self.probe_every = probe_every
+        self.log_path = log_path
+        self.log_max_bytes = max(1024, log_max_bytes)
+        self._stats: Dict[str, ModelStats] = {}
+        self._requests: Dict[str, int] = {}
+        self._decisions: Dict[Tuple[str, str], int] = {}  # (sarcină, model) → de câte ori
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()  # separat: scrierea pe disc nu blochează rutarea
+
+    def route(self, task: str) -> List[str]:
+        """Modelele sarcinii, în ordinea preferinței; o sarcină necunoscută merge pe ruta lui narrative"""
+        return self.routes.get(task) or self.routes["narrative"]
+
+    def _model_stats(self, model: str, now: Optional[float] = None) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = ModelStats(self.window, self.window_seconds)
+        stats.prune(time.time() if now is None else now)
+        return stats
+
+    def _unhealthy(self, model: str, target: float) -> Optional[str]:
+        """Motivul pentru care modelul e ocolit acum, sau None dacă e sănătos (ori fără date)"""
+        stats = self._model_stats(model)
+        errors = stats.error_rate(self.min_samples)
+        if errors is not None and errors > self.max_error_rate:
+            return f"{model} erori {errors:.0%} > {self.max_error_rate:.0%}"
+        p95 = stats.p95(self.min_samples)
+        if p95 is not None and p95 > target:
+            return f"{model} p95 {p95:.1f}s > {target:.1f}s"
+        return None
+
+    def choose(self, task: str, session_id: Optional[str] = None) -> str:
+        route = self.route(task)
+        target = self.targets.get(task, self.targets["narrative"])
+        with self._lock:
+            count = self._requests[task] = self._requests.get(task, 0) + 1
+            primary_problem = self._unhealthy(route[0], target)
+            if primary_problem is None:
+                model, reason = route[0], "principal"
+            elif self.probe_every > 0 and count % self.probe_every == 0:
+                model, reason = route[0], f"probă ({primary_problem})"
+            else:
+                model = next((m for m in route[1:] if self._unhealthy(m, target) is None), None)
+                if model is not None:
+                    reason = f"failover: {primary_problem}"
+                else:
+                    # niciun model sănătos: cel cu cele mai puține erori, apoi cel mai rapid (fără date = 0)
+                    model = min(route, key=lambda m: (self._model_stats(m).error_rate(self.min_samples) or 0.0,
+                                                      self._model_stats(m).p95(self.min_samples) or 0.0))
+                    reason = f"toate peste țintă: {primary_problem}"
+            self._decisions[(task, model)] = self._decisions.get((task, model), 0) + 1
+            if reason == "principal":
+                return model
+            snapshot = {
+                m: {
+                    "p95": self._model_stats(m).p95(self.min_samples),
+                    "errors": self._model_stats(m).error_rate(self.min_samples),
+                }
+                for m in route
+            }
+        print(f"[SESSION {session_id}] 🧭 MODEL ROUTE {task} → {model} ({reason})")
+        self._log({"ts": round(time.time(), 3), "session": session_id, "task": task,
+                   "model": model, "reason": reason, "target_p95": target, "models": snapshot})
+        return model
+
+    def record(self, model: str, seconds: float, ok: bool):
+        """Rezultatul unui apel; latența contează doar pentru apelurile reușite"""
+        now = time.time()
+        with self._lock:
+            self._model_stats(model, now).samples.append((now, ok, seconds))
+
+    def _log(self, entry: Dict[str, Any]):
+        """O linie JSONL, fără lock-ul de rutare; la MODEL_ROUTE_LOG_MAX_KB fișierul trece în .1"""
+        if not self.log_path:
+            return
+        try:
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            with self._log_lock:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                try:
+                    if os.path.getsize(self.log_path) >= self.log_max_bytes:
+                        os.replace(self.log_path, self.log_path + ".1")
+                except FileNotFoundError:
+                    pass
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            print(f"⚠️ Jurnal de rutare indisponibil: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {m: self._model_stats(m) for m in list(self._stats)}
+            return {
+                "models": {
+                    m: {
+                        "calls": len(s.samples),
+                        "p95": s.p95(self.min_samples),
+                        "errors": s.error_rate(self.min_samples),
+                    }
+                    for m, s in models.items()
+                },
+                "decisions": {f"{task}:{model}": n for (task, model), n in sorted(self._decisions.items())},
+            }
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+def get_model_router() -> ModelRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,211 @@
+# engine.py - Bucla de joc fără Streamlit: prompt → generare → actualizare GameState
+import hashlib
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from models import CharacterStats, GameState, InventoryItem, ItemType, NarrativeResponse
+from turn_journal import apply_record, make_turn_record
+
+# generator(prompt, session_id) -> NarrativeResponse
+Generator = Callable[[str, Optional[str]], NarrativeResponse]
+# image_policy(turn, last_image_turn, location_changed) -> imagine pentru tura asta?
+ImagePolicy = Callable[[int, int, bool], bool]
+
+INTRO_FLAVOUR = (
+    "*Personaj (TU): Ești un aventurier aflat în anul 1456. Te afli la marginea cetății Târgoviște, pe o noapte rece de toamnă. "
+    "Flăcările torțelor dansează în vânt, proiectând umbre lungi pe zidurile masive. "
+    "Porțile de stejar se ridică încet, cu un scârțâit apăsat, iar aerul miroase "
+    "a fum, fier și pământ ud. În depărtare se aud cai și voci ale străjerilor. "
+    "Fiecare decizie poate naște o legendă sau poate rămâne doar o filă de cronică...*\n\n"
+)
+FALLBACK_SUGGESTIONS = [
+    "Cauți un loc sigur pentru odihnă.",
+    "Cerți informații de la un localnic.",
+    "Explorezi zona cu atenție.",
+]
+
+
+def new_game_state(legend_scale: int = 5) -> GameState:
+    """Starea de început a unei aventuri (aceeași în aplicație și în simulări)"""
+    return GameState(
+        character=CharacterStats(),
+        inventory=[
+            InventoryItem(name="Pumnal valah", type=ItemType.weapon, value=3, quantity=1),
+            InventoryItem(name="Hartă ruptă", type=ItemType.misc, value=0, quantity=1),
+            InventoryItem(name="5 galbeni", type=ItemType.currency, value=5, quantity=1),
+        ],
+        story=[
+            {
+                "role": "ai",
+                "text": f"{Config.make_intro_text(legend_scale)}{INTRO_FLAVOUR}**Ce vrei să faci?**",
+                "turn": 0,
+                "image": None
+            }
+        ],
+        turn=0,
+        last_image_turn=-10
+    )
+
+
+class TurnResult:
+    """Rezultatul unei ture: înregistrarea pentru jurnal + ce îi trebuie UI-ului (imagine, game over)"""
+    __slots__ = ("record", "response", "narrative", "text", "prompt", "image_due", "game_over", "timings",
+                 "prompt_stats")
+
+    def __init__(self, record, response, narrative, text, prompt, image_due, game_over, timings, prompt_stats=None):
+        self.record = record
+        self.response = response
+        self.narrative = narrative      # narațiunea corectată (pentru imagine)
+        self.text = text                # narațiunea + sugestiile, exact cum apare în story
+        self.prompt = prompt
+        self.image_due = image_due
+        self.game_over = game_over
+        self.timings = timings
+        self.prompt_stats = prompt_stats or {}  # tokeni în prompt, replici incluse/omise din context
+
+
+def run_turn(gs: GameState, action: str, generate: Generator, legend_scale: int = 5,
+             session_id: Optional[str] = None, image_interval: int = Config.IMAGE_INTERVAL,
+             image_policy: Optional[ImagePolicy] = None) -> TurnResult:
+    """
+    O tură completă, fără niciun apel Streamlit: construiește promptul, generează,
+    corectează textul și aplică înregistrarea pe `gs` (aceeași cale ca replay-ul din jurnal).
+    """
+    from llm_handler import fix_romanian_grammar  # import local: llm_handler trage după el backend-ul local
+
+    timings: Dict[str, float] = {}
+    current_turn = gs.turn
+    user_msg = {"role": "user", "text": action, "turn": current_turn, "image": None}
+
+    prompt_stats: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    prompt = Config.build_dnd_prompt(
+        story=gs.story + [user_msg],
+        character=gs.character.model_dump(),
+        legend_scale=legend_scale,
+        stats=prompt_stats
+    )
+    t1 = time.perf_counter()
+    response = generate(prompt, session_id)
+    t2 = time.perf_counter()
+
+    narrative = fix_romanian_grammar(response.narrative)
+    suggestions = [fix_romanian_grammar(s) for s in response.suggestions if s and len(s) > 5]
+    if not suggestions:
+        suggestions = list(FALLBACK_SUGGESTIONS)
+    text = narrative + "\n\n**Sugestii:**" + "\n".join(f"• {s}" for s in suggestions)
+
+    record = make_turn_record(current_turn, action, text, response)
+    if image_policy is not None:
+        image_due = image_policy(current_turn, gs.last_image_turn, bool(response.location_change))
+    else:
+        image_due = (current_turn - gs.last_image_turn) >= image_interval
+    if image_due:
+        record["li"] = current_turn
+    apply_record(gs, record)
+    t3 = time.perf_counter()
+
+    timings["prompt"] = t1 - t0
+    timings["generate"] = t2 - t1
+    timings["update"] = t3 - t2
+    game_over = response.game_over or gs.character.health <= 0
+    return TurnResult(record, response, narrative, text, prompt, image_due, game_over, timings, prompt_stats)
+
+
+# ========== generatoare ==========
+_STUB_SCENES = [
+    "Străjerul te măsoară din priviri, apoi îți face semn să treci pe sub poarta grea de stejar.",
+    "Un negustor de postav îți șoptește că boierii se strâng noaptea la conacul de lângă râu.",
+    "Vântul aduce miros de fum dinspre tabăra otomană, iar caii din grajd necheză neliniștiți.",
+    "Un călugăr bătrân îți arată o cărare ascunsă prin codru, spre mănăstirea de pe deal.",
+    "În hanul plin de fum, un lăutar cântă despre isprăvile lui Vlad Vodă la Dunăre.",
+    "O ceată de călăreți trece în galop, ridicând praful de pe drumul de negoț.",
+]
+_STUB_PLACES = ["Târgoviște", "Codrul Vlăsiei", "Mănăstirea Snagov", "Poenari", "Drumul Brașovului"]
+_STUB_SUGGESTIONS = [
+    "Intri în han să asculți zvonurile.",
+    "Urmezi cărarea spre mănăstire.",
+    "Ceri audiență la căpitanul gărzii.",
+    "Cercetezi urmele din noroi.",
+    "Te îndrepți spre piața cetății.",
+]
+
+
+def stub_generator(seed: int = 0, latency: float = 0.0) -> Generator:
+    """
+    Înlocuitor offline și determinist pentru LLM: același (seed, prompt) → același răspuns.
+    `latency` simulează timpul de răspuns al API-ului (planificare de capacitate).
+    """
+    def generate(prompt: str, session_id: Optional[str] = None) -> NarrativeResponse:
+        digest = hashlib.sha256(f"{seed}\x1f{prompt}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+        if latency:
+            time.sleep(latency)
+        items = []
+        if rng.random() < 0.1:
+            items.append(InventoryItem(name=rng.choice(["Merinde", "Cuțit", "Scrisoare sigilată"]), type=ItemType.misc))
+        return NarrativeResponse(
+            narrative=rng.choice(_STUB_SCENES),
+            health_change=rng.choice([0, 0, 0, -5, -10, 5]),
+            reputation_change=rng.choice([0, 0, 2, -2]),
+            gold_change=rng.choice([0, 0, 0, 3, -1]),
+            items_gained=items,
+            location_change=rng.choice(_STUB_PLACES) if rng.random() < 0.15 else None,
+            suggestions=rng.sample(_STUB_SUGGESTIONS, 3),
+        )
+    return generate
+
+
+def local_model_generator(max_new_tokens: int = Config.LOCAL_MAX_NEW_TOKENS) -> Generator:
+    """Modelul local (fallback-ul aplicației); cererile concurente intră în același micro-batch"""
+    from local_backend import get_local_backend
+
+    backend = get_local_backend()
+
+    def generate(prompt: str, session_id: Optional[str] = None) -> NarrativeResponse:
+        from llm_handler import clean_ai_response
+
+        if not backend.wait_ready(timeout=300):
+            raise RuntimeError(f"Modelul local nu este disponibil: {backend.load_error}")
+        text = clean_ai_response(backend.generate(
+            f"Fantasy story: {prompt}", max_new_tokens=max_new_tokens, temperature=0.9, session_id=session_id
+        ))
+        if len(text) < 10:
+            text = "Ceva a tulburat liniștea nopții..."
+        return NarrativeResponse(narrative=text[:500])
+    return generate
+
+
+def api_generator() -> Generator:
+    """Groq API, ca în aplicație (fără bara de progres)"""
+    from llm_handler import generate_with_api_shared
+
+    def generate(prompt: str, session_id: Optional[str] = None) -> NarrativeResponse:
+        return generate_with_api_shared(prompt, session_id=session_id)
+    return generate
+
+
+GENERATORS: Dict[str, Callable[..., Generator]] = {
+    "stub": stub_generator,
+    "local": local_model_generator,
+    "api": api_generator,
+}
+
+
+def run_script(actions: List[str], generate: Generator, legend_scale: int = 5,
+               session_id: Optional[str] = None, gs: Optional[GameState] = None) -> Dict:
+    """Rulează o secvență de acțiuni până la capăt sau până la game over"""
+    gs = gs or new_game_state(legend_scale)
+    latencies = []
+    prompt_tokens = []
+    game_over = False
+    for action in actions:
+        result = run_turn(gs, action, generate, legend_scale=legend_scale, session_id=session_id)
+        latencies.append(result.timings["prompt"] + result.timings["generate"] + result.timings["update"])
+        prompt_tokens.append(result.prompt_stats.get("prompt_tokens", 0))
+        if result.game_over:
+            game_over = True
+            break
+    return {"game_state": gs, "latencies": latencies, "prompt_tokens": prompt_tokens, "game_over": game_over}
@@ -0,0 +1,163 @@
+# export_html.py - Export HTML în flux (chunk cu chunk), cu imaginile emise o singură dată
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+import struct
+import time
+import zipfile
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+EXPORT_CSS = """
+@import url('https://fonts.googleapis.com/css2?family=Cinzel:wght@400;600;700&family=Crimson+Text:ital,wght@0,400;0,600;1,400&display=swap');
+body { font-family: 'Crimson Text', serif; background: #fdf6e3; padding: 40px; color: #4b3f2f; }
+h1 { font-family: 'Cinzel', serif; color: #6b4f4f; text-align: center; margin-bottom: 30px; }
+.message { margin-bottom: 20px; padding: 15px; border-left: 4px solid #5a3921; background: rgba(90, 57, 33, 0.05); page-break-inside: avoid; }
+.ai { border-left-color: #ff6b6b; }
+.user { border-left-color: #4e9af1; }
+img, svg.scene { max-width: 100%; width: 500px; height: auto; margin: 20px auto; display: block; border-radius: 8px; border: 2px solid #5a3921; }
+.footer { text-align: center; margin-top: 40px; font-style: italic; color: #8b6b6b; }
+@media print { body { background: white; } }
+"""
+
+# base64 pe bucăți multiplu de 3 octeți → fără padding la mijloc, concatenarea rămâne validă
+_B64_CHUNK = 3 * 16 * 1024
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*", re.S)
+_ITALIC_RE = re.compile(r"\*(.+?)\*", re.S)
+
+
+def png_size(data: bytes) -> Tuple[int, int]:
+    """Dimensiunile din antetul IHDR (fără decodarea imaginii); 768x512 dacă nu e PNG"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    return 768, 512
+
+
+def render_text(text: str) -> str:
+    """Textul din story → HTML sigur: escape, apoi **bold**, *italic* și rânduri noi"""
+    escaped = html.escape(text or "", quote=False)
+    escaped = _BOLD_RE.sub(r"<strong>\1</strong>", escaped)
+    escaped = _ITALIC_RE.sub(r"<em>\1</em>", escaped)
+    return escaped.replace("\n", "<br/>\n")
+
+
+class StoryHtmlWriter:
+    """
+    Scrie documentul direct în `out` (orice obiect cu .write(str)), mesaj cu mesaj.
+    Moduri pentru imagini:
+      - "inline":   fiecare imagine distinctă o singură dată, ca <symbol> SVG; repetările sunt <use>
+      - "external": fișiere <digest>.png în `image_dir`, referite relativ
+      - "zip":      ca "external", dar imaginile rămân în `pending` pentru arhivă (vezi export_story)
+    """
+
+    def __init__(self, out: TextIO, images: str = "inline", image_dir: Optional[str] = None,
+                 image_prefix: str = "images/"):
+        if images not in ("inline", "external", "zip"):
+            raise ValueError(f"Mod de imagini necunoscut: {images}")
+        self.out = out
+        self.images = images
+        self.image_dir = image_dir
+        self.pending: List[Tuple[str, bytes]] = []
+        self.image_prefix = image_prefix
+        self._emitted: Dict[str, Tuple[int, int]] = {}
+        self.stats = {"messages": 0, "images": 0, "unique_images": 0, "image_bytes": 0}
+
+    def begin(self, title: str = "⚔️ Aventura în Wallachia ⚔️"):
+        w = self.out.write
+        w('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n')
+        w(f"<title>{html.escape(title)}</title>\n<style>{EXPORT_CSS}</style>\n</head>\n<body>\n")
+        w(f"<h1>{html.escape(title)}</h1>\n")
+        w(f'<p class="footer">Generat pe {time.strftime("%Y-%m-%d %H:%M")}</p>\n<hr>\n')
+
+    def message(self, msg: Dict):
+        role = msg.get("role", "ai")
+        role_class = "ai" if role == "ai" else "user"
+        self.out.write(
+            f'<div class="message {role_class}">\n<strong>{html.escape(role.capitalize())}:</strong><br/>\n'
+            f"{render_text(msg.get('text', ''))}\n</div>\n"
+        )
+        self.stats["messages"] += 1
+        image = msg.get("image")
+        if image:
+            self.image(image)
+
+    def image(self, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        self.stats["images"] += 1
+        first = digest not in self._emitted
+        if first:
+            self._emitted[digest] = png_size(data)
+            self.stats["unique_images"] += 1
+            self.stats["image_bytes"] += len(data)
+        width, height = self._emitted[digest]
+
+        if self.images == "inline":
+            w = self.out.write
+            w(f'<svg class="scene" viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">')
+            if first:
+                w(f'<symbol id="img-{digest}" viewBox="0 0 {width} {height}">'
+                  f'<image width="{width}" height="{height}" href="data:image/png;base64,')
+                for start in range(0, len(data), _B64_CHUNK):
+                    w(base64.b64encode(data[start:start + _B64_CHUNK]).decode("ascii"))
+                w('"/></symbol>')
+            w(f'<use href="#img-{digest}"/></svg>\n')
+            return
+
+        name = f"{digest}.png"
+        if first:
+            if self.images == "zip":
+                # zipfile nu permite o a doua intrare cât index.html e deschis: le scriem la final
+                self.pending.append((self.image_prefix + name, data))
+            else:
+                os.makedirs(self.image_dir, exist_ok=True)
+                with open(os.path.join(self.image_dir, name), "wb") as f:
+                    f.write(data)
+        self.out.write(f'<img src="{html.escape(self.image_prefix + name)}" width="{width}" height="{height}" />\n')
+
+    def end(self):
+        self.out.write("</body>\n</html>\n")
+
+    def write_story(self, story: Iterable[Dict], title: str = "⚔️ Aventura în Wallachia ⚔️"):
+        self.begin(title)
+        for msg in story:
+            self.message(msg)
+        self.end()
+        return self.stats
+
+
+def write_story_html(story: Iterable[Dict], out: TextIO, images: str = "inline",
+                     image_dir: Optional[str] = None) -> Dict[str, int]:
+    """Documentul complet în `out`; pentru "external", imaginile merg în `image_dir`"""
+    prefix = ""
+    if images == "external":
+        image_dir = image_dir or "images"
+        prefix = os.path.basename(os.path.normpath(image_dir)) + "/"
+    return StoryHtmlWriter(out, images=images, image_dir=image_dir, image_prefix=prefix).write_story(story)
+
+
+def export_story(story: List[Dict], mode: str = "inline") -> Tuple[bytes, str, str]:
+    """
+    Exportul gata de descărcat: (conținut, extensie, mime).
+    "inline" → un singur .html; "zip" → index.html + images/ într-o arhivă .zip.
+    Rulează în pool-ul de procese (vezi workers.run_job), deci întoarce bytes.
+    """
+    buf = io.BytesIO()
+    if mode == "zip":
+        with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            # PNG-urile sunt deja comprimate; doar documentul HTML trece prin deflate
+            with archive.open("index.html", "w") as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8")
+                writer = StoryHtmlWriter(text, images="zip")
+                writer.write_story(story)
+                text.flush()
+                text.detach()
+            for name, data in writer.pending:
+                archive.writestr(name, data, compress_type=zipfile.ZIP_STORED)
+        return buf.getvalue(), "zip", "application/zip"
+    text = io.TextIOWrapper(buf, encoding="utf-8")
+    StoryHtmlWriter(text, images="inline").write_story(story)
+    text.flush()
+    text.detach()
+    return buf.getvalue(), "html", "text/html"
@@ -0,0 +1,297 @@
+# groq_pool.py - Toate apelurile Groq printr-un singur pool de chei, cu clase de prioritate
+import os
+import re
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import requests
+
+from config import Config, get_model_router
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+class Priority(IntEnum):
+    """Cu cât mai mic, cu atât mai important"""
+    INTERACTIVE = 0   # tura jucătorului
+    IMAGE = 1         # prompturi de imagine
+    BACKGROUND = 2    # speculativ / de fundal
+
+
+def load_groq_tokens() -> List[str]:
+    """Toate cheile din mediu: GROQ_API_KEY, GROQ_API_KEY1, GROQ_API_KEY2, ... (fără duplicate)"""
+    tokens = []
+    token = os.getenv("GROQ_API_KEY")
+    if token and token.strip():
+        tokens.append(token.strip())
+    i = 1
+    while True:
+        token = os.getenv(f"GROQ_API_KEY{i}")
+        if not (token and token.strip()):
+            break
+        tokens.append(token.strip())
+        i += 1
+    return list(dict.fromkeys(tokens))
+
+
+_DURATION_RE = re.compile(r"([\d.]+)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """'2m59.56s' / '7.66s' / '120ms' / '3' (Retry-After) → secunde"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class KeyState:
+    """Ce știm despre cota unei chei (din antetele x-ratelimit-* ale ultimului răspuns)"""
+    __slots__ = ("token", "cooldown_until", "in_flight", "remaining", "limit", "reset_at",
+                 "requests", "rate_limited")
+
+    def __init__(self, token: str):
+        self.token = token
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.remaining: Dict[str, int] = {}   # "requests" / "tokens" → rămase în fereastră
+        self.limit: Dict[str, int] = {}
+        self.reset_at: Dict[str, float] = {}
+        self.requests = 0
+        self.rate_limited = 0
+
+    def headroom(self, now: float) -> float:
+        """Fracțiunea de cotă rămasă (1.0 = necunoscut sau fereastră resetată)"""
+        fraction = 1.0
+        for kind, remaining in self.remaining.items():
+            limit = self.limit.get(kind)
+            if not limit or now >= self.reset_at.get(kind, 0.0):
+                continue
+            fraction = min(fraction, max(0, remaining) / limit)
+        return fraction
+
+
+class Lease:
+    """O cheie împrumutată pentru un apel; se întoarce cu `GroqKeyPool.release`"""
+    __slots__ = ("index", "token", "priority", "released")
+
+    def __init__(self, index: int, token: str, priority: Priority):
+        self.index = index
+        self.token = token
+        self.priority = priority
+        self.released = False
+
+
+class GroqKeyPool:
+    """
+    Rotație între chei + admitere pe clase de prioritate:
+    - o cheie în răcire (după 429 / Retry-After) nu primește nimic până expiră
+    - clasele inferioare folosesc o cheie doar dacă îi rămâne peste `reserve[clasă]` din cotă
+      și doar cât timp nicio tură interactivă nu așteaptă o cheie liberă
+    - tura interactivă poate consuma toată cota și, dacă toate cheile sunt în răcire,
+      așteaptă cel mult `wait` secunde; clasele inferioare renunță imediat (au fallback)
+    """
+
+    def __init__(self, tokens: Iterable[str] = (),
+                 reserve: Optional[Dict[Priority, float]] = None,
+                 cooldown: float = Config.GROQ_COOLDOWN):
+        self.reserve = reserve or {
+            Priority.INTERACTIVE: 0.0,
+            Priority.IMAGE: Config.GROQ_RESERVE_IMAGE,
+            Priority.BACKGROUND: Config.GROQ_RESERVE_BACKGROUND,
+        }
+        self.cooldown = cooldown
+        self._keys: List[KeyState] = []
+        self._next = 0
+        self._interactive_waiting = 0
+        self._counters = {p.name.lower(): {"granted": 0, "yielded": 0, "rate_limited": 0} for p in Priority}
+        self._cond = threading.Condition()
+        self.sync(tokens)
+
+    def sync(self, tokens: Iterable[str]):
+        """Actualizează lista de chei păstrând starea celor care rămân"""
+        tokens = list(tokens)
+        with self._cond:
+            if [k.token for k in self._keys] == tokens:
+                return
+            known = {k.token: k for k in self._keys}
+            self._keys = [known.get(t) or KeyState(t) for t in tokens]
+            self._next = 0
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # ---- admitere ----
+    def _admissible(self, state: KeyState, priority: Priority, now: float) -> bool:
+        if state.cooldown_until > now:
+            return False
+        if priority == Priority.INTERACTIVE:
+            return True
+        return self._interactive_waiting == 0 and state.headroom(now) > self.reserve[priority]
+
+    def _pick(self, priority: Priority, exclude: Iterable[int], now: float) -> Optional[int]:
+        """Cheia admisă cu cea mai multă cotă rămasă; la egalitate, ordinea rotației"""
+        best, best_headroom = None, -1.0
+        count = len(self._keys)
+        for offset in range(count):
+            index = (self._next + offset) % count
+            state = self._keys[index]
+            if index in exclude or not self._admissible(state, priority, now):
+                continue
+            headroom = state.headroom(now)
+            if headroom > best_headroom:
+                best, best_headroom = index, headroom
+        return best
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE, exclude: Iterable[int] = (),
+                wait: float = 0.0) -> Optional[Lease]:
+        """O cheie pentru un apel sau None (nicio cheie admisă pentru clasa asta acum)"""
+        exclude = set(exclude)
+        deadline = time.time() + wait
+        counters = self._counters[priority.name.lower()]
+        with self._cond:
+            waiting = False
+            try:
+                while True:
+                    now = time.time()
+                    index = self._pick(priority, exclude, now)
+                    if index is not None:
+                        state = self._keys[index]
+                        state.in_flight += 1
+                        state.requests += 1
+                        if "requests" in state.remaining:
+                            state.remaining["requests"] -= 1  # estimare până vine răspunsul
+                        self._next = (index + 1) % len(self._keys)
+                        counters["granted"] += 1
+                        return Lease(index, state.token, priority)
+                    candidates = [k.cooldown_until for i, k in enumerate(self._keys) if i not in exclude]
+                    if not candidates or now >= deadline:
+                        if priority != Priority.INTERACTIVE:
+                            counters["yielded"] += 1
+                        return None
+                    if priority == Priority.INTERACTIVE and not waiting:
+                        waiting = True
+                        self._interactive_waiting += 1
+                    self._cond.wait(max(0.05, min(deadline, min(candidates)) - now))
+            finally:
+                if waiting:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def release(self, lease: Lease, status: Optional[int] = None,
+                headers: Optional[Mapping[str, str]] = None):
+        """Întoarce cheia; răspunsul (status + antete) actualizează cota și răcirea"""
+        if lease.released:
+            return
+        lease.released = True
+        now = time.time()
+        with self._cond:
+            if lease.index >= len(self._keys) or self._keys[lease.index].token != lease.token:
+                return  # lista de chei s-a schimbat între timp
+            state = self._keys[lease.index]
+            state.in_flight = max(0, state.in_flight - 1)
+            if headers is not None:
+                for kind in ("requests", "tokens"):
+                    remaining = _header_int(headers, f"x-ratelimit-remaining-{kind}")
+                    limit = _header_int(headers, f"x-ratelimit-limit-{kind}")
+                    reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if remaining is not None and limit:
+                        state.remaining[kind] = remaining
+                        state.limit[kind] = limit
+                        state.reset_at[kind] = now + (reset if reset is not None else 60.0)
+            if status == 429:
+                retry_after = parse_duration((headers or {}).get("retry-after"))
+                state.cooldown_until = now + (retry_after if retry_after is not None else self.cooldown)
+                state.rate_limited += 1
+                self._counters[lease.priority.name.lower()]["rate_limited"] += 1
+            elif status == 401:
+                state.cooldown_until = now + 3600  # cheie invalidă: scoasă din rotație
+            self._cond.notify_all()
+
+    # ---- apel complet ----
+    def chat(self, payload: Dict[str, Any], priority: Priority, timeout: float = 15,
+             session_id: Optional[str] = None) -> Optional[str]:
+        """
+        Un apel chat/completions cu rotație pe chei; conținutul răspunsului sau None
+        (fără chei, cedat unei clase superioare, sau toate cheile au eșuat).
+        Latența și erorile fiecărei încercări ajung în ModelRouter (429/401 țin de cheie, nu de model).
+        """
+        router = get_model_router()
+        model = payload.get("model", "")
+        tried: set = set()
+        for _ in range(len(self._keys)):
+            lease = self.acquire(priority, exclude=tried)
+            if lease is None:
+                break
+            tried.add(lease.index)
+            status, headers = None, None
+            t0 = time.perf_counter()
+            try:
+                r = requests.post(
+                    GROQ_API_URL,
+                    headers={"Authorization": f"Bearer {lease.token}", "Content-Type": "application/json"},
+                    json=payload,
+                    timeout=timeout,
+                )
+                status, headers = r.status_code, r.headers
+                if status == 200:
+                    content = r.json()["choices"][0]["message"]["content"]
+                    router.record(model, time.perf_counter() - t0, True)
+                    return content
+                if status not in (401, 429):
+                    router.record(model, time.perf_counter() - t0, False)
+                print(f"[SESSION {session_id}] ⚠️ GROQ {priority.name} TOKEN {lease.index + 1}: {status}")
+            except Exception as e:
+                router.record(model, time.perf_counter() - t0, False)
+                print(f"[SESSION {session_id}] ❌ GROQ {priority.name} TOKEN {lease.index + 1}: {e}")
+            finally:
+                self.release(lease, status, headers)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._cond:
+            return {
+                "keys": [
+                    {
+                        "requests": k.requests,
+                        "rate_limited": k.rate_limited,
+                        "in_flight": k.in_flight,
+                        "headroom": round(k.headroom(now), 3),
+                        "cooldown_s": round(max(0.0, k.cooldown_until - now), 1),
+                    }
+                    for k in self._keys
+                ],
+                "classes": {name: dict(c) for name, c in self._counters.items()},
+                "interactive_waiting": self._interactive_waiting,
+            }
+
+
+_pool: Optional[GroqKeyPool] = None
+_pool_lock = threading.Lock()
+
+def get_groq_pool() -> GroqKeyPool:
+    """Pool-ul comun procesului; cheile se recitesc din mediu la fiecare apel (ieftin)"""
+    global _pool
+    tokens = load_groq_tokens()
+    with _pool_lock:
+        if _pool is None:
+            _pool = GroqKeyPool(tokens)
+    _pool.sync(tokens)
+    return _pool
@@ -0,0 +1,207 @@
+# image_cache.py - Cache semantic de scene: imaginile SDXL reutilizate pentru scene asemănătoare
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from config import Config
+
+# Partea fixă a prompturilor din Config.generate_image_prompt[_llm]: nu descrie scena
+_STYLE_WORDS = frozenset("""
+romanian medieval wallachia 1456 vlad tepes era atmospheric dark fantasy highly detailed oil on canvas
+warm dim lighting deep shadow shadows 4k vintage parchment look soft orange glow candle light
+""".split())
+_STOP_WORDS = frozenset("""
+a an the and or of in on at to with by from for into onto under over near its his her their
+is are was were be being been this that these those there some one two three few several
+while as very under through across toward towards above below behind beside between
+""".split())
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _fold(text: str) -> str:
+    """casefold + fără diacritice (Târgoviște → targoviste)"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def scene_terms(prompt: str) -> FrozenSet[str]:
+    """Termenii cheie ai scenei: fără stilul fix, fără cuvinte de legătură, singular aproximativ"""
+    terms = set()
+    for word in _WORD_RE.findall(_fold(prompt)):
+        if word in _STYLE_WORDS or word in _STOP_WORDS or len(word) < 3:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+def normalize_location(location: str) -> str:
+    return " ".join(_WORD_RE.findall(_fold(location)))
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard între mulțimile de termeni"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SceneImageCache:
+    """
+    Imaginile generate, pe disc (PNG) + index SQLite (locație, termeni, cost de generare).
+    O cerere nouă reutilizează imaginea cea mai apropiată din aceeași locație dacă
+    similaritatea termenilor depășește pragul. Evacuare LRU după numărul de fișiere.
+    Contoarele (hit/miss, secunde economisite) sunt în baza de date, deci globale.
+    """
+
+    def __init__(self, directory: str = Config.IMAGE_CACHE_DIR,
+                 threshold: float = Config.IMAGE_CACHE_SIMILARITY,
+                 max_files: int = Config.IMAGE_CACHE_MAX_FILES):
+        self.directory = directory
+        self.threshold = threshold
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=5,
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                " digest TEXT PRIMARY KEY, location TEXT NOT NULL, terms TEXT NOT NULL,"
+                " gen_seconds REAL NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scenes_location ON scenes(location)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " hits INTEGER NOT NULL, misses INTEGER NOT NULL, seconds_saved REAL NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO stats VALUES (1, 0, 0, 0)")
+            self._conn = conn
+        return self._conn
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.png")
+
+    def lookup(self, prompt: str, location: str) -> Optional[Tuple[bytes, float]]:
+        """(PNG, similaritate) pentru cea mai apropiată scenă peste prag, altfel None"""
+        terms = scene_terms(prompt)
+        loc = normalize_location(location)
+        try:
+            with self._lock:
+                conn = self._connect()
+                best, best_score, best_seconds = None, 0.0, 0.0
+                for digest, stored, gen_seconds in conn.execute(
+                    "SELECT digest, terms, gen_seconds FROM scenes WHERE location=?", (loc,)
+                ):
+                    score = similarity(terms, frozenset(stored.split()))
+                    if score > best_score:
+                        best, best_score, best_seconds = digest, score, gen_seconds
+                data = None
+                if best is not None and best_score >= self.threshold:
+                    try:
+                        with open(self._path(best), "rb") as f:
+                            data = f.read()
+                    except OSError:
+                        conn.execute("DELETE FROM scenes WHERE digest=?", (best,))  # fișier șters de altcineva
+                if data is not None:
+                    conn.execute("UPDATE scenes SET accessed_at=?, hits=hits+1 WHERE digest=?", (time.time(), best))
+                    conn.execute("UPDATE stats SET hits=hits+1, seconds_saved=seconds_saved+? WHERE id=1",
+                                 (best_seconds,))
+                    return data, best_score
+                conn.execute("UPDATE stats SET misses=misses+1 WHERE id=1")
+                return None
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache de imagini indisponibil: {e}")
+            return None
+
+    def store(self, prompt: str, location: str, data: bytes, gen_seconds: float) -> Optional[str]:
+        terms = scene_terms(prompt)
+        if not terms:
+            return None  # fără termeni de scenă nu am putea potrivi nimic
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                tmp = self._path(digest) + f".{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(digest))
+                conn.execute(
+                    "INSERT OR REPLACE INTO scenes(digest, location, terms, gen_seconds, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, normalize_location(location), " ".join(sorted(terms)), gen_seconds, now, now),
+                )
+                self._evict(conn)
+            return digest
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Cache de imagini indisponibil: {e}")
+            return None
+
+    def _evict(self, conn: sqlite3.Connection):
+        (count,) = conn.execute("SELECT COUNT(*) FROM scenes").fetchone()
+        if count <= self.max_files:
+            return
+        old = conn.execute(
+            "SELECT digest FROM scenes ORDER BY accessed_at ASC LIMIT ?", (count - self.max_files,)
+        ).fetchall()
+        for (digest,) in old:
+            conn.execute("DELETE FROM scenes WHERE digest=?", (digest,))
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        try:
+            with self._lock:
+                conn = self._connect()
+                hits, misses, saved = conn.execute("SELECT hits, misses, seconds_saved FROM stats").fetchone()
+                (entries,) = conn.execute("SELECT COUNT(*) FROM scenes").fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache de imagini indisponibil: {e}")
+            return {}
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "seconds_saved": saved,
+            "entries": entries,
+        }
+
+
+_cache: Optional[SceneImageCache] = None
+_cache_lock = threading.Lock()
+
+def get_scene_cache() -> Optional[SceneImageCache]:
+    """None dacă e dezactivat (IMAGE_CACHE_SIMILARITY > 1)"""
+    global _cache
+    if Config.IMAGE_CACHE_SIMILARITY > 1:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SceneImageCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    # Raport rapid: python image_cache.py
+    cache = get_scene_cache()
+    if cache is None:
+        raise SystemExit("Cache de imagini dezactivat (IMAGE_CACHE_SIMILARITY > 1)")
+    s = cache.stats()
+    print(f"scene: hits={s['hits']} misses={s['misses']} hit_rate={s['hit_rate']:.1%} "
+          f"economisit={s['seconds_saved']:.0f}s intrări={s['entries']}")
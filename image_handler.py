@@ -1,14 +1,16 @@
 # image_handler.py  –  two-tier fallback for image generation
 import streamlit as st
 from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
-from huggingface_hub import InferenceClient
 from io import BytesIO
 import requests
-from typing import Optional, List
+from collections import deque
+from typing import Callable, Dict, Optional, List
 import threading
 import time
 import os
 from config import Config
+from workers import encode_png, run_job
+from image_cache import get_scene_cache
 
 # ========== 1. LISTA MODELELOR (ordinea = prioritate) ==========
 IMAGE_MODELS: List[str] = [
@@ -20,13 +22,6 @@ IMAGE_MODELS: List[str] = [
 _hf_token_index = 0
 _hf_token_lock = threading.Lock()
 
-# client unic pentru toate apelurile
-client = InferenceClient(
-    provider="nscale",
-    api_key=os.getenv("HF_TOKEN"),   # ← asigură-te că există
-    timeout=120
-)
-
 def get_session_id():
     """Obține ID-ul de sesiune din Streamlit session_state"""
     return st.session_state.get('session_id', 'UNKNOWN_SESSION')
@@ -60,30 +55,38 @@ def get_hf_tokens() -> List[str]:
     return unique_tokens
 
 
-def generate_scene_image(text: str, is_initial: bool = False) -> Optional[bytes]:
-    """
-    Generează imagine cu rotație inteligentă a token-urilor HF.
-    La fiecare request se rotește la următorul token. Dacă un token eșuează,
-    se încearcă automat următorul din listă.
-    """
-    session_id = get_session_id()  # ⭕ OBTINE ID SESIUNE
-    tokens = get_hf_tokens()
-    if not tokens:
-        print(f"[SESSION {session_id}] 🔒 NO HF TOKENS - OFFLINE MODE")  # ⭕ LOG
-        st.info("🔒 Mod offline – generăm imagine de rezervă...")
-        return generate_fallback_image(text, is_initial)
-    print(f"[SESSION {session_id}] 🎨 GENERATING IMAGE: {text}")  # ⭕ LOG PROMPT
-    # Rotation logic: determinăm token-ul de start pentru acest request
-    global _hf_token_index
-    with _hf_token_lock:
-        start_index = _hf_token_index
-        # Incrementăm pentru următorul request
-        _hf_token_index = (_hf_token_index + 1) % len(tokens)
-    
-    location = st.session_state.character.get("location", "Târgoviște")
-    prompt = Config.generate_image_prompt_llm(text, location)
+class PhaseStats:
+    """Latența per fază de randare (schiță / final), pentru tot procesul"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[str, deque] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(phase, deque(maxlen=self._window)).append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+        return {
+            phase: {
+                "count": len(values),
+                "avg_s": sum(values) / len(values),
+                "p95_s": values[min(len(values) - 1, int(0.95 * len(values)))],
+                "max_s": values[-1],
+            }
+            for phase, values in samples.items() if values
+        }
+
+
+image_phase_stats = PhaseStats()
 
-    # Încercăm fiecare token începând de la index-ul rotit
+
+def _render(prompt: str, tokens: List[str], start_index: int, session_id: str, steps: int,
+            width: Optional[int] = None, height: Optional[int] = None) -> Optional[Image.Image]:
+    """Un apel text_to_image, încercând fiecare token (de la cel rotit) și fiecare model"""
     for i in range(len(tokens)):
         token_index = (start_index + i) % len(tokens)
         token = tokens[token_index]
@@ -92,29 +95,101 @@ def generate_scene_image(text: str, is_initial: bool = False) -> Optional[bytes]
         # Încercăm fiecare model cu acest token
         for model in IMAGE_MODELS:
             try:
+                from huggingface_hub import InferenceClient  # import leneș: doar când chiar generăm
+
                 client = InferenceClient(
                     provider="nscale",
                     api_key=token,
                     timeout=120
                 )
-                print(f"[SESSION {session_id}] ✅ Token {token_index + 1}, Model {model}, IMAGE Prompt: {prompt}")  # ⭕ LOG
+                print(f"[SESSION {session_id}] ✅ Token {token_index + 1}, Model {model}, {steps} pași, IMAGE Prompt: {prompt}")  # ⭕ LOG
                 with st.spinner("🎨 Artistul medieval lucrează..."):
                     pil_img = client.text_to_image(
                         prompt,
                         model=model,
                         negative_prompt=Config.IMAGE_NEGATIVE,
-                        num_inference_steps=30,
+                        num_inference_steps=steps,
                         guidance_scale=7.5,
+                        width=width,
+                        height=height,
                     )
                 if pil_img:
                     print(f"[SESSION {session_id}] ✅ IMAGE SUCCESS (Token {token_index + 1}, Model {model})")  # ⭕ LOG
-                    return pil_to_bytes(pil_img)
+                    return pil_img
             except Exception as e:
                 print(f"[SESSION {session_id}] ❌ IMAGE FAIL (Token {token_index + 1}, Model {model}): {e}")  # ⭕ LOG
                 st.warning(f"⚠️ Token {token_index + 1} / Model {model} a eșuat: {e}")
                 continue  # Trecem la următorul model
         
         # Dacă toate modelele au eșuat pentru acest token, continuăm cu următorul token
+    return None
+
+
+def generate_scene_image(text: str, location: str, is_initial: bool = False,
+                         on_draft: Optional[Callable[[bytes], None]] = None,
+                         on_final: Optional[Callable[[float], None]] = None) -> Optional[bytes]:
+    """
+    Generează imagine cu rotație inteligentă a token-urilor HF.
+    La fiecare request se rotește la următorul token. Dacă un token eșuează,
+    se încearcă automat următorul din listă.
+    `location` = locația comisă a personajului (GameState), folosită în prompt și în cache-ul de scene.
+    Cu `on_draft` (și IMAGE_PROGRESSIVE), întâi o schiță rapidă (puțini pași, rezoluție mică)
+    e trimisă lui `on_draft`, apoi se întoarce randarea finală. `on_final` primește durata randării
+    finale (doar ea; nu și pentru un hit în cache, schiță sau imaginea de rezervă).
+    """
+    session_id = get_session_id()  # ⭕ OBTINE ID SESIUNE
+    tokens = get_hf_tokens()
+    if not tokens:
+        print(f"[SESSION {session_id}] 🔒 NO HF TOKENS - OFFLINE MODE")  # ⭕ LOG
+        st.info("🔒 Mod offline – generăm imagine de rezervă...")
+        return generate_fallback_image(text, is_initial)
+    print(f"[SESSION {session_id}] 🎨 GENERATING IMAGE: {text}")  # ⭕ LOG PROMPT
+    # Rotation logic: determinăm token-ul de start pentru acest request
+    global _hf_token_index
+    with _hf_token_lock:
+        start_index = _hf_token_index
+        # Incrementăm pentru următorul request
+        _hf_token_index = (_hf_token_index + 1) % len(tokens)
+    
+    prompt = Config.generate_image_prompt_llm(text, location)
+
+    # Scenele se repetă (porțile cetății, drumul prin codru): întâi cache-ul semantic
+    cache = get_scene_cache()
+    if cache is not None:
+        cached = cache.lookup(prompt, location)
+        if cached is not None:
+            print(f"[SESSION {session_id}] 🖼️ SCENE CACHE HIT (similaritate {cached[1]:.2f})")  # ⭕ LOG
+            return cached[0]
+
+    # Faza 1: schița, ca povestea să nu stea un minut fără imagine
+    t0 = time.perf_counter()
+    draft_bytes = None
+    if on_draft is not None and Config.IMAGE_PROGRESSIVE:
+        draft = _render(prompt, tokens, start_index, session_id, Config.IMAGE_DRAFT_STEPS,
+                        Config.IMAGE_DRAFT_WIDTH, Config.IMAGE_DRAFT_HEIGHT)
+        if draft is not None:
+            draft_seconds = time.perf_counter() - t0
+            image_phase_stats.record("draft", draft_seconds)
+            draft_bytes = pil_to_bytes(draft)
+            print(f"[SESSION {session_id}] 🖌️ IMAGE DRAFT în {draft_seconds:.1f}s")  # ⭕ LOG
+            on_draft(draft_bytes)
+
+    # Faza 2: randarea finală, care o înlocuiește pe schiță
+    t1 = time.perf_counter()
+    pil_img = _render(prompt, tokens, start_index, session_id, Config.IMAGE_FINAL_STEPS)
+    if pil_img is not None:
+        final_seconds = time.perf_counter() - t1
+        image_phase_stats.record("final", final_seconds)
+        if on_final is not None:
+            on_final(final_seconds)
+        print(f"[SESSION {session_id}] 🖼️ IMAGE FINAL în {final_seconds:.1f}s (total {time.perf_counter() - t0:.1f}s)")  # ⭕ LOG
+        img_bytes = pil_to_bytes(pil_img)
+        if cache is not None:
+            cache.store(prompt, location, img_bytes, final_seconds)
+        return img_bytes
+    if draft_bytes is not None:
+        print(f"[SESSION {session_id}] ⚠️ IMAGE FINAL FAILED - rămâne schița")  # ⭕ LOG
+        return draft_bytes
     
     # Dacă toate token-urile și modelele au eșuat
     print(f"[SESSION {session_id}] ❌ ALL IMAGE TOKENS FAILED")  # ⭕ LOG
@@ -123,13 +198,15 @@ def generate_scene_image(text: str, is_initial: bool = False) -> Optional[bytes]
 
 # ---------- helper ----------
 def pil_to_bytes(img: Image.Image) -> bytes:
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+    # Codarea PNG rulează în pool-ul de procese, nu pe firul sesiunii
+    return run_job(encode_png, img)
 
 
 # ---------- restul funcțiilor rămân identice ----------
 def generate_fallback_image(text: str, is_initial: bool) -> bytes:
+    return run_job(_draw_fallback_image, text, is_initial)
+
+def _draw_fallback_image(text: str, is_initial: bool) -> bytes:
     try:
         img = Image.new('RGB', (768, 512), color='#0d0704')
         draw = ImageDraw.Draw(img)
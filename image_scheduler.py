@@ -0,0 +1,112 @@
+# image_scheduler.py - Cadența imaginilor după capacitate: coada și latența HF, nu viteza jucătorului
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+# Un job din st.session_state.image_queue: (narațiune, tură, locație nouă?)
+ImageJob = Tuple[str, int, bool]
+
+
+class ImageScheduler:
+    """
+    Comun tuturor sesiunilor din proces (tokenii HF și firele de imagine sunt comune).
+    - intervalul dintre imagini crește cu adâncimea cozii globale și cu latența observată
+    - o tură cu `location_change` e preferată: ajunge jumătate din interval
+    - la preluare, joburile rămase în urmă cu mai mult de IMAGE_STALE_TURNS ture se aruncă,
+      iar dintre cele rămase se alege unul singur (cel mai nou, preferând o locație nouă)
+    """
+
+    def __init__(self, base_interval: int = Config.IMAGE_INTERVAL,
+                 max_interval: int = Config.IMAGE_MAX_INTERVAL,
+                 capacity: int = Config.IMAGE_CAPACITY,
+                 target_latency: float = Config.IMAGE_TARGET_LATENCY,
+                 stale_turns: int = Config.IMAGE_STALE_TURNS):
+        self.base_interval = max(1, base_interval)
+        self.max_interval = max(self.base_interval, max_interval)
+        self.capacity = max(1, capacity)
+        self.target_latency = max(0.1, target_latency)
+        self.stale_turns = max(0, stale_turns)
+        self._queues: Dict[str, Tuple[int, float]] = {}  # sesiune → (joburi în coadă, actualizat la)
+        self._in_flight = 0
+        self._latency: Optional[float] = None  # medie exponențială (secunde per imagine)
+        self._counters = {"queued": 0, "dropped_stale": 0, "coalesced": 0, "rendered": 0}
+        self._lock = threading.Lock()
+
+    # ---- încărcare ----
+    def _depth(self, now: float) -> int:
+        for sid in [s for s, (_, at) in self._queues.items() if now - at > 600]:
+            del self._queues[sid]  # sesiuni abandonate
+        return sum(depth for depth, _ in self._queues.values()) + self._in_flight
+
+    def interval(self) -> int:
+        """Câte ture între imagini acum: intervalul de bază înmulțit cu factorul de încărcare"""
+        with self._lock:
+            load = self._depth(time.time()) / self.capacity
+            slowness = (self._latency or 0.0) / self.target_latency
+        factor = max(1.0, load, slowness)
+        return min(self.max_interval, max(self.base_interval, round(self.base_interval * factor)))
+
+    def is_due(self, turn: int, last_image_turn: int, location_changed: bool = False) -> bool:
+        interval = self.interval()
+        if location_changed:
+            interval = max(1, interval // 2)
+        return turn - last_image_turn >= interval
+
+    # ---- coada unei sesiuni ----
+    def enqueue(self, session_id: str, queue: List[ImageJob], job: ImageJob):
+        queue.append(job)
+        with self._lock:
+            self._counters["queued"] += 1
+            self._queues[session_id] = (len(queue), time.time())
+
+    def take(self, session_id: str, queue: List[ImageJob], current_turn: int) -> Optional[ImageJob]:
+        """Scoate din coadă jobul de randat acum (sau None); restul joburilor se golesc"""
+        fresh = [job for job in queue if current_turn - job[1] <= self.stale_turns]
+        stale = len(queue) - len(fresh)
+        queue.clear()
+        chosen = None
+        if fresh:
+            moved = [job for job in fresh if job[2]]
+            chosen = (moved or fresh)[-1]
+        with self._lock:
+            self._counters["dropped_stale"] += stale
+            self._counters["coalesced"] += max(0, len(fresh) - 1)
+            self._queues[session_id] = (0, time.time())
+            if chosen is not None:
+                self._in_flight += 1
+        if stale or len(fresh) > 1:
+            print(f"[SESSION {session_id}] 🗑️ IMAGE QUEUE: {stale} învechite, {max(0, len(fresh) - 1)} comasate")
+        return chosen
+
+    def finished(self, seconds: Optional[float]):
+        """
+        Jobul preluat cu take() s-a terminat; `seconds` = durata randării finale text_to_image,
+        None dacă n-a existat una (eșec, hit în cache): media de latență nu se modifică
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if seconds is not None:
+                self._counters["rendered"] += 1
+                self._latency = seconds if self._latency is None else 0.7 * self._latency + 0.3 * seconds
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            report = dict(self._counters)
+            report["depth"] = self._depth(time.time())
+            report["in_flight"] = self._in_flight
+            report["latency_s"] = self._latency or 0.0
+        report["interval"] = self.interval()
+        return report
+
+
+_scheduler: Optional[ImageScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_image_scheduler() -> ImageScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ImageScheduler()
+        return _scheduler
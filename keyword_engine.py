@@ -0,0 +1,130 @@
+# keyword_engine.py - Potrivire de cuvinte cheie într-o singură trecere (Aho-Corasick) + reguli declarative
+from typing import Container, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+
+class AhoCorasick:
+    """
+    Automat compilat din toate cuvintele cheie; `scan` întoarce toate cuvintele care apar
+    în text (ca subșir, exact ca `word in text`) parcurgând textul o singură dată.
+    Tranzițiile sunt completate (DFA), deci fiecare caracter costă un singur lookup.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = list(dict.fromkeys(w for w in words if w))
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Set[str]] = [set()]
+        for word in self.words:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add(word)
+
+        # BFS: legături de eșec, ieșiri moștenite și tranzițiile DFA
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            out[state] |= out[fail[state]]
+            # Pornim de la tranzițiile stării de eșec (deja complete, e mai sus în BFS)
+            trans = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                trans[ch] = nxt
+                queue.append(nxt)
+            delta[state] = trans
+
+        # Caracterele care nu apar în niciun cuvânt duc mereu în rădăcină
+        self._delta = delta
+        self._out: List[Optional[FrozenSet[str]]] = [frozenset(o) if o else None for o in out]
+
+    def scan(self, text: str) -> Set[str]:
+        delta, out = self._delta, self._out
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            hit = out[state]
+            if hit is not None:
+                found |= hit
+        return found
+
+
+class KeywordRule:
+    """
+    O regulă din tabel: dacă vreun cuvânt din `words` apare în textul `source` ("action"/"response"),
+    modifică `stat` cu semn * (zar(dice) + bonus). Regulile cu același `group` se exclud
+    (prima potrivită câștigă, ca un lanț if/elif).
+    """
+    __slots__ = ("group", "source", "words", "stat", "sign", "dice", "bonus", "message", "icon")
+
+    def __init__(self, group: str, source: str, words: Sequence[str], stat: str, sign: int,
+                 dice: int, bonus: int = 0, message: str = "", icon: str = ""):
+        self.group = group
+        self.source = source
+        self.words = tuple(words)
+        self.stat = stat
+        self.sign = sign
+        self.dice = dice
+        self.bonus = bonus
+        self.message = message
+        self.icon = icon
+
+
+class KeywordEngine:
+    """
+    Un matcher per sursă de text; `match` întoarce regulile declanșate, în ordinea din tabel.
+    Sub `automaton_min_words` cuvinte distincte, `word in text` (căutare în C, oprită la prima
+    regulă potrivită din grup) e mai rapid decât bucla Python a automatului; peste prag costul
+    automatului nu mai crește cu numărul de cuvinte (vezi benchmarks/bench_keywords.py).
+    """
+
+    def __init__(self, rules: Sequence[KeywordRule], extra_words: Dict[str, Iterable[str]] = None,
+                 automaton_min_words: int = 100):
+        self.rules = list(rules)
+        extra_words = extra_words or {}
+        sources = dict.fromkeys([r.source for r in self.rules] + list(extra_words))
+        self.words: Dict[str, List[str]] = {
+            source: list(dict.fromkeys(
+                [w for r in self.rules if r.source == source for w in r.words] + list(extra_words.get(source, ()))
+            ))
+            for source in sources
+        }
+        self.automata: Dict[str, AhoCorasick] = {
+            source: AhoCorasick(words)
+            for source, words in self.words.items()
+            if len(words) >= automaton_min_words
+        }
+
+    def scan(self, texts: Dict[str, str]) -> Dict[str, Container[str]]:
+        """
+        Pentru fiecare sursă, un container în care `word in hits[source]` spune dacă cuvântul apare:
+        setul găsit de automat sau, sub prag, chiar textul (subșir, căutare leneșă în C).
+        """
+        hits = {}
+        for source in self.words:
+            text = texts.get(source, "")
+            automaton = self.automata.get(source)
+            hits[source] = automaton.scan(text) if automaton else text
+        return hits
+
+    def match(self, hits: Dict[str, Container[str]]) -> List[KeywordRule]:
+        fired: List[KeywordRule] = []
+        done_groups = set()
+        for rule in self.rules:
+            if rule.group in done_groups:
+                continue
+            found = hits.get(rule.source, ())
+            if any(word in found for word in rule.words):
+                fired.append(rule)
+                done_groups.add(rule.group)
+        return fired
@@ -1,8 +1,6 @@
 import os
 import sys
 import streamlit as st
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
 import requests
 import threading
 from typing import List, Optional
@@ -10,19 +8,22 @@ import time
 import random
 import re
 import json
+import hashlib
 from streamlit.runtime.scriptrunner import add_script_run_ctx
 from pydantic import ValidationError # ⭕ FIX: Added explicit Pydantic ValidationError import
 
+from config import Config, get_model_router
 from models import InventoryItem, NarrativeResponse
+from singleflight import SingleFlight
+from groq_pool import GROQ_API_URL, Priority, get_groq_pool, load_groq_tokens
 
 if os.name == 'nt':
     os.environ["HF_HOME"] = "D:/huggingface_cache"
     os.makedirs("D:/huggingface_cache", exist_ok=True)
 
 
-# Thread-safe rotation pentru Groq API keys
-_groq_key_index = 0
-_groq_key_lock = threading.Lock()
+# Dublu-click / rerun în timpul generării: aceeași cerere nu pleacă de două ori spre Groq
+_inflight = SingleFlight(linger=Config.LLM_DEDUP_LINGER)
 
 # llm_handler.py
 SYSTEM_PROMPT = (
@@ -48,43 +49,16 @@ def get_session_id():
 
 def get_all_groq_tokens() -> List[str]:
     """Obține TOATE cheile Groq din mediu: GROQ_API_KEY, GROQ_API_KEY1, GROQ_API_KEY2, etc."""
-    tokens = []
-    # Cheia principală
-    token = os.getenv("GROQ_API_KEY")
-    if token and token.strip():
-        tokens.append(token.strip())
-    
-    # Chei secundare (GROQ_API_KEY1, GROQ_API_KEY2, ...)
-    i = 1
-    while True:
-        token = os.getenv(f"GROQ_API_KEY{i}")
-        if token and token.strip():
-            tokens.append(token.strip())
-            i += 1
-        else:
-            break
-    
-    # Elimină duplicate păstrând ordinea
-    seen = set()
-    unique_tokens = []
-    for token in tokens:
-        if token not in seen:
-            seen.add(token)
-            unique_tokens.append(token)
-    
-    return unique_tokens
+    return load_groq_tokens()
 
-
-@st.cache_resource(show_spinner=True)
 def load_local_model():
-    try:
-        model_name = "distilgpt2"
-        cache_dir = os.getenv("HF_HOME", None)
-        tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
-        model = AutoModelForCausalLM.from_pretrained(model_name, cache_dir=cache_dir, torch_dtype=torch.float32, device_map="cpu")
-        return tokenizer, model
-    except Exception as e:
+    """Returnează (tokenizer, model) din backend-ul local partajat (încărcat la pornire)"""
+    from local_backend import get_local_backend  # import leneș: torch/transformers doar pe calea de fallback
+
+    backend = get_local_backend()
+    if not backend.wait_ready(timeout=300):
         return None, None
+    return backend.tokenizer, backend.model
 
 def get_groq_token():
     token = os.getenv("GROQ_API_KEY")
@@ -162,11 +136,35 @@ def fix_romanian_grammar(text: str) -> str:
     
     return text
 
-def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
+def parse_api_content(content: str) -> NarrativeResponse:
+    """
+    Conținutul mesajului Groq → NarrativeResponse validat: fără ```json```, gramatica corectată,
+    obiectele primite completate cu valorile implicite. Ridică JSONDecodeError / ValidationError.
+    """
+    content = re.sub(r'```json\s*', '', content.strip())
+    content = re.sub(r'```\s*', '', content).strip()
+    json_data = json.loads(content)
+    
+    if "narrative" in json_data:
+        json_data["narrative"] = fix_romanian_grammar(json_data["narrative"])
+    
+    if "items_gained" in json_data and isinstance(json_data["items_gained"], list):
+        items_gained = []
+        for item_dict in json_data["items_gained"]:
+            item_dict.setdefault("type", "diverse")
+            item_dict.setdefault("value", 0)
+            item_dict.setdefault("quantity", 1)
+            items_gained.append(InventoryItem(**item_dict))
+        json_data["items_gained"] = items_gained
+    
+    return NarrativeResponse(**json_data)
+
+def generate_with_api(prompt: str, use_api: bool = True, task: str = "narrative") -> NarrativeResponse:
     """
     Generează răspuns folosind Groq API cu rotație inteligentă de chei.
-    La fiecare request se rotește la următoarea cheie. Dacă o cheie eșuează,
-    se încearcă automat următoarea din listă.
+    Cheile vin din pool-ul comun (groq_pool), clasa INTERACTIVE: are prioritate față de
+    prompturile de imagine și munca de fundal. Dacă o cheie eșuează, se încearcă următoarea.
+    Modelul îl alege ModelRouter după `task` și latența/erorile observate.
     """
     session_id = get_session_id()  # ⭕ OBTINE ID SESIUNE
     tokens = get_all_groq_tokens()
@@ -176,21 +174,21 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
             narrative="Conexiunea cu tărâmul magic s-a întrerupt. (Verifică GROQ_API_KEY în .env)",
             game_over=True
         )    
-    api_url = "https://api.groq.com/openai/v1/chat/completions"
-    model = "llama-3.3-70b-versatile" #"openai/gpt-oss-120b"
+    api_url = GROQ_API_URL
+    router = get_model_router()
+    model = router.choose(task, session_id)
     max_retries_per_key = 1  # Doar 1 încercare per cheie înainte de a roti
     
-    # Thread-safe rotation: determinăm cheia de start pentru acest request
-    global _groq_key_index
-    with _groq_key_lock:
-        start_index = _groq_key_index
-        # Incrementăm pentru următorul request
-        _groq_key_index = (_groq_key_index + 1) % len(tokens)
+    pool = get_groq_pool()
+    tried = set()
     
-    # Încercăm fiecare cheie începând de la index-ul rotit
-    for i in range(len(tokens)):
-        token_index = (start_index + i) % len(tokens)
-        token = tokens[token_index]
+    # Încercăm fiecare cheie o singură dată, în ordinea dată de pool (rotație + cota rămasă)
+    for _ in range(len(tokens)):
+        lease = pool.acquire(Priority.INTERACTIVE, exclude=tried, wait=Config.GROQ_INTERACTIVE_WAIT)
+        if lease is None:
+            break
+        tried.add(lease.index)
+        token_index, token = lease.index, lease.token
         print(f"[SESSION {session_id}] 🔑 USING TOKEN: {token[:10]}...")  # ⭕ LOG TOKEN
         
         for attempt in range(max_retries_per_key):
@@ -209,6 +207,7 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                 "response_format": {"type": "json_object"}
             }
 
+            t0 = time.perf_counter()
             try:
                 response = requests.post(
                     api_url,
@@ -219,28 +218,18 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                     json=payload,
                     timeout=45
                 )
+                pool.release(lease, response.status_code, response.headers)  # cota rămasă / răcire
+                elapsed = time.perf_counter() - t0
+                if response.status_code not in (200, 401, 429):  # 401/429 țin de cheie, nu de model
+                    router.record(model, elapsed, False)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    content = data["choices"][0]["message"]["content"].strip()
-                    content = re.sub(r'```json\s*', '', content)
-                    content = re.sub(r'```\s*', '', content)
-                    content = content.strip()
+                    content = data["choices"][0]["message"]["content"]
                     
                     try:
-                        json_data = json.loads(content)
-                        
-                        if "narrative" in json_data:
-                            json_data["narrative"] = fix_romanian_grammar(json_data["narrative"])
-                        
-                        if "items_gained" in json_data and isinstance(json_data["items_gained"], list):
-                            items_gained = []
-                            for item_dict in json_data["items_gained"]:
-                                item_dict.setdefault("type", "diverse")
-                                item_dict.setdefault("value", 0)
-                                item_dict.setdefault("quantity", 1)
-                                items_gained.append(InventoryItem(**item_dict))
-                            json_data["items_gained"] = items_gained
+                        parsed = parse_api_content(content)
+                        router.record(model, elapsed, True)
                         
                         #print(f"\n{'='*40} LLM RAW RESPONSE {'='*40}")
                         #print(f"JSON RAW Content: {content}") 
@@ -250,9 +239,10 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                         #print(f"{'='*90}\n")
                         print(f"[SESSION {session_id}] ✅ SUCCESS WITH TOKEN {token_index + 1}")  # ⭕ LOG SUCCES
                         # Returnăm răspunsul validat
-                        return NarrativeResponse(**json_data)
+                        return parsed
                         
                     except json.JSONDecodeError as e:
+                        router.record(model, elapsed, False)
                         print(f"[SESSION {session_id}] ❌ TOKEN {token_index + 1} JSON Decode Error: {e}")  # ⭕ LOG
                         
                         if attempt < max_retries_per_key - 1:
@@ -263,7 +253,8 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                             break
                             
                     except ValidationError as e:
-                        print(f"[SESSION {session_id}] ❌ TOKEN {token_index + 1} Pydantic Validation Error: {e} {json_data}")  # ⭕ LOG
+                        router.record(model, elapsed, False)
+                        print(f"[SESSION {session_id}] ❌ TOKEN {token_index + 1} Pydantic Validation Error: {e} {content[:500]}")  # ⭕ LOG
                         if attempt < max_retries_per_key - 1:
                             time.sleep(1)
                             continue
@@ -272,6 +263,7 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                             break
 
                     except Exception as e:
+                        router.record(model, elapsed, False)
                         print(f"[SESSION {session_id}] ❌ TOKEN {token_index + 1} Unexpected Error during Pydantic/Data processing: {e}")  # ⭕ LOG
                         import traceback
                         traceback.print_exc()
@@ -294,13 +286,16 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
                     break
             
             except requests.exceptions.Timeout:
+                router.record(model, time.perf_counter() - t0, False)
                 print(f"[SESSION {session_id}] ⏱️ TIMEOUT TOKEN {token_index + 1}")  # ⭕ LOG
                 break  # Trecem la următoarea cheie
             except Exception as e:
+                router.record(model, time.perf_counter() - t0, False)
                 print(f"[SESSION {session_id}] ❌ Unknown EXCEPTION TOKEN {token_index + 1}: {e}")  # ⭕ LOG
                 import traceback
                 traceback.print_exc()
                 break
+        pool.release(lease)  # no-op dacă a fost deja întoarsă cu răspunsul
     print(f"[SESSION {session_id}] ❌ ALL TOKENS FAILED")  # ⭕ LOG
     # Dacă am epuizat toate cheile
     return NarrativeResponse(
@@ -309,16 +304,40 @@ def generate_with_api(prompt: str, use_api: bool = True) -> NarrativeResponse:
     )
 
     
-def generate_narrative_with_progress(prompt: str, use_api: bool = True) -> NarrativeResponse:
+def request_key(session_id: Optional[str], turn: Optional[int], prompt: str) -> tuple:
+    return (session_id, turn, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+
+def generate_with_api_shared(prompt: str, use_api: bool = True, session_id: Optional[str] = None,
+                             turn: Optional[int] = None, task: str = "narrative") -> NarrativeResponse:
+    """
+    generate_with_api cu coalescență: cererile identice (sesiune, tură, prompt) aflate în zbor
+    așteaptă același rezultat în loc să plătească un al doilea apel Groq. Un răspuns de eșec
+    (game_over) se împarte doar cu cererile aflate deja în așteptare.
+    """
+    session_id = session_id or get_session_id()
+    # Eșecul tuturor cheilor vine ca game_over=True: nu-l păstrăm LLM_DEDUP_LINGER, reîncercarea merge la Groq
+    response, shared = _inflight.do(
+        request_key(session_id, turn, prompt), lambda: generate_with_api(prompt, use_api, task),
+        keep=lambda r: not r.game_over,
+    )
+    if shared:
+        print(f"[SESSION {session_id}] 🔁 DUPLICATE REQUEST (turn {turn}) - folosim răspunsul deja în lucru")
+    return response
+
+
+def generate_narrative_with_progress(prompt: str, use_api: bool = True, session_id: Optional[str] = None,
+                                     turn: Optional[int] = None) -> NarrativeResponse:
     """
     Generează narativ cu bară de progres animată și returnează NarrativeResponse.
     Păstrează experiența "Scribii lui Vlad scriu..." în timp ce API-ul lucrează.
+    Cu `session_id`/`turn`, o cerere duplicată așteaptă răspunsul celei deja în lucru.
     """
     result_container = {"response": None, "error": None}
     
     def run_gen():
         try:
-            result_container["response"] = generate_with_api(prompt, use_api)
+            result_container["response"] = generate_with_api_shared(prompt, use_api, session_id, turn)
         except Exception as e:
             result_container["error"] = str(e)
             print(f"❌ Eroare în thread-ul de generare: {e}")
@@ -378,19 +397,22 @@ def generate_narrative_with_progress(prompt: str, use_api: bool = True) -> Narra
     
     return response
 
-def generate_local(prompt: str) -> str:
-    tokenizer, model = load_local_model()
-    if not tokenizer or not model:
+def generate_local(prompt: str, session_id: Optional[str] = None) -> str:
+    from local_backend import get_local_backend  # import leneș (vezi prewarm)
+
+    backend = get_local_backend()
+    if not backend.wait_ready(timeout=300):
         st.warning("❌ Modelul local nu este disponibil. Instalează `distilgpt2` manual.")
         return "Conexiunea cu tărâmul magic s-a întrerupt. (Verifică Token-ul)"
     try:
         context_prompt = f"Fantasy story: {prompt}"
-        inputs = tokenizer(context_prompt, return_tensors="pt", truncation=True, max_length=512)
-        with torch.no_grad():
-            out = model.generate(**inputs, max_new_tokens=80, do_sample=True, temperature=0.9, pad_token_id=tokenizer.eos_token_id)
-        text = tokenizer.decode(out[0], skip_special_tokens=True)
-        result = clean_ai_response(text.replace(context_prompt, ""))
-        return result
+        # Cererile concurente din alte sesiuni intră în același batch;
+        # prefixul comun cu tura anterioară a sesiunii vine din KV cache
+        text = backend.generate(
+            context_prompt, max_new_tokens=Config.LOCAL_MAX_NEW_TOKENS, temperature=0.9,
+            session_id=session_id or get_session_id()
+        )
+        return clean_ai_response(text)
     except Exception as e:
         st.error(f"❌ Eroare la generarea locală: {e}")
         return "Ceva a tulburat liniștea..."
@@ -0,0 +1,383 @@
+# local_backend.py - Backend local (fallback) cu warm start, cuantizare int8 și micro-batching
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+import queue
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM, DynamicCache
+from transformers.pytorch_utils import Conv1D
+
+from config import Config
+
+
+class _GenRequest:
+    """O cerere de generare care așteaptă să intre într-un batch"""
+    __slots__ = ("prompt", "max_new_tokens", "temperature", "session_id", "future", "enqueued_at")
+
+    def __init__(self, prompt: str, max_new_tokens: int, temperature: float, session_id: Optional[str] = None):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.session_id = session_id
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+def _conv1d_to_linear(model: torch.nn.Module) -> int:
+    """
+    GPT-2 folosește Conv1D (greutăți [in, out]) în loc de nn.Linear, iar
+    quantize_dynamic recunoaște doar nn.Linear. Le convertim înainte de cuantizare.
+    """
+    converted = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features, bias=child.bias is not None)
+                with torch.no_grad():
+                    linear.weight.copy_(child.weight.t())
+                    if child.bias is not None:
+                        linear.bias.copy_(child.bias)
+                setattr(parent, name, linear)
+                converted += 1
+    return converted
+
+
+def _slice_cache(cache, row: int, start: int, end: int) -> DynamicCache:
+    """Copie a cache-ului pentru un singur rând și intervalul de poziții [start, end)"""
+    sliced = DynamicCache()
+    for layer_idx, layer in enumerate(cache.layers):
+        sliced.update(
+            layer.keys[row:row + 1, :, start:end].clone(),
+            layer.values[row:row + 1, :, start:end].clone(),
+            layer_idx,
+        )
+    return sliced
+
+
+def _cache_nbytes(cache) -> int:
+    return sum(
+        layer.keys.numel() * layer.keys.element_size() + layer.values.numel() * layer.values.element_size()
+        for layer in cache.layers
+    )
+
+
+class _PrefixEntry:
+    __slots__ = ("token_ids", "cache", "nbytes")
+
+    def __init__(self, token_ids: List[int], cache):
+        self.token_ids = token_ids
+        self.cache = cache
+        self.nbytes = _cache_nbytes(cache)
+
+
+class PrefixKVCache:
+    """
+    Past key/values ale ultimului prompt din fiecare sesiune, limitate în bytes.
+    Evacuare LRU între sesiuni; o intrare e scoasă (take) cât timp e folosită la generare.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _PrefixEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reused_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def take(self, session_id: str) -> Optional[_PrefixEntry]:
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+            return entry
+
+    def put(self, session_id: str, token_ids: List[int], cache):
+        entry = _PrefixEntry(token_ids, cache)
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[session_id] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def record(self, reused: int):
+        with self._lock:
+            if reused:
+                self.hits += 1
+                self.reused_tokens += reused
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "kv_sessions": len(self._entries),
+                "kv_bytes": self._bytes,
+                "kv_hits": self.hits,
+                "kv_misses": self.misses,
+                "kv_evictions": self.evictions,
+                "kv_reused_tokens": self.reused_tokens,
+            }
+
+
+class LocalModelBackend:
+    """
+    Model local partajat de toate sesiunile din proces.
+    - se încarcă într-un thread la pornire (warm start)
+    - opțional cuantizat dinamic int8 (nn.Linear)
+    - cererile concurente sunt grupate într-un singur apel `generate` cu padding la stânga
+    - prefixul comun cu tura anterioară a aceleiași sesiuni nu se mai re-encodează (KV cache)
+    """
+
+    def __init__(self, model_name: str, quantize: bool = True,
+                 max_batch: int = 8, batch_wait_ms: int = 25, kv_cache_mb: int = 0,
+                 kv_min_prefix: int = 16):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = max(0, batch_wait_ms) / 1000.0
+        self.kv_cache = PrefixKVCache(max(0, kv_cache_mb) * 1024 * 1024)
+        self.kv_min_prefix = max(1, kv_min_prefix)
+
+        self.tokenizer = None
+        self.model = None
+        self.load_error: Optional[str] = None
+        self.load_seconds = 0.0
+        self.ready = threading.Event()
+
+        self._queue: "queue.Queue[_GenRequest]" = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._started = False
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "new_tokens": 0, "gen_seconds": 0.0, "latency_total": 0.0}
+
+    # ---------- ciclu de viață ----------
+    def start(self):
+        """Pornește încărcarea și worker-ul de batch (idempotent)"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._load, name="local-model-loader", daemon=True).start()
+        threading.Thread(target=self._batch_loop, name="local-model-batcher", daemon=True).start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        self.start()
+        return self.ready.wait(timeout) and self.model is not None
+
+    def _load(self):
+        t0 = time.perf_counter()
+        try:
+            cache_dir = os.getenv("HF_HOME", None)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, cache_dir=cache_dir)
+            tokenizer.padding_side = "left"  # generarea continuă de la dreapta
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            model = AutoModelForCausalLM.from_pretrained(self.model_name, cache_dir=cache_dir, torch_dtype=torch.float32)
+            model.eval()
+            if self.quantize:
+                model = self._quantize(model)
+            self.tokenizer, self.model = tokenizer, model
+            self.load_seconds = time.perf_counter() - t0
+            print(f"🧠 LOCAL MODEL READY: {self.model_name} (int8={self.quantize}) în {self.load_seconds:.1f}s")
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"❌ LOCAL MODEL LOAD FAILED: {e}")
+        finally:
+            self.ready.set()
+
+    @staticmethod
+    def _quantize(model: torch.nn.Module) -> torch.nn.Module:
+        converted = _conv1d_to_linear(model)
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f"🧠 LOCAL MODEL int8: {converted} straturi Conv1D convertite în Linear")
+        return quantized
+
+    # ---------- API public ----------
+    def submit(self, prompt: str, max_new_tokens: int = Config.LOCAL_MAX_NEW_TOKENS,
+               temperature: float = 0.9, session_id: Optional[str] = None) -> Future:
+        """Pune cererea în coadă; rezultatul (doar textul nou) vine prin Future"""
+        self.start()
+        req = _GenRequest(prompt, max_new_tokens, temperature, session_id)
+        self._queue.put(req)
+        return req.future
+
+    def generate(self, prompt: str, max_new_tokens: int = Config.LOCAL_MAX_NEW_TOKENS,
+                 temperature: float = 0.9, timeout: Optional[float] = 120,
+                 session_id: Optional[str] = None) -> str:
+        return self.submit(prompt, max_new_tokens, temperature, session_id).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["tokens_per_sec"] = s["new_tokens"] / s["gen_seconds"] if s["gen_seconds"] else 0.0
+        s["avg_latency"] = s["latency_total"] / s["requests"] if s["requests"] else 0.0
+        s["avg_batch"] = s["requests"] / s["batches"] if s["batches"] else 0.0
+        s.update(self.kv_cache.stats())
+        return s
+
+    # ---------- worker ----------
+    def _collect_batch(self) -> List[_GenRequest]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while True:
+            batch = self._collect_batch()
+            self.ready.wait()
+            if self.model is None:
+                for req in batch:
+                    req.future.set_exception(RuntimeError(self.load_error or "Modelul local nu este disponibil"))
+                continue
+            # Sesiunile cu prefix în cache rulează separat (doar sufixul nou),
+            # restul intră în batch-uri grupate după parametrii de sampling
+            groups: Dict[Tuple[int, float], List[_GenRequest]] = {}
+            for req in batch:
+                if not self._try_cached(req):
+                    groups.setdefault((req.max_new_tokens, req.temperature), []).append(req)
+            for (max_new_tokens, temperature), reqs in groups.items():
+                self._run_batch(reqs, max_new_tokens, temperature)
+
+    def _encode(self, prompt: str) -> List[int]:
+        return self.tokenizer(prompt, truncation=True, max_length=Config.LOCAL_MAX_INPUT_TOKENS)["input_ids"]
+
+    def _try_cached(self, req: _GenRequest) -> bool:
+        if not (req.session_id and self.kv_cache.enabled):
+            return False
+        entry = self.kv_cache.take(req.session_id)
+        if entry is None:
+            self.kv_cache.record(0)
+            return False
+        try:
+            ids = self._encode(req.prompt)
+            common = 0
+            for a, b in zip(entry.token_ids, ids):
+                if a != b:
+                    break
+                common += 1
+            common = min(common, len(ids) - 1)  # măcar un token nou trece prin model
+            if common < self.kv_min_prefix:
+                self.kv_cache.record(0)
+                return False
+            past = entry.cache
+            if common < len(entry.token_ids):
+                past = _slice_cache(past, 0, 0, common)
+            input_ids = torch.tensor([ids])
+            t0 = time.perf_counter()
+            with torch.inference_mode():
+                out = self.model.generate(
+                    input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                    past_key_values=past, max_new_tokens=req.max_new_tokens, do_sample=True,
+                    temperature=req.temperature, pad_token_id=self.tokenizer.pad_token_id,
+                    return_dict_in_generate=True,
+                )
+            gen_seconds = time.perf_counter() - t0
+            self.kv_cache.record(common)
+            self.kv_cache.put(req.session_id, ids, _slice_cache(out.past_key_values, 0, 0, len(ids)))
+            self._finish([req], out.sequences[:, len(ids):], gen_seconds)
+        except Exception as e:
+            print(f"❌ LOCAL KV ERROR (sesiune {req.session_id}): {e}")
+            if not req.future.done():
+                req.future.set_exception(e)
+        return True
+
+    def _run_batch(self, reqs: List[_GenRequest], max_new_tokens: int, temperature: float):
+        try:
+            inputs = self.tokenizer(
+                [r.prompt for r in reqs], return_tensors="pt", padding=True,
+                truncation=True, max_length=Config.LOCAL_MAX_INPUT_TOKENS
+            )
+            t0 = time.perf_counter()
+            with torch.inference_mode():
+                out = self.model.generate(
+                    **inputs, max_new_tokens=max_new_tokens, do_sample=True,
+                    temperature=temperature, pad_token_id=self.tokenizer.pad_token_id,
+                    return_dict_in_generate=True,
+                )
+            gen_seconds = time.perf_counter() - t0
+            padded_len = inputs["input_ids"].shape[1]
+            if self.kv_cache.enabled:
+                # Cu padding la stânga, pozițiile reale ale rândului i sunt [pad_i, padded_len)
+                for row, req in enumerate(reqs):
+                    if req.session_id:
+                        mask = inputs["attention_mask"][row]
+                        pad = int((mask == 0).sum())
+                        ids = inputs["input_ids"][row, pad:].tolist()
+                        self.kv_cache.put(req.session_id, ids, _slice_cache(out.past_key_values, row, pad, padded_len))
+            self._finish(reqs, out.sequences[:, padded_len:], gen_seconds)
+        except Exception as e:
+            print(f"❌ LOCAL BATCH ERROR ({len(reqs)} cereri): {e}")
+            for req in reqs:
+                if not req.future.done():
+                    req.future.set_exception(e)
+
+    def _finish(self, reqs: List[_GenRequest], new_ids, gen_seconds: float):
+        texts = []
+        new_tokens = 0
+        eos = self.tokenizer.eos_token_id
+        for ids in new_ids:
+            ids = ids.tolist()
+            if eos in ids:
+                ids = ids[:ids.index(eos)]
+            new_tokens += len(ids)
+            texts.append(self.tokenizer.decode(ids, skip_special_tokens=True))
+        done_at = time.perf_counter()
+        with self._stats_lock:
+            self._stats["requests"] += len(reqs)
+            self._stats["batches"] += 1
+            self._stats["new_tokens"] += new_tokens
+            self._stats["gen_seconds"] += gen_seconds
+            self._stats["latency_total"] += sum(done_at - r.enqueued_at for r in reqs)
+        for req, text in zip(reqs, texts):
+            req.future.set_result(text)
+
+
+_backend: Optional[LocalModelBackend] = None
+_backend_lock = threading.Lock()
+
+def get_local_backend() -> LocalModelBackend:
+    """Singleton per proces (nu per sesiune Streamlit)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = LocalModelBackend(
+                Config.LOCAL_FALLBACK_MODEL,
+                quantize=Config.LOCAL_QUANTIZE_INT8,
+                max_batch=Config.LOCAL_MAX_BATCH,
+                batch_wait_ms=Config.LOCAL_BATCH_WAIT_MS,
+                kv_cache_mb=Config.LOCAL_KV_CACHE_MB,
+                kv_min_prefix=Config.LOCAL_KV_MIN_PREFIX,
+            )
+        return _backend
+
+def warm_start():
+    """Încarcă modelul local în fundal la pornirea procesului"""
+    if Config.LOCAL_WARM_START:
+        get_local_backend().start()
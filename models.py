@@ -1,6 +1,9 @@
 # models.py - Modele Pydantic V2
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Any
+import base64
+import unicodedata
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, field_validator
+from pydantic_core import core_schema
+from typing import List, Optional, Dict, Any, Iterable, Iterator
 from enum import Enum
 
 class ItemType(str, Enum):
@@ -24,6 +27,96 @@ class InventoryItem(BaseModel):
             raise ValueError("Numele obiectului nu poate fi gol")
         return v.strip()
 
+def normalize_item_name(name: str) -> str:
+    """Cheia din inventar: NFC, casefold, spații comprimate ("Sabie  Veche" == "sabie veche")"""
+    return " ".join(unicodedata.normalize("NFC", name).casefold().split())
+
+class Inventory:
+    """
+    Inventar indexat după numele normalizat: add/remove/get în O(1), căutare după ItemType
+    fără scanare. În JSON / model_dump rămâne lista de obiecte de până acum.
+    """
+
+    def __init__(self, items: Iterable[InventoryItem] = ()):
+        self._items: Dict[str, InventoryItem] = {}
+        self._by_type: Dict[ItemType, Dict[str, InventoryItem]] = {}
+        self._coins = 0  # câte obiecte "... galbeni" există (validate_inventory)
+        for item in items:
+            self.add(item)
+
+    # ---- acces ----
+    def __iter__(self) -> Iterator[InventoryItem]:
+        return iter(self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_item_name(name) in self._items
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Inventory):
+            return list(self._items.values()) == list(other._items.values())
+        if isinstance(other, list):
+            return list(self._items.values()) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Inventory({list(self._items.values())!r})"
+
+    def get(self, name: str) -> Optional[InventoryItem]:
+        return self._items.get(normalize_item_name(name))
+
+    def by_type(self, item_type: ItemType) -> List[InventoryItem]:
+        return list(self._by_type.get(item_type, {}).values())
+
+    def has_coins(self) -> bool:
+        return self._coins > 0
+
+    # ---- modificări ----
+    def add(self, item: InventoryItem) -> InventoryItem:
+        """Adaugă obiectul sau crește cantitatea celui existent cu același nume"""
+        key = normalize_item_name(item.name)
+        existing = self._items.get(key)
+        if existing is not None:
+            existing.quantity += item.quantity
+            return existing
+        self._items[key] = item
+        self._by_type.setdefault(item.type, {})[key] = item
+        if item.name.endswith("galbeni"):
+            self._coins += 1
+        return item
+
+    def remove(self, name: str) -> Optional[InventoryItem]:
+        """Scoate obiectul cu totul (ca items_lost); numele inexistente sunt ignorate"""
+        key = normalize_item_name(name)
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._by_type.get(item.type, {}).pop(key, None)
+            if item.name.endswith("galbeni"):
+                self._coins -= 1
+        return item
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [item.model_dump() for item in self._items.values()]
+
+    def copy(self) -> "Inventory":
+        """Copie independentă: obiectele se copiază și ele (add() crește cantitatea pe loc)"""
+        return Inventory(item.model_copy() for item in self._items.values())
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        from_list = core_schema.no_info_after_validator_function(
+            cls, handler.generate_schema(List[InventoryItem])
+        )
+        return core_schema.json_or_python_schema(
+            json_schema=from_list,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_list]),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda inv, info: [item.model_dump(mode=info.mode) for item in inv], info_arg=True
+            ),
+        )
+
 class CharacterStats(BaseModel):
     health: int = Field(ge=0, le=100, default=100)
     max_health: int = Field(default=100)
@@ -55,7 +148,7 @@ class NarrativeResponse(BaseModel):
     
 class GameState(BaseModel):
     character: CharacterStats
-    inventory: List[InventoryItem]
+    inventory: Inventory
     story: List[Dict[str, Any]]
     turn: int
     last_image_turn: int
@@ -64,6 +157,54 @@ class GameState(BaseModel):
     @classmethod
     def validate_inventory(cls, v):
         # Asigură că există cel puțin monedele
-        if not any(item.name.endswith("galbeni") for item in v):
-            v.append(InventoryItem(name="5 galbeni", type=ItemType.currency, value=5, quantity=1))
-        return v
\ No newline at end of file
+        if not v.has_coins():
+            v.add(InventoryItem(name="5 galbeni", type=ItemType.currency, value=5, quantity=1))
+        return v
+
+    def fork(self) -> "GameState":
+        """
+        Copie pe care se construiește o tură nouă fără a atinge starea comisă (vezi state_cell).
+        Lista story e nouă, dar mesajele sunt partajate: nu se modifică pe loc, ci se înlocuiesc.
+        """
+        return GameState.model_construct(
+            character=self.character.model_copy(update={"status_effects": list(self.character.status_effects)}),
+            inventory=self.inventory.copy(),
+            story=list(self.story),
+            turn=self.turn,
+            last_image_turn=self.last_image_turn,
+        )
+
+    def to_save_dict(self, include_images: bool = True) -> Dict[str, Any]:
+        """
+        Formatul fișierului de salvare: imaginile (bytes) devin base64 pentru JSON.
+        Cu include_images=False imaginile rămân None (apelantul pune referințe, ex. jurnalul).
+        """
+        story_with_images = []
+        for msg in self.story:
+            msg_copy = msg.copy()
+            if msg_copy.get("image") and isinstance(msg_copy["image"], bytes):
+                msg_copy["image"] = base64.b64encode(msg_copy["image"]).decode('utf-8') if include_images else None
+            story_with_images.append(msg_copy)
+        return {
+            "character": self.character.model_dump(),
+            "inventory": self.inventory.to_list(),
+            "story": story_with_images,
+            "turn": self.turn,
+            "last_image_turn": self.last_image_turn,
+        }
+
+    @classmethod
+    def from_save_dict(cls, data: Dict[str, Any]) -> "GameState":
+        """Inversul lui to_save_dict: decodează imaginile base64 înapoi în bytes"""
+        story_with_images = []
+        for msg in data.get("story", []):
+            if msg.get("image") and isinstance(msg["image"], str):
+                msg["image"] = base64.b64decode(msg["image"].encode('utf-8'))
+            story_with_images.append(msg)
+        return cls(
+            character=CharacterStats(**data["character"]),
+            inventory=[InventoryItem(**item) for item in data["inventory"]],
+            story=story_with_images,
+            turn=data.get("turn", 0),
+            last_image_turn=data.get("last_image_turn", -10)
+        )
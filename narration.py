@@ -0,0 +1,405 @@
+# narration.py - Narațiune audio: propoziții sintetizate în paralel, cache adresat prin conținut
+import hashlib
+import importlib.util
+import io
+import math
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from prompt_context import clean_message
+from singleflight import SingleFlight
+
+# Sfârșit de propoziție: . ! ? … (eventual urmat de ghilimele) și spațiu; un rând nou e tot o graniță
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"”»'])\s+|\s*\n\s*")
+_SOFT_BREAK_RE = re.compile(r"[,;:—–]\s")
+_SPACES_RE = re.compile(r"\s+")
+_MIN_SENTENCE_CHARS = 12  # "Da!", "Stai!" se lipesc de propoziția următoare
+
+
+def _split_long(sentence: str, limit: int) -> List[str]:
+    """O propoziție peste `limit` caractere se taie la ultima virgulă / pauză (sau ultimul spațiu) dinainte"""
+    parts = []
+    while len(sentence) > limit:
+        head = sentence[:limit]
+        cuts = [m.end() for m in _SOFT_BREAK_RE.finditer(head)]
+        cut = cuts[-1] if cuts else head.rfind(" ") + 1
+        if cut <= 0:
+            cut = limit
+        parts.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        parts.append(sentence)
+    return parts
+
+
+def split_sentences(text: str, max_chars: int = Config.TTS_MAX_SENTENCE_CHARS) -> List[str]:
+    """
+    Textul de citit al unei replici (fără sugestii, întrebarea finală și marcaje), pe propoziții.
+    Propozițiile fixe (introducerea din Config.make_intro_text) ies mereu la fel, deci se potrivesc în cache.
+    """
+    sentences: List[str] = []
+    carry = ""
+    for raw in _SENTENCE_END_RE.split(clean_message(text)):
+        sentence = _SPACES_RE.sub(" ", raw).strip()
+        if not sentence:
+            continue
+        if carry:
+            sentence = f"{carry} {sentence}"
+            carry = ""
+        if len(sentence) < _MIN_SENTENCE_CHARS:
+            carry = sentence
+            continue
+        sentences.extend(_split_long(sentence, max_chars))
+    if carry:
+        if sentences and len(sentences[-1]) + len(carry) < max_chars:
+            sentences[-1] = f"{sentences[-1]} {carry}"
+        else:
+            sentences.append(carry)
+    return sentences
+
+
+# ========== backend-uri TTS ==========
+class TTSBackend(ABC):
+    """Text → octeți audio; o instanță e folosită concurent din firele de sinteză"""
+    name = "base"
+    mime = "audio/mpeg"
+    extension = "mp3"
+
+    def __init__(self, language: str = Config.TTS_LANGUAGE, voice: str = Config.TTS_VOICE):
+        self.language = language
+        self.voice = voice
+
+    def available(self) -> bool:
+        return True
+
+    @property
+    def namespace(self) -> str:
+        """Tot ce schimbă sunetul pentru același text: intră în cheia din cache"""
+        return f"{self.name}|{self.language}|{self.voice}"
+
+    @abstractmethod
+    def synthesize(self, text: str) -> bytes:
+        ...
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (gTTS): fără cheie, MP3, o cerere HTTP per propoziție"""
+    name = "gtts"
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("gtts") is not None
+
+    def synthesize(self, text: str) -> bytes:
+        from gtts import gTTS  # import local: dependență opțională
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang=self.language).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class ElevenLabsBackend(TTSBackend):
+    """ElevenLabs (model multilingv, are română); cere ELEVENLABS_API_KEY"""
+    name = "elevenlabs"
+    DEFAULT_VOICE = "JBFqnCBsd6RMkjVDRZzb"
+
+    def __init__(self, language: str = Config.TTS_LANGUAGE, voice: str = Config.TTS_VOICE):
+        super().__init__(language, voice or self.DEFAULT_VOICE)
+        self.model = Config.TTS_ELEVENLABS_MODEL
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def namespace(self) -> str:
+        return f"{super().namespace}|{self.model}"
+
+    def available(self) -> bool:
+        return bool(os.getenv("ELEVENLABS_API_KEY")) and importlib.util.find_spec("elevenlabs") is not None
+
+    def synthesize(self, text: str) -> bytes:
+        with self._client_lock:
+            if self._client is None:
+                from elevenlabs.client import ElevenLabs  # import local: dependență opțională
+
+                self._client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        audio = self._client.text_to_speech.convert(
+            voice_id=self.voice, text=text, model_id=self.model, output_format="mp3_44100_128",
+        )
+        return b"".join(audio)
+
+
+class OfflineBackend(TTSBackend):
+    """
+    Înlocuitor local, fără rețea și fără dependențe: un WAV cu câte un ton per cuvânt,
+    de durata aproximativă a vorbirii. `latency` simulează timpul unui serviciu real.
+    """
+    name = "offline"
+    mime = "audio/wav"
+    extension = "wav"
+    RATE = 8000
+
+    def __init__(self, language: str = Config.TTS_LANGUAGE, voice: str = Config.TTS_VOICE,
+                 latency: float = 0.0):
+        super().__init__(language, voice)
+        self.latency = latency
+
+    def synthesize(self, text: str) -> bytes:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        frames = bytearray()
+        gap = bytes(2 * self.RATE // 25)  # 40 ms liniște între cuvinte
+        for word in text.split():
+            seed = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:2], "big")
+            freq = 140 + seed % 120  # determinist: același cuvânt, același ton
+            samples = int(self.RATE * min(0.6, 0.06 * len(word)))
+            step = 2 * math.pi * freq / self.RATE
+            frames += struct.pack(f"<{samples}h", *(int(6000 * math.sin(step * i)) for i in range(samples)))
+            frames += gap
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.RATE)
+            w.writeframes(bytes(frames))
+        return buf.getvalue()
+
+
+BACKENDS = {b.name: b for b in (GTTSBackend, ElevenLabsBackend, OfflineBackend)}
+
+
+def make_backend(name: str = Config.TTS_BACKEND) -> Optional[TTSBackend]:
+    """Backend-ul configurat sau None (dezactivat, necunoscut sau fără dependența instalată)"""
+    cls = BACKENDS.get((name or "none").strip().lower())
+    if cls is None:
+        return None
+    backend = cls()
+    return backend if backend.available() else None
+
+
+# ========== cache ==========
+class AudioCache:
+    """
+    Audio pe disc, adresat prin conținut: sha256(backend|limbă|voce + propoziție) → fișier.
+    Aceeași propoziție (introducerea, replici repetate) se sintetizează o singură dată,
+    pentru toate sesiunile și procesele. Evacuare LRU după numărul de fișiere.
+    """
+
+    def __init__(self, directory: str = Config.TTS_CACHE_DIR, max_files: int = Config.TTS_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._counters = {"hits": 0, "misses": 0, "stored": 0}
+
+    @staticmethod
+    def key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()[:40]
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key: str, extension: str) -> Optional[bytes]:
+        path = self._path(key, extension)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # LRU: fișierul folosit recent rămâne în cache
+        except OSError:
+            data = None
+        with self._lock:
+            self._counters["hits" if data else "misses"] += 1
+        return data or None
+
+    def put(self, key: str, extension: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        # Scriere atomică: alt proces poate citi aceeași cheie în același timp
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key, extension))
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._counters["stored"] += 1
+            self._puts += 1
+            evict = self._puts % 50 == 0
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        try:
+            files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if not f.endswith(".tmp")]
+            if len(files) <= self.max_files:
+                return
+            files.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+# ========== pipeline ==========
+# Rezultatul unei propoziții: (audio sau None dacă sinteza a eșuat, venit din cache?)
+Segment = Tuple[Optional[bytes], bool]
+
+
+class Narration:
+    """
+    Narațiunea unei replici: câte un future per propoziție, trimise în ordinea textului.
+    Consumatorul (UI) ia segmentele în ordine cu segments(); poziția se păstrează,
+    deci o rulare întreruptă sau o reîmprospătare ulterioară continuă de unde a rămas.
+    """
+    __slots__ = ("key", "sentences", "futures", "mime", "next", "delivered", "cached", "failed",
+                 "started_at", "first_at", "waiting_since")
+
+    def __init__(self, key: str, sentences: List[str], futures: List["Future[Segment]"], mime: str):
+        self.key = key
+        self.sentences = sentences
+        self.futures = futures
+        self.mime = mime
+        self.next = 0        # următorul future de consumat
+        self.delivered = 0   # segmente audio predate (fără cele eșuate): indicii playerului
+        self.cached = 0
+        self.failed = 0
+        self.started_at = time.perf_counter()
+        self.first_at: Optional[float] = None
+        self.waiting_since: Optional[float] = None  # de când așteaptă UI-ul (fără blocare) propoziția curentă
+
+    @property
+    def done(self) -> bool:
+        return self.next >= len(self.futures)
+
+    def segments(self, timeout: float = Config.TTS_SEGMENT_TIMEOUT,
+                 wait: bool = True) -> Iterator[Tuple[int, bytes]]:
+        """
+        (indice în player, audio) în ordine; o propoziție eșuată sau mai lentă de `timeout` se sare.
+        Cu wait=False se predau doar segmentele deja gata, fără blocare: apelantul revine mai târziu.
+        """
+        while self.next < len(self.futures):
+            future = self.futures[self.next]
+            if not wait and not future.done():
+                now = time.perf_counter()
+                if self.waiting_since is None:
+                    self.waiting_since = now
+                if now - self.waiting_since < timeout:
+                    return
+                future.cancel()
+                data, cached = None, False
+            else:
+                try:
+                    data, cached = future.result(timeout=timeout)
+                except (FutureTimeout, CancelledError):
+                    future.cancel()
+                    data, cached = None, False
+            self.waiting_since = None
+            self.next += 1
+            if data is None:
+                self.failed += 1
+                continue
+            self.cached += cached
+            if self.first_at is None:
+                self.first_at = time.perf_counter() - self.started_at
+            index = self.delivered
+            self.delivered += 1
+            yield index, data
+
+    def cancel(self):
+        for future in self.futures[self.next:]:
+            future.cancel()
+
+
+class Narrator:
+    """Sinteza comună procesului: un pool de fire, cache-ul pe disc și deduplicarea cererilor în zbor"""
+
+    def __init__(self, backend: TTSBackend, cache: Optional[AudioCache] = None,
+                 concurrency: int = Config.TTS_CONCURRENCY):
+        self.backend = backend
+        self.cache = cache or AudioCache()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="tts")
+        self._inflight = SingleFlight()  # două sesiuni care încep introducerea deodată
+        self._lock = threading.Lock()
+        self._synth_seconds = 0.0
+        self._synthesized = 0
+        self._errors = 0
+
+    def _synthesize(self, key: str, sentence: str) -> bytes:
+        t0 = time.perf_counter()
+        data = self.backend.synthesize(sentence)
+        elapsed = time.perf_counter() - t0
+        self.cache.put(key, self.backend.extension, data)
+        with self._lock:
+            self._synth_seconds += elapsed
+            self._synthesized += 1
+        return data
+
+    def _segment(self, sentence: str, session_id: Optional[str]) -> Segment:
+        key = self.cache.key(self.backend.namespace, sentence)
+        data = self.cache.get(key, self.backend.extension)
+        if data is not None:
+            return data, True
+        try:
+            data, _ = self._inflight.do(key, lambda: self._synthesize(key, sentence))
+            return data, False
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            print(f"[SESSION {session_id}] ⚠️ TTS {self.backend.name}: {e}")
+            return None, False
+
+    def narrate(self, text: str, key: str, session_id: Optional[str] = None) -> Optional[Narration]:
+        """Pornește sinteza tuturor propozițiilor (prima intră prima în pool); None dacă nu e nimic de citit"""
+        sentences = split_sentences(text)
+        if not sentences:
+            return None
+        futures = [self._executor.submit(self._segment, s, session_id) for s in sentences]
+        print(f"[SESSION {session_id}] 🔊 NARRATION {key}: {len(sentences)} propoziții ({self.backend.name})")
+        return Narration(key, sentences, futures, self.backend.mime)
+
+    def stats(self) -> Dict[str, float]:
+        report = dict(self.cache.stats())
+        with self._lock:
+            report["synthesized"] = self._synthesized
+            report["errors"] = self._errors
+            mean = self._synth_seconds / self._synthesized if self._synthesized else 0.0
+        report["synth_mean_s"] = round(mean, 3)
+        report["seconds_saved"] = round(report["hits"] * mean, 1)
+        return report
+
+
+_narrator: Optional[Narrator] = None
+_narrator_checked = False
+_narrator_lock = threading.Lock()
+
+def get_narrator() -> Optional[Narrator]:
+    """Narratorul procesului sau None dacă TTS_BACKEND e dezactivat / indisponibil (verificat o dată)"""
+    global _narrator, _narrator_checked
+    with _narrator_lock:
+        if not _narrator_checked:
+            _narrator_checked = True
+            backend = make_backend()
+            if backend is not None:
+                _narrator = Narrator(backend)
+            elif Config.TTS_BACKEND.strip().lower() != "none":
+                print(f"🔇 TTS backend '{Config.TTS_BACKEND}' indisponibil (dependență sau cheie lipsă): "
+                      f"narațiunea audio e dezactivată")
+        return _narrator
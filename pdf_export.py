@@ -0,0 +1,171 @@
+# pdf_export.py - Export PDF în fundal: HTML în flux → randare în pool-ul de procese → cache pe disc
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import Config
+from export_html import StoryHtmlWriter
+from workers import run_job
+
+
+def story_key(story: List[Dict], turn: int) -> str:
+    """Cheia de cache: textul și imaginile (digest) fiecărui mesaj + tura curentă"""
+    h = hashlib.sha256(str(turn).encode("ascii"))
+    for msg in story:
+        h.update(b"\x1e" + (msg.get("role") or "").encode("utf-8"))
+        h.update(b"\x1f" + (msg.get("text") or "").encode("utf-8"))
+        image = msg.get("image")
+        if image:
+            h.update(b"\x1f" + hashlib.sha256(image).digest())
+    return h.hexdigest()[:32]
+
+
+def render_pdf_file(html_path: str, pdf_path: str) -> str:
+    """
+    Rulează în worker: weasyprint (din requirements.txt), altfel pdfkit (wkhtmltopdf).
+    Întoarce numele motorului folosit.
+    """
+    try:
+        import weasyprint
+    except OSError:  # pachetul e instalat, dar lipsesc bibliotecile native (pango/cairo) ale sistemului
+        weasyprint = None
+    except ImportError:  # instalare fără requirements.txt complet
+        weasyprint = None
+    if weasyprint is not None:
+        weasyprint.HTML(filename=html_path).write_pdf(pdf_path)
+        return "weasyprint"
+
+    import pdfkit
+
+    try:
+        pdfkit.from_file(html_path, pdf_path, options={
+            "enable-local-file-access": "",
+            "encoding": "UTF-8",
+            "quiet": "",
+        })
+    except OSError as e:
+        raise RuntimeError(f"Niciun motor PDF disponibil (instalează weasyprint sau wkhtmltopdf): {e}")
+    return "pdfkit"
+
+
+class PdfJob:
+    """Starea unui export: queued → html → render → done / error, cu progres 0..1"""
+    __slots__ = ("key", "state", "progress", "path", "error", "engine", "started_at", "seconds")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.state = "queued"
+        self.progress = 0.0
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.engine: Optional[str] = None
+        self.started_at = time.time()
+        self.seconds = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "error")
+
+
+class PdfExporter:
+    """
+    Coada de exporturi PDF a procesului. Fiecare job rulează pe un fir propriu:
+    HTML-ul (cu imaginile ca fișiere) se scrie în flux, iar randarea PDF rulează în
+    pool-ul de procese, deci nici sesiunea care exportă, nici celelalte nu stau după ea.
+    Același (poveste, tură) → același fișier din cache, fără a randa din nou.
+    """
+
+    def __init__(self, cache_dir: str = Config.PDF_CACHE_DIR, max_files: int = Config.PDF_CACHE_MAX_FILES):
+        self.cache_dir = cache_dir
+        self.max_files = max(1, max_files)
+        self._jobs: Dict[str, PdfJob] = {}
+        self._lock = threading.Lock()
+        # Un PDF poate ține un worker până la PDF_RENDER_TIMEOUT: nu lăsăm exporturile să ocupe tot pool-ul
+        self._render_slots = threading.BoundedSemaphore(max(1, Config.PDF_MAX_CONCURRENT))
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def submit(self, story: List[Dict], turn: int) -> PdfJob:
+        key = story_key(story, turn)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != "error" and (job.path is None or os.path.exists(job.path)):
+                return job  # deja în lucru sau gata (și încă în cache)
+            if len(self._jobs) >= 200:
+                for old_key in [k for k, j in self._jobs.items() if j.done]:
+                    del self._jobs[old_key]
+            job = PdfJob(key)
+            self._jobs[key] = job
+            cached = self._cache_path(key)
+            if os.path.exists(cached):
+                os.utime(cached)  # LRU: fișierul folosit recent rămâne în cache
+                job.state, job.progress, job.path = "done", 1.0, cached
+                print(f"📄 PDF CACHE HIT {key}")
+                return job
+        # copie superficială: story-ul sesiunii poate primi mesaje noi cât randăm
+        snapshot = [dict(m) for m in story]
+        threading.Thread(target=self._run, args=(job, snapshot), daemon=True).start()
+        return job
+
+    def get(self, key: str) -> Optional[PdfJob]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _run(self, job: PdfJob, story: List[Dict]):
+        t0 = time.perf_counter()
+        workdir = tempfile.mkdtemp(prefix="wallachia_pdf_")
+        try:
+            job.state = "html"
+            html_path = os.path.join(workdir, "index.html")
+            total = max(1, len(story))
+            with open(html_path, "w", encoding="utf-8") as f:
+                writer = StoryHtmlWriter(f, images="external", image_dir=os.path.join(workdir, "images"))
+                writer.begin()
+                for i, msg in enumerate(story):
+                    writer.message(msg)
+                    job.progress = 0.4 * (i + 1) / total
+                writer.end()
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_pdf = os.path.join(workdir, "export.pdf")
+            with self._render_slots:
+                job.state = "render"
+                job.engine = run_job(render_pdf_file, html_path, tmp_pdf, timeout=Config.PDF_RENDER_TIMEOUT)
+            final = self._cache_path(job.key)
+            shutil.move(tmp_pdf, final)
+            self._evict()
+            job.path, job.progress, job.state = final, 1.0, "done"
+            job.seconds = time.perf_counter() - t0
+            print(f"📄 PDF READY {job.key} ({job.engine}, {len(story)} mesaje, {job.seconds:.1f}s)")
+        except Exception as e:
+            job.error, job.state = str(e), "error"
+            print(f"❌ PDF EXPORT FAILED {job.key}: {e}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _evict(self):
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".pdf")]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_exporter: Optional[PdfExporter] = None
+_exporter_lock = threading.Lock()
+
+def get_pdf_exporter() -> PdfExporter:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = PdfExporter()
+        return _exporter
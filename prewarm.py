@@ -0,0 +1,53 @@
+# prewarm.py - Dependențele grele se importă în fundal, după ce prima pagină a fost servită
+import importlib
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from config import Config
+
+_started = False
+_lock = threading.Lock()
+_import_seconds: Dict[str, float] = {}
+_done = threading.Event()
+
+
+def _run():
+    t0 = time.perf_counter()
+    for name in Config.PREWARM_MODULES:
+        if name in sys.modules:
+            continue  # deja importat de o cale de cod care a rulat înaintea noastră
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            _import_seconds[name] = time.perf_counter() - start
+        except Exception as e:
+            print(f"⚠️ PREWARM {name} FAILED: {e}")
+    if "local_backend" in sys.modules:
+        sys.modules["local_backend"].warm_start()  # încarcă modelul local dacă LOCAL_WARM_START=1
+    _done.set()
+    summary = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in _import_seconds.items())
+    print(f"🔥 PREWARM DONE în {time.perf_counter() - t0:.2f}s ({summary or 'nimic de importat'})")
+
+
+def start_prewarm() -> bool:
+    """O singură dată per proces; apelat la finalul primei rulări a scriptului Streamlit"""
+    global _started
+    if not Config.PREWARM:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_run, name="prewarm", daemon=True).start()
+    return True
+
+
+def wait_prewarm(timeout: Optional[float] = None) -> bool:
+    return _done.wait(timeout)
+
+
+def import_report() -> Dict[str, float]:
+    """Cât a durat importul fiecărui modul greu în firul de prewarm (secunde)"""
+    return dict(_import_seconds)
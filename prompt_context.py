@@ -0,0 +1,167 @@
+# prompt_context.py - Fereastra de context a promptului: ultimele replici care încap într-un buget de tokeni
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+# Decorațiunile adăugate doar pentru afișare (nu ajută modelul, doar consumă tokeni)
+_SUGGESTIONS_RE = re.compile(r"\s*\*\*Sugestii:\*\*.*\Z", re.S)
+_PROMPT_QUESTION_RE = re.compile(r"\s*\*\*Ce vrei să faci\?\*\*\s*\Z")
+_EMPHASIS_RE = re.compile(r"\*{1,2}")
+_BLANK_LINES_RE = re.compile(r"\n{2,}")
+
+# Euristica fără tokenizer: textul românesc dă ~1 token BPE la 3 caractere
+_CHARS_PER_TOKEN = 3.0
+_TOKENIZER_RETRY_SECONDS = 300
+
+
+def clean_message(text: str) -> str:
+    """Textul unei replici fără blocul de sugestii, întrebarea finală și marcajele markdown"""
+    text = _SUGGESTIONS_RE.sub("", text or "")
+    text = _PROMPT_QUESTION_RE.sub("", text)
+    text = _EMPHASIS_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n", text).strip()
+
+
+# ========== numărarea tokenilor ==========
+_tokenizer = None
+_tokenizer_checked_at = 0.0
+_tokenizer_lock = threading.Lock()
+
+def _get_tokenizer():
+    """
+    Tokenizerul modelului local, doar din cache-ul HF (fără descărcări în mijlocul unei ture).
+    Dacă nu e încă pe disc, folosim euristica și reîncercăm peste câteva minute
+    (backend-ul local îl descarcă la pornire).
+    """
+    global _tokenizer, _tokenizer_checked_at
+    if _tokenizer is not None or Config.PROMPT_TOKENIZER == "none":
+        return _tokenizer
+    with _tokenizer_lock:
+        now = time.time()
+        if _tokenizer is not None or now - _tokenizer_checked_at < _TOKENIZER_RETRY_SECONDS:
+            return _tokenizer
+        _tokenizer_checked_at = now
+        try:
+            from transformers import AutoTokenizer
+
+            _tokenizer = AutoTokenizer.from_pretrained(
+                Config.PROMPT_TOKENIZER, cache_dir=os.getenv("HF_HOME", None), local_files_only=True
+            )
+            _count_cached.cache_clear()  # numărătorile euristice de până acum nu mai sunt valabile
+            print(f"🔢 PROMPT TOKENIZER: {Config.PROMPT_TOKENIZER}")
+        except Exception as e:
+            print(f"⚠️ Tokenizer indisponibil ({Config.PROMPT_TOKENIZER}): {e} - numărăm euristic")
+        return _tokenizer
+
+
+def heuristic_tokens(text: str) -> int:
+    return int(len(text) / _CHARS_PER_TOKEN) + 1 if text else 0
+
+
+@lru_cache(maxsize=4096)
+def _count_cached(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return heuristic_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_tokens(text: str) -> int:
+    """Replicile din story se repetă tură de tură: numărătoarea fiecărui text se memorează"""
+    return _count_cached(text) if text else 0
+
+
+def _truncate_to_tokens(text: str, budget: int) -> str:
+    """Păstrează sfârșitul textului (cel mai recent) în limita bugetului"""
+    if budget <= 0:
+        return ""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return text[-int(budget * _CHARS_PER_TOKEN):]
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    return tokenizer.decode(ids[-budget:]) if len(ids) > budget else text
+
+
+# ========== asamblarea ferestrei ==========
+@lru_cache(maxsize=4096)
+def _context_line(role: str, text: str) -> str:
+    return f"{role.upper()}: {clean_message(text)}"
+
+
+def assemble_context(story: List[Dict], budget: int = Config.PROMPT_CONTEXT_TOKENS,
+                     max_messages: int = Config.PROMPT_CONTEXT_MAX_MESSAGES) -> Tuple[str, Dict[str, int]]:
+    """
+    De la cea mai nouă replică spre cele vechi, cât timp încap în `budget` tokeni.
+    Ultima replică (acțiunea jucătorului) intră mereu, trunchiată dacă e nevoie.
+    Întoarce (contextul, statistici).
+    """
+    lines: List[str] = []
+    used = 0
+    truncated = 0
+    considered = story[-max_messages:] if max_messages > 0 else story
+    for msg in reversed(considered):
+        line = _context_line(msg["role"], msg.get("text") or "")
+        cost = count_tokens(line) + 1  # +1: separatorul de rând
+        if used + cost > budget:
+            if not lines:
+                line = _truncate_to_tokens(line, budget - 1)
+                lines.append(line)
+                used += count_tokens(line) + 1
+                truncated = 1
+            break
+        lines.append(line)
+        used += cost
+    lines.reverse()
+    return "\n".join(lines), {
+        "context_tokens": used,
+        "messages": len(lines),
+        "dropped": len(story) - len(lines),
+        "truncated": truncated,
+    }
+
+
+class PromptStats:
+    """Statisticile mărimii prompturilor din proces (ultimele `window` ture)"""
+
+    def __init__(self, window: int = 1000):
+        self._turns = deque(maxlen=window)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def record(self, info: Dict[str, int]):
+        with self._lock:
+            self._turns.append(info)
+            self._total += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            turns = list(self._turns)
+            total = self._total
+        if not turns:
+            return {"turns": total}
+        sizes = sorted(t["prompt_tokens"] for t in turns)
+        return {
+            "turns": total,
+            "avg_prompt_tokens": sum(sizes) / len(sizes),
+            "p95_prompt_tokens": sizes[min(len(sizes) - 1, int(0.95 * len(sizes)))],
+            "max_prompt_tokens": sizes[-1],
+            "avg_context_messages": sum(t["messages"] for t in turns) / len(turns),
+            "truncated_rate": sum(t["truncated"] for t in turns) / len(turns),
+        }
+
+
+_prompt_stats: Optional[PromptStats] = None
+_prompt_stats_lock = threading.Lock()
+
+def get_prompt_stats() -> PromptStats:
+    global _prompt_stats
+    with _prompt_stats_lock:
+        if _prompt_stats is None:
+            _prompt_stats = PromptStats()
+        return _prompt_stats
@@ -0,0 +1,159 @@
+# response_cache.py - Cache persistent (SQLite) partajat între procese pentru răspunsuri scumpe
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+
+def normalize_key(*parts: str) -> str:
+    """Forma normalizată a intrării: NFC, casefold, spații comprimate"""
+    normalized = []
+    for part in parts:
+        part = unicodedata.normalize("NFC", part or "")
+        normalized.append(" ".join(part.casefold().split()))
+    return "\x1f".join(normalized)
+
+
+class ResponseCache:
+    """
+    Cache cheie → text pe disc, cu TTL și evacuare după numărul de intrări.
+    Fișierul SQLite (mod WAL) e partajat de toate procesele aplicației;
+    contoarele de hit/miss sunt tot în baza de date, deci sunt globale.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._sets_since_evict = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats ("
+                " namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE namespace=? AND key=?",
+                    (namespace, self._digest(key)),
+                ).fetchone()
+                hit = row is not None and row[1] > now
+                if hit:
+                    conn.execute(
+                        "UPDATE entries SET accessed_at=? WHERE namespace=? AND key=?",
+                        (now, namespace, self._digest(key)),
+                    )
+                conn.execute(
+                    "INSERT INTO stats(namespace, hits, misses) VALUES (?, ?, ?) "
+                    "ON CONFLICT(namespace) DO UPDATE SET hits=hits+excluded.hits, misses=misses+excluded.misses",
+                    (namespace, int(hit), int(not hit)),
+                )
+            return row[0] if hit else None
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache indisponibil ({namespace}): {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: str, ttl: float):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries(namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (namespace, self._digest(key), value, now + ttl, now),
+                )
+                self._sets_since_evict += 1
+                # Evacuarea nu are nevoie să ruleze la fiecare scriere
+                if self._sets_since_evict >= 50:
+                    self._sets_since_evict = 0
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache indisponibil ({namespace}): {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM entries WHERE rowid IN ("
+                " SELECT rowid FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Optional[str]],
+                       ttl: float) -> Optional[str]:
+        """Returnează valoarea din cache sau o calculează; `None` de la compute nu se memorează"""
+        cached = self.get(namespace, key)
+        if cached is not None:
+            return cached
+        value = compute()
+        if value is not None:
+            self.set(namespace, key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit rate per namespace, cumulat pentru toate procesele"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                counts = dict(conn.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall())
+                rows = conn.execute("SELECT namespace, hits, misses FROM stats").fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache indisponibil: {e}")
+            return {}
+        report = {}
+        for namespace, hits, misses in rows:
+            total = hits + misses
+            report[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / total if total else 0.0,
+                "entries": counts.get(namespace, 0),
+            }
+        return report
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(Config.RESPONSE_CACHE_PATH, Config.RESPONSE_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+if __name__ == "__main__":
+    # Raport rapid: python response_cache.py
+    for ns, s in get_response_cache().stats().items():
+        print(f"{ns:<20} hits={s['hits']:<6} misses={s['misses']:<6} hit_rate={s['hit_rate']:.1%} intrări={s['entries']}")
@@ -0,0 +1,215 @@
+# save_loader.py - Încărcarea fișierelor de salvare în flux: limite de mărime, validare pe bucăți, progres
+import base64
+import binascii
+import codecs
+import json
+import re
+from json.scanner import make_scanner
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from config import Config
+from models import CharacterStats, GameState, InventoryItem
+
+CHUNK_SIZE = 1 << 20
+# O eroare la mai puțin de atât de capătul bufferului poate fi un token tăiat ("tru", "\\u01", "3e-")
+_CUT_TOKEN_CHARS = 16
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_scan_once = make_scanner(json.JSONDecoder())  # scanner-ul C din spatele json.loads, fără wrapper
+
+# progress(octeți citiți, octeți în total sau None)
+Progress = Callable[[int, Optional[int]], None]
+
+
+class SaveFileError(ValueError):
+    """Fișierul nu e o aventură validă sau depășește limitele (mesajul ajunge la jucător)"""
+
+
+class _JsonStream:
+    """
+    Cititor JSON incremental peste un fișier binar: doar bucata curentă e în memorie.
+    Valorile mici (chei, mesaje, obiecte) se decodează cu json.raw_decode; un șir lung
+    (o imagine base64) crește bufferul geometric, deci costul rămâne liniar.
+    """
+
+    def __init__(self, f: BinaryIO, max_bytes: int, total: Optional[int], progress: Optional[Progress]):
+        self._f = f
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.max_bytes = max_bytes
+        self.total = total
+        self.read_bytes = 0
+        self._progress = progress
+
+    def _fill(self, at_least: int = CHUNK_SIZE) -> bool:
+        if self._eof:
+            return False
+        raw = self._f.read(max(CHUNK_SIZE, at_least))
+        self.read_bytes += len(raw)
+        if self.read_bytes > self.max_bytes:
+            raise SaveFileError(f"Fișierul depășește limita de {self.max_bytes / 1e6:.0f} MB")
+        if self._progress is not None:
+            self._progress(self.read_bytes, self.total)
+        try:
+            text = self._utf8.decode(raw, final=not raw)
+        except UnicodeDecodeError:
+            raise SaveFileError(f"Fișierul nu e text UTF-8 valid (octetul ~{self.read_bytes})") from None
+        self._eof = not raw
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            buf = self._buf
+            pos = self._pos = _WHITESPACE.match(buf, self._pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                raise SaveFileError("Fișier incomplet (JSON trunchiat)")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise SaveFileError(f"JSON invalid: se aștepta '{char}' la octetul ~{self.offset()}")
+        self._pos += 1
+
+    def offset(self, pos: Optional[int] = None) -> int:
+        """Octetul din fișier (aproximativ) al poziției `pos` din buffer"""
+        pos = self._pos if pos is None else pos
+        return self.read_bytes - len(self._buf[pos:].encode("utf-8", "surrogatepass"))
+
+    def value(self) -> Any:
+        """Următoarea valoare JSON completă"""
+        self.peek()
+        while True:
+            try:
+                value, end = _scan_once(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                pos, reason = e.pos, e.msg
+            except StopIteration as e:
+                pos, reason = e.value, "Expecting value"
+            else:
+                if end == len(self._buf) and not self._eof and not isinstance(value, (dict, list, str)):
+                    self._fill()  # un număr / literal tăiat la marginea bucății: "12" din "123"
+                    continue
+                self._pos = end
+                return value
+            # Incompletă doar dacă eroarea e la capătul bufferului (șir neterminat, token tăiat);
+            # o eroare de sintaxă mai devreme e fatală pe loc, fără să citim restul fișierului
+            truncated = reason.startswith("Unterminated string") or len(self._buf) - pos <= _CUT_TOKEN_CHARS
+            if not truncated or not self._fill(len(self._buf) - self._pos):
+                raise SaveFileError(f"JSON invalid: {reason} la octetul ~{self.offset(pos)}")
+
+    def items(self) -> Iterator[Any]:
+        """Elementele unui array, unul câte unul"""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise SaveFileError(f"JSON invalid: se aștepta ',' sau ']' la octetul ~{self.offset(self._pos - 1)}")
+
+    def members(self) -> Iterator[str]:
+        """Cheile unui obiect; după fiecare cheie apelantul consumă valoarea (value() / items())"""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise SaveFileError("JSON invalid: cheie care nu e text")
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise SaveFileError(f"JSON invalid: se aștepta ',' sau '}}' la octetul ~{self.offset(self._pos - 1)}")
+
+
+def _decode_image(value: Any, index: int, max_image_bytes: int) -> Optional[bytes]:
+    if value is None or isinstance(value, bytes):
+        return value
+    if not isinstance(value, str):
+        raise SaveFileError(f"Mesajul {index}: imagine în format necunoscut")
+    if len(value) * 3 // 4 > max_image_bytes:
+        raise SaveFileError(f"Mesajul {index}: imagine peste {max_image_bytes / 1e6:.0f} MB")
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise SaveFileError(f"Mesajul {index}: imagine base64 coruptă") from None
+
+
+def _check_message(msg: Any, index: int, max_image_bytes: int) -> Dict[str, Any]:
+    if not isinstance(msg, dict):
+        raise SaveFileError(f"Mesajul {index} nu e un obiect")
+    if not isinstance(msg.get("text", ""), str) or not isinstance(msg.get("role", ""), str):
+        raise SaveFileError(f"Mesajul {index}: 'role' / 'text' trebuie să fie text")
+    if "image" in msg:
+        # Decodat aici, mesaj cu mesaj: textul base64 al unei imagini trăiește cât o iterație
+        msg["image"] = _decode_image(msg["image"], index, max_image_bytes)
+    return msg
+
+
+def load_save(f: BinaryIO, size: Optional[int] = None, progress: Optional[Progress] = None,
+              max_bytes: int = Config.SAVE_MAX_BYTES, max_turns: int = Config.SAVE_MAX_TURNS,
+              max_image_bytes: int = Config.SAVE_MAX_IMAGE_BYTES) -> Tuple[GameState, Optional[str]]:
+    """
+    Fișier de salvare (encode_save_file) → (GameState validat, session_id), citit în flux.
+    Mărimea declarată se verifică înainte de orice citire; personajul, fiecare obiect și
+    fiecare mesaj se validează pe măsură ce sosesc, deci un fișier greșit se oprește devreme.
+    """
+    if size is not None and size > max_bytes:
+        raise SaveFileError(f"Fișierul are {size / 1e6:.0f} MB; limita e {max_bytes / 1e6:.0f} MB")
+    stream = _JsonStream(f, max_bytes, size, progress)
+    max_messages = 2 * max_turns + 2  # replica jucătorului + a naratorului, plus introducerea
+    fields: Dict[str, Any] = {}
+    try:
+        for key in stream.members():
+            if key == "story":
+                story: List[Dict[str, Any]] = []
+                for msg in stream.items():
+                    if len(story) >= max_messages:
+                        raise SaveFileError(f"Aventura depășește limita de {max_turns} ture")
+                    story.append(_check_message(msg, len(story), max_image_bytes))
+                fields["story"] = story
+            elif key == "inventory":
+                fields["inventory"] = [InventoryItem(**item) for item in stream.items()]
+            elif key == "character":
+                fields["character"] = CharacterStats(**stream.value())
+            else:
+                fields[key] = stream.value()
+    except (ValidationError, TypeError) as e:
+        raise SaveFileError(f"Date invalide în fișier: {e}") from None
+
+    if "character" not in fields or "inventory" not in fields:
+        raise SaveFileError("Fișierul nu conține o aventură (lipsesc 'character' / 'inventory')")
+    turn = fields.get("turn", 0)
+    if not isinstance(turn, int) or not 0 <= turn <= max_turns:
+        raise SaveFileError(f"Tura {turn!r} în afara limitei (0-{max_turns})")
+    session_id = fields.get("session_id")
+    try:
+        gs = GameState(
+            character=fields["character"],
+            inventory=fields["inventory"],
+            story=fields.get("story", []),
+            turn=turn,
+            last_image_turn=fields.get("last_image_turn", -10),
+        )
+    except ValidationError as e:
+        raise SaveFileError(f"Date invalide în fișier: {e}") from None
+    # ID-ul ajunge în URL și în căile din session store: doar alfanumeric, ca în app.init_session
+    if not (isinstance(session_id, str) and session_id.isalnum() and len(session_id) <= 64):
+        session_id = None
+    return gs, session_id
@@ -0,0 +1,240 @@
+# session_memory.py - Cât RAM ține fiecare sesiune și evacuarea celor inactive în session store
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+from config import Config
+from state_cell import GameStateCell
+from turn_journal import persist_snapshot
+
+# Cheile refăcute de app.init_session din store (restore_session) sau recalculate la nevoie
+EVICTABLE_KEYS = (
+    "state_cell", "game_state", "story", "character", "story_history", "image_queue",
+    "journal", "turn", "last_image_turn", "prompt_cache", "_pdf_file", "narration",
+)
+# Componentele raportului, în ordinea în care se atribuie obiectele comune (numărate o singură dată)
+COMPONENTS = {
+    "story": ("state_cell", "game_state", "story"),
+    "character": ("character",),
+    "story_history": ("story_history",),
+    "image_queue": ("image_queue",),
+    "pdf_file": ("_pdf_file",),
+}
+_ATOMS = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def approx_size(obj: Any, seen: Set[int]) -> int:
+    """Octeți aproximativi (sys.getsizeof recursiv prin containere și modele); `seen` evită dublurile"""
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, _ATOMS):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif isinstance(o, BaseModel):
+            stack.append(o.__dict__)
+        elif isinstance(o, GameStateCell):
+            stack.append(o.gs)
+    return total
+
+
+def session_footprint(state: Any) -> Dict[str, int]:
+    """Octeții unei sesiuni pe componente; `state` = st.session_state (sau orice mapping)"""
+    seen: Set[int] = set()
+    report = {"images": 0}
+    cell = state["state_cell"] if "state_cell" in state else None
+    if cell is not None:
+        for msg in cell.gs.story:
+            data = msg.get("image")
+            if isinstance(data, (bytes, bytearray)) and id(data) not in seen:
+                seen.add(id(data))
+                report["images"] += sys.getsizeof(data)
+    claimed = set()
+    for component, keys in COMPONENTS.items():
+        report[component] = sum(approx_size(state[k], seen) for k in keys if k in state)
+        claimed.update(keys)
+    report["other"] = 0
+    for key in list(state):
+        if key in claimed:
+            continue
+        try:
+            report["other"] += approx_size(state[key], seen)
+        except KeyError:
+            pass  # widget fără valoare
+    report["total"] = sum(report.values())
+    return report
+
+
+def format_footprint(report: Dict[str, int]) -> str:
+    parts = ", ".join(f"{k} {v / 1e6:.2f} MB" for k, v in report.items() if k != "total" and v >= 1e4)
+    return f"{report.get('total', 0) / 1e6:.2f} MB" + (f" ({parts})" if parts else "")
+
+
+class SessionEntry:
+    __slots__ = ("session_id", "cell", "last_seen", "evict_requested", "footprint")
+
+    def __init__(self, session_id: str, cell: GameStateCell, now: float):
+        self.session_id = session_id
+        # Referință slabă: când runtime-ul închide sesiunea, celula dispare odată cu session_state
+        self.cell = weakref.ref(cell)
+        self.last_seen = now
+        self.evict_requested = False
+        self.footprint: Dict[str, int] = {}
+
+
+def evict_session(state: Any) -> Optional[Dict[str, int]]:
+    """
+    Rulat de sesiunea însăși (st.session_state, pe firul ei), cât stă inactivă: snapshot în store,
+    apoi cheile grele (EVICTABLE_KEYS) se șterg; init_session le reface din store la următoarea
+    interacțiune. Întoarce amprenta dinainte, sau None dacă nu se poate acum.
+    """
+    if "state_cell" not in state or "journal" not in state or state["journal"] is None:
+        return None
+    if any(k in state and state[k] for k in ("is_generating", "image_worker_active")):
+        return None
+    footprint = session_footprint(state)
+    if not persist_snapshot(state["journal"], state["state_cell"].gs):
+        return None
+    for key in EVICTABLE_KEYS:
+        if key in state:
+            del state[key]
+    return footprint
+
+
+class SessionRegistry:
+    """
+    Sesiunile procesului: ultima activitate, amprenta de memorie și marcarea pentru evacuare.
+    Registrul nu ține nimic din sesiune în viață (doar o referință slabă la GameStateCell):
+    o sesiune închisă de runtime dispare din registru la următorul sweep.
+    O sesiune inactivă de `idle_timeout` secunde e marcată; fragmentul periodic al sesiunii
+    (app.idle_eviction) vede marcajul și apelează evict_session pe firul ei, fără rerun complet.
+    Datele revin din store abia când jucătorul interacționează din nou.
+    Fără store (SESSION_STORE=none) sau cu evacuarea dezactivată nu se înregistrează nimic.
+    """
+
+    def __init__(self, idle_timeout: float = Config.SESSION_IDLE_EVICT,
+                 sweep_interval: float = Config.SESSION_SWEEP_INTERVAL,
+                 store: str = Config.SESSION_STORE):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = max(1.0, sweep_interval)
+        self.enabled = idle_timeout > 0 and store.strip().lower() != "none"
+        self._entries: Dict[str, SessionEntry] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.evictions = 0
+        self.closed = 0
+
+    def touch(self, session_id: str, cell: Optional[GameStateCell]):
+        """La fiecare rulare, după ce sesiunea are o celulă de stare"""
+        if not self.enabled or cell is None:
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.cell() is not cell:
+                entry = self._entries[session_id] = SessionEntry(session_id, cell, now)
+            entry.last_seen = now
+            entry.evict_requested = False  # jucătorul a revenit înainte de evacuare
+
+    def take_eviction(self, session_id: str) -> bool:
+        """True (o singură dată) dacă sweep-ul a marcat sesiunea cât a stat inactivă"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or not entry.evict_requested:
+                return False
+            entry.evict_requested = False
+            return True
+
+    def evicted(self, session_id: str, footprint: Dict[str, int], remaining: int):
+        """`footprint` = amprenta dinainte de evacuare, `remaining` = octeții rămași în session_state"""
+        with self._lock:
+            self.evictions += 1
+            entry = self._entries.pop(session_id, None)
+        idle = time.time() - entry.last_seen if entry is not None else 0.0
+        print(f"[SESSION {session_id}] 💤 SESSION EVICTED after {idle:.0f}s idle: "
+              f"{format_footprint(footprint)} → {remaining / 1e6:.2f} MB rămași")
+
+    def record_footprint(self, session_id: str, footprint: Dict[str, int]):
+        """Amprenta calculată de sesiune pe firul ei (după fiecare tură), pentru raport"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.footprint = footprint
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Scoate sesiunile închise; marchează sesiunile inactive; întoarce câte au fost marcate"""
+        now = time.time() if now is None else now
+        marked = 0
+        with self._lock:
+            for sid, entry in list(self._entries.items()):
+                if entry.cell() is None:
+                    del self._entries[sid]  # runtime-ul a eliberat sesiunea
+                    self.closed += 1
+                elif not entry.evict_requested and now - entry.last_seen > self.idle_timeout:
+                    entry.evict_requested = True
+                    marked += 1
+        return marked
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per sesiune: inactivitate, marcată sau nu, octeți pe componente (de la ultima tură)"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "session_id": e.session_id,
+                    "idle_s": round(now - e.last_seen, 1),
+                    "evict_requested": e.evict_requested,
+                    "bytes": dict(e.footprint),
+                }
+                for e in self._entries.values()
+            ]
+
+    def _run(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+                sessions = self.report()
+                if not sessions:
+                    continue
+                total = sum(s["bytes"].get("total", 0) for s in sessions)
+                marked = sum(1 for s in sessions if s["evict_requested"])
+                print(f"🧠 SESSIONS: {len(sessions)} în memorie (~{total / 1e6:.1f} MB), {marked} marcate, "
+                      f"{self.evictions} evacuate, {self.closed} închise")
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+    def start(self):
+        """Firul de sweep (o singură dată per proces; nu pornește dacă evacuarea e dezactivată)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+        self._thread.start()
+
+
+_registry: Optional[SessionRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_session_registry() -> SessionRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionRegistry()
+        return _registry
@@ -0,0 +1,469 @@
+# session_store.py - Starea jocului în afara procesului Streamlit (disc / SQLite / Redis)
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from config import Config
+
+try:
+    import fcntl  # POSIX: lock între procese pe jurnalul unei sesiuni
+except ImportError:
+    fcntl = None
+
+
+def new_session_id() -> str:
+    """ID de sesiune; ajunge în URL (?sid=...), deci nu trebuie să fie ușor de ghicit"""
+    return uuid.uuid4().hex[:16]
+
+
+class SessionStore(ABC):
+    """
+    Interfața comună: per session_id un snapshot JSON (formatul fișierului de salvare),
+    un jurnal append-only de ture și blob-uri pentru imagini.
+    Orice proces al aplicației poate relua sesiunea după ID.
+    """
+
+    @abstractmethod
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    # ---- jurnalul de ture (append-only) ----
+    @abstractmethod
+    def append_record(self, session_id: str, record: str) -> None:
+        ...
+
+    @abstractmethod
+    def read_records(self, session_id: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def trim_records(self, session_id: str, count: int) -> None:
+        """Șterge primele `count` înregistrări (deja incluse într-un snapshot)"""
+        ...
+
+    # ---- blob-uri adresate prin conținut (imagini) ----
+    @abstractmethod
+    def put_blob(self, digest: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def get_blob(self, digest: str) -> Optional[bytes]:
+        ...
+
+
+class FileSessionStore(SessionStore):
+    """
+    Per sesiune: snapshot JSON (scriere atomică tmp + rename) și jurnal .log append-only.
+    Mai multe procese pot scrie în același director: append și trim pe jurnal se serializează
+    cu flock pe un fișier .lock alăturat (jurnalul însuși e înlocuit la trim).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._log_lock = threading.Lock()
+
+    def _path(self, session_id: str, ext: str = "json") -> str:
+        safe = "".join(c for c in session_id if c.isalnum() or c in "-_")
+        return os.path.join(self.directory, f"{safe}.{ext}")
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        path = self._path(session_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _log_locked(self, session_id: str, shared: bool = False):
+        """Lock-ul jurnalului sesiunii, între procese (flock) și între firele procesului"""
+        if fcntl is None:
+            with self._log_lock:
+                yield
+            return
+        with open(self._path(session_id, "lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield  # închiderea fișierului eliberează lock-ul
+
+    def delete(self, session_id: str) -> None:
+        for path in (self._path(session_id), self._path(session_id, "log"), self._path(session_id, "lock")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def append_record(self, session_id: str, record: str) -> None:
+        # O singură linie per înregistrare, în mod append: costul nu depinde de lungimea aventurii
+        with self._log_locked(session_id), open(self._path(session_id, "log"), "a", encoding="utf-8") as f:
+            f.write(record + "\n")
+
+    def read_records(self, session_id: str) -> List[str]:
+        with self._log_locked(session_id, shared=True):
+            return self._read_log(session_id)
+
+    def _read_log(self, session_id: str) -> List[str]:
+        try:
+            with open(self._path(session_id, "log"), "r", encoding="utf-8") as f:
+                return [line.rstrip("\n") for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def trim_records(self, session_id: str, count: int) -> None:
+        # Citire + rescriere sub același lock exclusiv: un append din alt proces nu se poate pierde între ele
+        path = self._path(session_id, "log")
+        with self._log_locked(session_id):
+            remaining = self._read_log(session_id)[count:]
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in remaining)
+            os.replace(tmp, path)
+
+    def put_blob(self, digest: str, data: bytes) -> None:
+        path = os.path.join(self.blob_dir, digest)
+        if os.path.exists(path):
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.blob_dir, digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class SQLiteSessionStore(SessionStore):
+    """Toate sesiunile într-un fișier SQLite (mod WAL), partajat de procesele de pe același host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS journal_session ON journal(session_id, seq)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, data BLOB NOT NULL)")
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions(session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, payload, time.time()),
+            )
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sessions WHERE session_id=?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
+            self._conn.execute("DELETE FROM journal WHERE session_id=?", (session_id,))
+
+    def append_record(self, session_id: str, record: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT INTO journal(session_id, record) VALUES (?, ?)", (session_id, record))
+
+    def read_records(self, session_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM journal WHERE session_id=? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def trim_records(self, session_id: str, count: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM journal WHERE seq IN ("
+                " SELECT seq FROM journal WHERE session_id=? ORDER BY seq LIMIT ?)",
+                (session_id, count),
+            )
+
+    def put_blob(self, digest: str, data: bytes) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO blobs(digest, data) VALUES (?, ?)", (digest, data))
+
+    def get_blob(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM blobs WHERE digest=?", (digest,)).fetchone()
+        return bytes(row[0]) if row else None
+
+
+# ========== Redis (protocol RESP) ==========
+def _encode_command(*args) -> bytes:
+    out = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+def _read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("Conexiune Redis închisă")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RuntimeError(f"Redis: {rest.decode()}")
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = f.read(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [_read_reply(f) for _ in range(count)]
+    raise RuntimeError(f"Răspuns RESP necunoscut: {line!r}")
+
+
+class RedisSessionStore(SessionStore):
+    """Client RESP minimal (SET/GET/DEL) — merge cu Redis real sau cu MiniRedisServer"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 ttl: int = 7 * 24 * 3600, prefix: str = "wallachia:session:"):
+        self.host, self.port, self.db = host, port, db
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=10)
+        self._file = self._sock.makefile("rb")
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args):
+        self._sock.sendall(_encode_command(*args))
+        return _read_reply(self._file)
+
+    def command(self, *args):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    # Reconectare o singură dată (server repornit, timeout idle)
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _close(self):
+        try:
+            if self._sock is not None:
+                self._sock.close()
+        finally:
+            self._sock = None
+            self._file = None
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.command("SET", self.prefix + session_id, payload, "EX", self.ttl)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.command("GET", self.prefix + session_id)
+        return json.loads(raw.decode("utf-8")) if raw else None
+
+    def delete(self, session_id: str) -> None:
+        self.command("DEL", self.prefix + session_id, self.prefix + session_id + ":journal")
+
+    def append_record(self, session_id: str, record: str) -> None:
+        key = self.prefix + session_id + ":journal"
+        self.command("RPUSH", key, record.encode("utf-8"))
+        self.command("EXPIRE", key, self.ttl)
+
+    def read_records(self, session_id: str) -> List[str]:
+        raw = self.command("LRANGE", self.prefix + session_id + ":journal", 0, -1) or []
+        return [item.decode("utf-8") for item in raw]
+
+    def trim_records(self, session_id: str, count: int) -> None:
+        self.command("LTRIM", self.prefix + session_id + ":journal", count, -1)
+
+    def put_blob(self, digest: str, data: bytes) -> None:
+        self.command("SET", self.prefix + "blob:" + digest, data, "EX", self.ttl)
+
+    def get_blob(self, digest: str) -> Optional[bytes]:
+        return self.command("GET", self.prefix + "blob:" + digest)
+
+
+class _MiniRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server: "MiniRedisServer" = self.server
+        while True:
+            try:
+                request = _read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if not isinstance(request, list) or not request:
+                self.wfile.write(b"-ERR protocol\r\n")
+                continue
+            try:
+                self.wfile.write(server.execute([part if isinstance(part, bytes) else str(part).encode() for part in request]))
+            except Exception as e:
+                self.wfile.write(f"-ERR {e}\r\n".encode())
+
+
+class MiniRedisServer(socketserver.ThreadingTCPServer):
+    """
+    Înlocuitor local pentru Redis (doar în memorie): suficient pentru dezvoltare
+    și teste cu mai multe procese Streamlit pe aceeași mașină.
+    Pornire: python session_store.py serve --port 6379
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        super().__init__((host, port), _MiniRedisHandler)
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, key: bytes) -> bool:
+        exp = self.expires.get(key)
+        if exp is not None and exp <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    @staticmethod
+    def _bulk(value: Optional[bytes]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def execute(self, args: List[bytes]) -> bytes:
+        cmd = args[0].upper()
+        with self.lock:
+            if cmd == b"PING":
+                return b"+PONG\r\n"
+            if cmd == b"SELECT":
+                return b"+OK\r\n"
+            if cmd == b"SET":
+                key = args[1]
+                self.data[key] = args[2]
+                self.expires.pop(key, None)
+                if len(args) >= 5 and args[3].upper() == b"EX":
+                    self.expires[key] = time.time() + int(args[4])
+                return b"+OK\r\n"
+            if cmd == b"GET":
+                key = args[1]
+                return self._bulk(self.data[key] if self._alive(key) else None)
+            if cmd == b"DEL":
+                removed = 0
+                for key in args[1:]:
+                    if self._alive(key):
+                        removed += 1
+                    self.data.pop(key, None)
+                    self.expires.pop(key, None)
+                return b":%d\r\n" % removed
+            if cmd == b"RPUSH":
+                key = args[1]
+                if not self._alive(key):
+                    self.data[key] = []
+                self.data[key].extend(args[2:])
+                return b":%d\r\n" % len(self.data[key])
+            if cmd == b"LRANGE":
+                key = args[1]
+                items = self.data[key] if self._alive(key) else []
+                start, stop = int(args[2]), int(args[3])
+                stop = len(items) - 1 if stop < 0 else stop
+                chunk = items[start:stop + 1]
+                return b"*%d\r\n" % len(chunk) + b"".join(self._bulk(item) for item in chunk)
+            if cmd == b"LTRIM":
+                key = args[1]
+                if self._alive(key):
+                    start, stop = int(args[2]), int(args[3])
+                    items = self.data[key]
+                    stop = len(items) - 1 if stop < 0 else stop
+                    self.data[key] = items[start:stop + 1]
+                return b"+OK\r\n"
+            if cmd == b"EXPIRE":
+                key = args[1]
+                if not self._alive(key):
+                    return b":0\r\n"
+                self.expires[key] = time.time() + int(args[2])
+                return b":1\r\n"
+        return f"-ERR unknown command '{cmd.decode()}'\r\n".encode()
+
+
+# ========== fabrica + helpers pentru app ==========
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+def get_session_store() -> Optional[SessionStore]:
+    """Backend-ul ales prin SESSION_STORE: file | sqlite | redis://host:port/db | none"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            kind = Config.SESSION_STORE
+            if kind == "none":
+                return None
+            if kind == "sqlite":
+                _store = SQLiteSessionStore(Config.SESSION_DB_PATH)
+            elif kind.startswith("redis://"):
+                url = urlparse(kind)
+                db = int(url.path.lstrip("/") or 0)
+                _store = RedisSessionStore(url.hostname or "127.0.0.1", url.port or 6379, db, ttl=Config.SESSION_TTL)
+            else:
+                _store = FileSessionStore(Config.SESSION_DIR)
+            print(f"💾 SESSION STORE: {type(_store).__name__}")
+        return _store
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Înlocuitor local pentru Redis")
+    ap.add_argument("command", choices=["serve"])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6379)
+    args = ap.parse_args()
+    with MiniRedisServer(args.host, args.port) as server:
+        print(f"🧱 MiniRedis ascultă pe {args.host}:{args.port}")
+        server.serve_forever()
@@ -0,0 +1,62 @@
+# singleflight.py - Cereri identice concurente → un singur apel; duplicatele așteaptă același rezultat
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Primul apelant pentru o cheie rulează `fn`; cei care vin cât timp rulează (sau cel mult
+    `linger` secunde după ce s-a terminat cu succes) primesc același rezultat sau aceeași excepție.
+    Erorile nu se păstrează: următoarea cerere după un eșec încearcă din nou. La fel rezultatele
+    respinse de `keep` (eșecuri întoarse ca valoare, nu ca excepție).
+    """
+
+    def __init__(self, linger: float = 0.0):
+        self.linger = linger
+        self._flights: Dict[Hashable, Tuple[Future, float]] = {}  # cheie → (future, terminat la)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = None,
+           keep: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """Întoarce (rezultat, shared); shared=True dacă rezultatul vine din apelul altcuiva"""
+        now = time.time()
+        with self._lock:
+            self._stats["calls"] += 1
+            self._prune(now)
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["shared"] += 1
+                future, leader = flight[0], False
+            else:
+                future, leader = Future(), True
+                self._flights[key] = (future, 0.0)
+
+        if not leader:
+            return future.result(timeout=timeout), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._flights.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if self.linger > 0 and (keep is None or keep(result)):
+                self._flights[key] = (future, time.time())
+            else:
+                self._flights.pop(key, None)
+        future.set_result(result)
+        return result, False
+
+    def _prune(self, now: float):
+        expired = [k for k, (f, finished) in self._flights.items() if finished and now - finished > self.linger]
+        for k in expired:
+            del self._flights[k]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, in_flight=sum(1 for _, finished in self._flights.values() if not finished))
@@ -0,0 +1,108 @@
+# state_cell.py - GameState versionat: ture construite pe o copie și comise atomic (compare-and-swap)
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from models import GameState
+from turn_journal import apply_record, attach_image
+
+
+class Commit:
+    """Rezultatul unei comiteri: starea comisă după ea și ce s-a întâmplat cu înregistrarea"""
+    __slots__ = ("applied", "rebased", "version", "gs")
+
+    def __init__(self, applied: bool, rebased: bool, version: int, gs: GameState):
+        self.applied = applied    # False: tura era deja comisă (duplicat), nu s-a aplicat nimic
+        self.rebased = rebased    # True: între timp s-a comis altceva, înregistrarea s-a re-aplicat peste
+        self.version = version
+        self.gs = gs
+
+
+class GameStateCell:
+    """
+    Celula care ține starea comisă a unei sesiuni. Starea comisă nu se modifică niciodată pe loc:
+    scriitorii lucrează pe `fork()` și o înlocuiesc atomic doar dacă versiunea nu s-a schimbat.
+    Dacă s-a schimbat (ex. firul de imagini a atașat o imagine între timp), înregistrarea se
+    re-aplică peste noua stare - înregistrările sunt delte, deci rebase-ul e sigur.
+    Turele sunt idempotente: o înregistrare pentru o tură deja comisă nu se aplică a doua oară.
+    """
+
+    def __init__(self, gs: GameState, version: int = 0):
+        self._gs = gs
+        self._version = version
+        self._lock = threading.Lock()
+        self.conflicts = 0
+
+    @property
+    def gs(self) -> GameState:
+        return self._gs
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def read(self) -> Tuple[int, GameState]:
+        with self._lock:
+            return self._version, self._gs
+
+    def fork(self) -> Tuple[int, GameState]:
+        """(versiunea de bază, copie de lucru) pentru o tură nouă"""
+        version, gs = self.read()
+        return version, gs.fork()
+
+    def reset(self, gs: GameState) -> int:
+        """Înlocuire necondiționată (aventură nouă, salvare încărcată)"""
+        with self._lock:
+            self._gs = gs
+            self._version += 1
+            return self._version
+
+    def _swap(self, base_version: int, new_gs: GameState) -> bool:
+        with self._lock:
+            if self._version != base_version:
+                self.conflicts += 1
+                return False
+            self._gs = new_gs
+            self._version += 1
+            return True
+
+    def update(self, mutate: Callable[[GameState], Any], max_attempts: int = 16) -> Tuple[int, GameState, Any]:
+        """
+        Aplică `mutate` pe o copie a stării curente și o comite; reia pe starea nouă la conflict.
+        Dacă `mutate` întoarce o valoare falsă, n-a schimbat nimic și copia nu se comite.
+        """
+        for _ in range(max_attempts):
+            base_version, work = self.fork()
+            result = mutate(work)
+            if not result:
+                with self._lock:
+                    return self._version, self._gs, result
+            if self._swap(base_version, work):
+                return base_version + 1, work, result
+        raise RuntimeError(f"GameState: prea multe conflicte de versiune ({max_attempts})")
+
+    def commit(self, record: Dict[str, Any], base_version: Optional[int] = None,
+               prepared: Optional[GameState] = None) -> Commit:
+        """
+        Comite o înregistrare (tură, vindecare). `prepared` e copia pe care înregistrarea e deja
+        aplicată (ex. de engine.run_turn) pornind de la `base_version`: dacă nimic nu s-a comis
+        între timp, devine starea comisă așa cum e; altfel înregistrarea se re-aplică.
+        """
+        turn = record.get("t") if record["k"] == "turn" else None
+        if prepared is not None and base_version is not None and self._swap(base_version, prepared):
+            return Commit(True, False, base_version + 1, prepared)
+
+        def apply(gs: GameState) -> bool:
+            if turn is not None and turn != gs.turn:
+                if turn < gs.turn:
+                    return False  # tura e deja comisă: dublu-click / rerun
+                raise ValueError(f"Tura {turn} nu urmează după tura comisă {gs.turn}")
+            apply_record(gs, record)
+            return True
+
+        version, gs, applied = self.update(apply)
+        return Commit(applied, bool(applied) and prepared is not None, version, gs)
+
+    def attach_image(self, turn: int, data: bytes) -> bool:
+        """Imaginea se atașează pe versiunea comisă curentă (copy-on-write pe mesajul turei)"""
+        _, _, attached = self.update(lambda gs: attach_image(gs, turn, data))
+        return attached
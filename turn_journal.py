@@ -0,0 +1,211 @@
+# turn_journal.py - Jurnal append-only al turelor: o înregistrare compactă per tură + snapshot periodic
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from models import GameState, InventoryItem, NarrativeResponse
+from session_store import SessionStore, get_session_store
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_turn_record(turn: int, action: str, narrative: str, response: NarrativeResponse) -> Dict[str, Any]:
+    """
+    Doar acțiunea, textul afișat și deltele din NarrativeResponse (câmpurile goale lipsesc),
+    deci dimensiunea nu crește odată cu aventura.
+    """
+    record: Dict[str, Any] = {"k": "turn", "t": turn, "a": action, "n": narrative}
+    if response.health_change:
+        record["hp"] = response.health_change
+    if response.reputation_change:
+        record["rep"] = response.reputation_change
+    if response.gold_change:
+        record["gold"] = response.gold_change
+    if response.items_gained:
+        record["ig"] = [item.model_dump(mode="json", exclude_none=True) for item in response.items_gained]
+    if response.items_lost:
+        record["il"] = list(response.items_lost)
+    if response.location_change:
+        record["loc"] = response.location_change
+    if response.status_effects:
+        record["se"] = list(response.status_effects)
+    return record
+
+
+def attach_image(gs: GameState, turn: int, data: bytes) -> bool:
+    """Imaginea pe ultimul mesaj AI al turei; mesajul se înlocuiește (copy-on-write), nu se modifică pe loc"""
+    for i in range(len(gs.story) - 1, -1, -1):
+        msg = gs.story[i]
+        if msg.get("turn") == turn and msg["role"] == "ai":
+            gs.story[i] = dict(msg, image=data)
+            return True
+    return False
+
+
+def apply_record(gs: GameState, record: Dict[str, Any], store: Optional[SessionStore] = None):
+    """Aplică o înregistrare pe GameState (aceeași funcție pentru tura live și pentru replay)"""
+    kind = record["k"]
+    if kind == "turn":
+        turn = record["t"]
+        gs.story.append({"role": "user", "text": record["a"], "turn": turn, "image": None})
+
+        ch = gs.character
+        ch.health = max(0, min(100, ch.health + record.get("hp", 0)))
+        ch.reputation = max(0, min(100, ch.reputation + record.get("rep", 0)))
+        ch.gold = max(0, ch.gold + record.get("gold", 0))
+
+        for item_data in record.get("ig", ()):
+            gs.inventory.add(InventoryItem(**item_data))
+        for name in record.get("il", ()):
+            gs.inventory.remove(name)
+
+        if record.get("loc"):
+            ch.location = record["loc"]
+        if record.get("se"):
+            ch.status_effects.extend(record["se"])
+
+        gs.story.append({"role": "ai", "text": record["n"], "turn": turn, "image": None})
+        if "li" in record:
+            gs.last_image_turn = record["li"]
+        gs.turn = turn + 1
+
+    elif kind == "image":
+        data = store.get_blob(record["ref"]) if store is not None else None
+        if data:
+            attach_image(gs, record["t"], data)
+
+    elif kind == "heal":
+        gs.character.health = min(100, gs.character.health + record["v"])
+
+
+class SessionJournal:
+    """Jurnalul unei sesiuni: append O(1) per tură, compactare prin snapshot la fiecare N înregistrări"""
+
+    def __init__(self, session_id: str, store: SessionStore, seq: int = 0,
+                 snapshot_every: int = Config.JOURNAL_SNAPSHOT_EVERY):
+        self.session_id = session_id
+        self.store = store
+        self.seq = seq
+        self.snapshot_every = max(1, snapshot_every)
+        self.since_snapshot = 0
+        self.image_refs: Dict[int, str] = {}  # turn → digest deja urcat în blob store
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]) -> int:
+        with self._lock:
+            self.seq += 1
+            record["s"] = self.seq
+            self.store.append_record(self.session_id, json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            self.since_snapshot += 1
+            return self.seq
+
+    def attach_image(self, turn: int, data: bytes) -> str:
+        digest = image_digest(data)
+        self.store.put_blob(digest, data)
+        self.image_refs[turn] = digest
+        self.append({"k": "image", "t": turn, "ref": digest})
+        return digest
+
+    def needs_snapshot(self) -> bool:
+        return self.since_snapshot >= self.snapshot_every
+
+    def snapshot(self, gs: GameState):
+        """Snapshot complet (imaginile ca referințe către blob-uri) + tăierea jurnalului acoperit"""
+        with self._lock:
+            # Fără base64: imaginile sunt deja (sau ajung acum) în blob store, snapshot-ul ține doar digest-ul
+            data = gs.to_save_dict(include_images=False)
+            for msg, original in zip(data["story"], gs.story):
+                image = original.get("image")
+                if isinstance(image, bytes):
+                    digest = self.image_refs.get(original.get("turn"))
+                    if digest is None:
+                        digest = image_digest(image)
+                        self.store.put_blob(digest, image)
+                        self.image_refs[original.get("turn")] = digest
+                    msg["image_ref"] = digest
+            data["session_id"] = self.session_id
+            data["seq"] = self.seq
+            self.store.save(self.session_id, data)
+            covered = sum(1 for line in self.store.read_records(self.session_id) if json.loads(line)["s"] <= self.seq)
+            if covered:
+                self.store.trim_records(self.session_id, covered)
+            self.since_snapshot = 0
+
+
+def replay(store: SessionStore, session_id: str) -> Optional[Tuple[GameState, int]]:
+    """Ultimul snapshot + înregistrările de după el → (GameState, seq)"""
+    data = store.load(session_id)
+    if not data:
+        return None
+    seq = data.get("seq", 0)
+    gs = GameState.from_save_dict(data)
+    for msg in gs.story:
+        ref = msg.pop("image_ref", None)
+        if ref:
+            msg["image"] = store.get_blob(ref)
+    for line in store.read_records(session_id):
+        record = json.loads(line)
+        if record["s"] <= seq:
+            continue  # deja inclus în snapshot (compactare întreruptă)
+        apply_record(gs, record, store)
+        seq = record["s"]
+    return gs, seq
+
+
+# ========== helpers pentru app ==========
+def open_journal(session_id: str) -> Optional[SessionJournal]:
+    """Jurnal pentru o sesiune nouă sau încărcată din fișier; continuă numerotarea existentă"""
+    store = get_session_store()
+    if store is None:
+        return None
+    try:
+        records = store.read_records(session_id)
+        seq = json.loads(records[-1])["s"] if records else 0
+    except Exception as e:
+        print(f"[SESSION {session_id}] ⚠️ JOURNAL OPEN FAILED: {e}")
+        return None
+    return SessionJournal(session_id, store, seq=seq)
+
+def persist_snapshot(journal: Optional[SessionJournal], gs: GameState) -> bool:
+    """Snapshot complet (sesiune nouă, încărcare din fișier); o eroare de stocare nu oprește jocul"""
+    if journal is None:
+        return False
+    try:
+        journal.snapshot(gs)
+        return True
+    except Exception as e:
+        print(f"[SESSION {journal.session_id}] ⚠️ SESSION SNAPSHOT FAILED: {e}")
+        return False
+
+def journal_append(journal: Optional[SessionJournal], record: Dict[str, Any], gs: GameState) -> bool:
+    """Adaugă înregistrarea turei și compactează periodic"""
+    if journal is None:
+        return False
+    try:
+        journal.append(record)
+        if journal.needs_snapshot():
+            journal.snapshot(gs)
+        return True
+    except Exception as e:
+        print(f"[SESSION {journal.session_id}] ⚠️ JOURNAL APPEND FAILED: {e}")
+        return False
+
+def restore_session(session_id: str) -> Optional[Tuple[GameState, SessionJournal]]:
+    """Reîncarcă sesiunea (lazy, doar când procesul curent nu o are în memorie)"""
+    store = get_session_store()
+    if store is None:
+        return None
+    try:
+        restored = replay(store, session_id)
+        if restored is None:
+            return None
+        gs, seq = restored
+        print(f"[SESSION {session_id}] ♻️ SESSION RESTORED FROM STORE (turn {gs.turn}, seq {seq})")
+        return gs, SessionJournal(session_id, store, seq=seq)
+    except Exception as e:
+        print(f"[SESSION {session_id}] ⚠️ SESSION STORE LOAD FAILED: {e}")
+        return None
@@ -1,18 +1,25 @@
 import streamlit as st
-from typing import List, Dict, Optional
+import streamlit.components.v1 as components
+from typing import Callable, List, Dict, Optional
 from io import BytesIO
 from PIL import Image
 import io
 import shutil
 import base64
-import uuid
 import json
 import time
 import os
 import re
-import pdfkit
 import requests
-from models import GameState, CharacterStats, InventoryItem
+from config import Config
+from models import GameState
+from session_store import new_session_id
+from turn_journal import open_journal, persist_snapshot
+from workers import WorkerTimeoutError, encode_save_file, run_job
+from save_loader import SaveFileError, load_save
+from export_html import export_story, write_story_html
+from pdf_export import get_pdf_exporter
+from narration import Narration, get_narrator
 
 def get_api_token() -> Optional[str]:
     """Obține token-ul din mediu sau Secrets (cloud)."""
@@ -222,6 +229,57 @@ def display_story(story: List[Dict]):
                     use_container_width=True  # FĂRĂ CAPTION!
                 )
 
+# Playerul trăiește în fereastra părinte (iframe-urile components.html sunt same-origin):
+# fiecare iframe adaugă un segment în coadă, iar coada se redă în ordine, fără pauze de rerun
+_NARRATION_PLAYER = """
+<script>
+(function () {
+  const w = window.parent;
+  if (!w.__narrationPlay) {
+    w.__narrationPlay = new w.Function("q", `
+      if (q.audio || !q.srcs[q.next]) return;
+      const a = new Audio(q.srcs[q.next]);
+      q.audio = a;
+      a.onended = a.onerror = function () { q.audio = null; q.next += 1; window.__narrationPlay(q); };
+      a.play().catch(function () { q.audio = null; });  // autoplay blocat: reîncercăm la segmentul următor
+    `);
+  }
+  const q = w.__narration || (w.__narration = {key: null, srcs: [], next: 0, audio: null});
+  if (q.key !== %(key)s) {  // replică nouă: oprim ce se mai aude
+    if (q.audio) q.audio.pause();
+    q.key = %(key)s; q.srcs = []; q.next = 0; q.audio = null;
+  }
+  if (!q.srcs[%(index)d]) q.srcs[%(index)d] = %(src)s;
+  w.__narrationPlay(q);
+})();
+</script>
+"""
+
+
+@st.fragment(run_every=Config.TTS_POLL_INTERVAL)
+def render_narration(on_finished: Callable[["Narration"], None]):
+    """
+    Trimite segmentele narațiunii care sunt deja gata, fără să blocheze rularea scriptului;
+    fragmentul se reîmprospătează singur pentru restul. Prima propoziție se aude cât restul se sintetizează.
+    """
+    narration: Optional[Narration] = st.session_state.get("narration")
+    if narration is None:
+        return
+    sent = 0
+    for index, audio in narration.segments(wait=False):
+        src = f"data:{narration.mime};base64,{base64.b64encode(audio).decode('ascii')}"
+        components.html(
+            _NARRATION_PLAYER % {"key": json.dumps(narration.key), "index": index, "src": json.dumps(src)},
+            height=0,
+        )
+        sent += 1
+    # Ultimele segmente au nevoie de o reîmprospătare întreagă ca playerul să le preia înainte de rerun
+    if not narration.done or sent:
+        return
+    st.session_state.narration = None
+    on_finished(narration)
+    st.rerun(scope="app")  # fără narațiune, fragmentul nu mai e randat și reîmprospătarea se oprește
+
 def render_header():
     """Render main title header"""
     st.markdown('<h1 class="main-header">WALLACHIA</h1>', unsafe_allow_html=True)
@@ -249,6 +307,15 @@ def render_sidebar(game_state: "GameState") -> int:
         help="0 = Strict istoric, 10 = Legendă vampirică",
         key="legend_slider"
     )
+    narrator_ready = get_narrator() is not None
+    st.sidebar.toggle(
+        "🔊 Narațiune audio",
+        value=False,
+        disabled=not narrator_ready,
+        help="Naratorul citește fiecare replică, propoziție cu propoziție" if narrator_ready
+        else "Indisponibil: backend-ul TTS nu e configurat (TTS_BACKEND)",
+        key="narration_enabled"
+    )
     st.sidebar.markdown('</div>', unsafe_allow_html=True)
     
     # CHARACTER SHEET
@@ -293,33 +360,23 @@ def render_sidebar(game_state: "GameState") -> int:
     st.sidebar.subheader("💾 Salvează Aventura")
     
     # === FIX: Exportă game_state ca JSON compatibil (CU IMAGINI)
-    def game_state_to_dict():
-        # Encode imagini ca base64 pentru serializare JSON
-        story_with_images = []
-        for msg in st.session_state.story:
-            msg_copy = msg.copy()
-            if msg_copy.get("image") and isinstance(msg_copy["image"], bytes):
-                msg_copy["image"] = base64.b64encode(msg_copy["image"]).decode('utf-8')
-            story_with_images.append(msg_copy)
-        
-        return {
-            "character": game_state.character.model_dump(),
-            "inventory": [item.model_dump() for item in game_state.inventory],
-            "story": story_with_images,  # ⭕ Acum include imagini
-            "turn": game_state.turn,
-            "last_image_turn": game_state.last_image_turn,
-            "session_id": st.session_state.session_id  # ⭕ Salvează și session_id
-        }
-    
-    json_str = json.dumps(game_state_to_dict(), ensure_ascii=False, indent=2)
-    
-    st.sidebar.download_button(
-        "📥 Descarcă JSON",
-        data=json_str.encode("utf-8"),
-        file_name=f"aventura_wallachia_{int(time.time())}.json",
-        mime="application/json",
-        use_container_width=True
-    )
+    # ⭕ base64 + json.dumps rulează în pool-ul de procese doar la cerere, din starea comisă curentă
+    # (inclusiv imaginea finală peste schiță); octeții nu rămân în session_state între rulări
+    if st.sidebar.button("💾 Pregătește salvarea", use_container_width=True):
+        _, committed = st.session_state.state_cell.read()
+        try:
+            save_file = run_job(encode_save_file, committed, st.session_state.session_id)
+        except WorkerTimeoutError as e:
+            st.sidebar.error(f"❌ Salvare eșuată: {e}")
+        else:
+            st.sidebar.download_button(
+                "📥 Descarcă JSON",
+                data=save_file,
+                file_name=f"aventura_wallachia_{int(time.time())}.json",
+                mime="application/json",
+                on_click="ignore",
+                use_container_width=True
+            )
     
     st.sidebar.markdown("---")
     
@@ -333,38 +390,48 @@ def render_sidebar(game_state: "GameState") -> int:
         key="load_story"
     )
     
-    # Procesăm doar dacă avem un fișier nou (folosim hashing pentru a detecta duplicatele)
+    # Procesăm doar dacă avem un fișier nou (ID-ul upload-ului, nu un hash peste tot conținutul)
     if uploaded is not None:
-        # Calculăm hash-ul fișierului pentru a detecta dacă e același
-        current_file_hash = hash(uploaded.getvalue())
+        current_file_hash = (getattr(uploaded, "file_id", uploaded.name), uploaded.size)
         
-        # Procesăm doar dacă hash-ul diferă de cel din session_state
+        # Procesăm doar dacă fișierul diferă de cel deja încărcat
         if current_file_hash != st.session_state._loaded_file_hash:
+            progress_bar = st.sidebar.progress(0, text="📂 Se citește aventura...")
+            last_shown = [0]
+
+            def show_progress(done: int, total: Optional[int]):
+                percent = min(100, done * 100 // total) if total else 0
+                if percent - last_shown[0] >= 2:
+                    last_shown[0] = percent
+                    progress_bar.progress(percent, text=f"📂 Se citește aventura... {done / 1e6:.0f} MB")
+
             try:
-                data = json.load(uploaded)
-                if "character" in data and "inventory" in data:
-                    # Decode imagini din base64 înapoi în bytes
-                    story_with_images = []
-                    for msg in data.get("story", []):
-                        if msg.get("image") and isinstance(msg["image"], str):
-                            msg["image"] = base64.b64decode(msg["image"].encode('utf-8'))
-                        story_with_images.append(msg)
-                    
-                    st.session_state.game_state = GameState(
-                        character=CharacterStats(**data["character"]),
-                        inventory=[InventoryItem(**item) for item in data["inventory"]],
-                        story=story_with_images,
-                        turn=data.get("turn", 0),
-                        last_image_turn=data.get("last_image_turn", -10)
-                    )
-                    st.session_state.story = story_with_images
-                    st.session_state.session_id = data.get("session_id", str(uuid.uuid4())[:8])
+                # ⭕ Citire în flux cu limite (mărime, ture, imagini), validare pe măsură ce sosesc datele
+                uploaded.seek(0)
+                loaded_state, _ = load_save(uploaded, uploaded.size, progress=show_progress)
+                progress_bar.empty()
+                if loaded_state is not None:
+                    st.session_state.state_cell.reset(loaded_state)
+                    st.session_state.game_state = loaded_state
+                    st.session_state.story = st.session_state.game_state.story
+                    # ⭕ Mereu un ID nou: cel din fișier poate fi al altui jucător (sesiune + jurnal preluate)
+                    st.session_state.session_id = new_session_id()
+                    st.session_state.last_image_turn = st.session_state.game_state.last_image_turn
+                    st.query_params["sid"] = st.session_state.session_id
+                    st.session_state.journal = open_journal(st.session_state.session_id)
+                    persist_snapshot(st.session_state.journal, st.session_state.game_state)
                     # Salvăm hash-ul fișierului procesat
                     st.session_state._loaded_file_hash = current_file_hash
                     st.sidebar.success("✅ Aventură încărcată!")
                     # Reîncărcăm pentru a afișa noua stare
                     st.rerun()
+            except SaveFileError as e:
+                progress_bar.empty()
+                st.sidebar.error(f"❌ Eroare încărcare: {e}")
+                # Fișierul greșit nu se mai reîncearcă la fiecare rerun
+                st.session_state._loaded_file_hash = current_file_hash
             except Exception as e:
+                progress_bar.empty()
                 st.sidebar.error(f"❌ Eroare încărcare: {e}")
                 # Resetăm hash-ul în caz de eroare
                 st.session_state._loaded_file_hash = None
@@ -376,41 +443,54 @@ def render_sidebar(game_state: "GameState") -> int:
     st.sidebar.subheader("🧾 Export Aventură")
 
     # ✅ BUTON HTML (funcționează întotdeauna)
+    export_mode = st.sidebar.radio(
+        "Format export",
+        options=["inline", "zip"],
+        format_func=lambda m: "HTML (imagini incluse)" if m == "inline" else "ZIP (HTML + imagini)",
+        horizontal=True,
+        key="export_mode"
+    )
     if st.sidebar.button("📄 Generează & Descarcă HTML", use_container_width=True):
         with st.spinner("Se creează documentul..."):
-            html_content = generate_pdf_html(st.session_state.story)
-            
-            standalone_html = f"""<!DOCTYPE html>
-                                <html>
-                                <head>
-                                    <meta charset="UTF-8">
-                                    <style>
-                                        @import url('https://fonts.googleapis.com/css2?family=Cinzel:wght@400;600;700&family=Crimson+Text:ital,wght@0,400;0,600;1,400&display=swap');
-                                        body {{ font-family: 'Crimson Text', serif; background: #fdf6e3; padding: 40px; color: #4b3f2f; }}
-                                        h1 {{ font-family: 'Cinzel', serif; color: #6b4f4f; text-align: center; margin-bottom: 30px; }}
-                                        .message {{ margin-bottom: 20px; padding: 15px; border-left: 4px solid #5a3921; background: rgba(90, 57, 33, 0.05); page-break-inside: avoid; }}
-                                        .ai {{ border-left-color: #ff6b6b; }}
-                                        .user {{ border-left-color: #4e9af1; }}
-                                        img {{ max-width: 100%; margin: 20px auto; display: block; border-radius: 8px; border: 2px solid #5a3921; }}
-                                        .footer {{ text-align: center; margin-top: 40px; font-style: italic; color: #8b6b6b; }}
-                                        @media print {{ body {{ background: white; }} }}
-                                    </style>
-                                </head>
-                                <body>
-                                    <h1>⚔️ Aventura în Wallachia ⚔️</h1>
-                                    <p class="footer">Generat pe {time.strftime('%Y-%m-%d %H:%M')}</p>
-                                    <hr>
-                                    {html_content}
-                                </body>
-                                </html>"""
-            
+            # ⭕ Documentul se scrie în flux, în pool-ul de procese; fiecare imagine apare o singură dată
+            try:
+                content, ext, mime = run_job(export_story, st.session_state.story, export_mode)
+            except WorkerTimeoutError as e:
+                st.sidebar.error(f"❌ Export eșuat: {e}")
+            else:
+                st.sidebar.download_button(
+                    "📥 Descarcă HTML" if ext == "html" else "📥 Descarcă ZIP",
+                    data=content,
+                    file_name=f"aventura_wallachia_{int(time.time())}.{ext}",
+                    mime=mime,
+                    use_container_width=True
+                )
+
+    # 🖨️ PDF randat pe server, în fundal (cache după poveste + tură: click-urile repetate sunt gratuite)
+    if st.sidebar.button("🖨️ Generează PDF", use_container_width=True):
+        job = get_pdf_exporter().submit(st.session_state.story, game_state.turn)
+        st.session_state.pdf_job_key = job.key
+    pdf_key = st.session_state.get("pdf_job_key")
+    if pdf_key:
+        job = get_pdf_exporter().get(pdf_key)
+        if job is not None and job.state == "done":
+            # Citit de pe disc o singură dată per job, nu la fiecare rerun al sidebar-ului
+            cached = st.session_state.get("_pdf_file")
+            if cached is None or cached[0] != pdf_key:
+                with open(job.path, "rb") as f:
+                    cached = st.session_state._pdf_file = (pdf_key, f.read())
             st.sidebar.download_button(
-                "📥 Descarcă HTML",
-                data=standalone_html.encode('utf-8'),
-                file_name=f"aventura_wallachia_{int(time.time())}.html",
-                mime="text/html",
+                "📥 Descarcă PDF",
+                data=cached[1],
+                file_name=f"aventura_wallachia_{int(time.time())}.pdf",
+                mime="application/pdf",
                 use_container_width=True
             )
+        elif job is not None and job.state == "error":
+            st.sidebar.error(f"❌ PDF eșuat: {job.error}")
+        elif job is not None:
+            with st.sidebar:
+                _pdf_progress(pdf_key)
 
     # 💡 Instrucțiuni pentru PDF
     with st.sidebar.expander("💡 Cum faci PDF din HTML?"):
@@ -430,66 +510,18 @@ def render_sidebar(game_state: "GameState") -> int:
     return legend_scale  # ⭕ Returnează valoarea pentru slider
 
 
+@st.fragment(run_every=1.0)
+def _pdf_progress(key: str):
+    """Doar fragmentul ăsta se reîmprospătează cât se randează PDF-ul; la final, un rerun complet"""
+    job = get_pdf_exporter().get(key)
+    if job is None or job.done:
+        st.rerun(scope="app")
+    label = "Se pregătește documentul..." if job.state in ("queued", "html") else "Se randează PDF-ul..."
+    st.progress(job.progress if job.state != "render" else 0.7, text=f"🖨️ {label}")
+
+
 def generate_pdf_html(story: List[Dict]) -> str:
-    """Generate styled HTML for PDF export (includes images as base64)"""
-    html = f"""
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Cinzel:wght@400;600;700&family=Crimson+Text:ital,wght@0,400;0,600;1,400&display=swap');
-            body {{ 
-                font-family: 'Crimson Text', serif; 
-                background: #fdf6e3; 
-                padding: 40px;
-                color: #4b3f2f;
-            }}
-            h1 {{ 
-                font-family: 'Cinzel', serif; 
-                color: #6b4f4f; 
-                text-align: center;
-                margin-bottom: 30px;
-            }}
-            .message {{ 
-                margin-bottom: 20px; 
-                padding: 15px; 
-                border-left: 4px solid #5a3921;
-                background: rgba(90, 57, 33, 0.05);
-                page-break-inside: avoid;
-            }}
-            .ai {{ border-left-color: #ff6b6b; }}
-            .user {{ border-left-color: #4e9af1; }}
-            img {{ 
-                max-width: 500px; 
-                margin: 20px auto; 
-                display: block;
-                border-radius: 8px;
-                border: 2px solid #5a3921;
-            }}
-            .footer {{ 
-                text-align: center; 
-                margin-top: 40px; 
-                font-style: italic;
-                color: #8b6b6b;
-            }}
-        </style>
-    </head>
-    <body>
-        <h1>Aventura în Wallachia</h1>
-        <p class="footer">Generat pe {time.strftime('%Y-%m-%d %H:%M')}</p>
-    """
-    
-    for m in story:
-        role_class = "ai" if m["role"] == "ai" else "user"
-        html += f"""
-        <div class="message {role_class}">
-            <strong>{m['role'].capitalize()}:</strong><br/>
-            {m['text']}
-        </div>
-        """
-        if "image" in m and m["image"]:
-            b64 = base64.b64encode(m["image"]).decode()
-            html += f'<img src="data:image/png;base64,{b64}" />'
-    
-    html += "</body></html>"
-    return html
\ No newline at end of file
+    """Generate styled HTML for PDF export (includes images, each distinct one only once)"""
+    out = io.StringIO()
+    write_story_html(story, out, images="inline")
+    return out.getvalue()
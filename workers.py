@@ -0,0 +1,221 @@
+# workers.py - Pool de procese partajat pentru munca CPU din ture (PNG, base64, JSON, validare Pydantic)
+import base64
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+
+class WorkerTimeoutError(TimeoutError):
+    """Un job n-a terminat în timpul dat (mesajul ajunge la jucător)"""
+
+
+# ========== job-uri (funcții de modul = se pot trimite prin pickle) ==========
+def encode_png(img) -> bytes:
+    """PIL.Image → PNG (compresia zlib e partea scumpă)"""
+    from io import BytesIO
+
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def b64encode_many(blobs: List[bytes]) -> List[str]:
+    return [base64.b64encode(b).decode("ascii") for b in blobs]
+
+
+def encode_save_file(gs, session_id: str) -> bytes:
+    """GameState → fișierul JSON de salvare (imaginile în base64)"""
+    data = gs.to_save_dict()
+    data["session_id"] = session_id
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def decode_save_file(raw: bytes):
+    """Fișier de salvare → GameState validat; aceleași limite ca la încărcarea din UI (save_loader)"""
+    from save_loader import load_save
+
+    return load_save(io.BytesIO(raw), len(raw))
+
+
+def _hold(seconds: float) -> int:
+    """Ține workerul ocupat puțin: următorul submit din warm-up nu-l găsește liber și pornește altul"""
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _warm_worker():
+    """Rulează o dată în fiecare proces nou: importurile grele se plătesc la pornire, nu la primul job"""
+    import PIL.Image  # noqa: F401
+    import PIL.PngImagePlugin  # noqa: F401
+    import models  # noqa: F401
+    import image_handler  # noqa: F401  (imaginea de rezervă se desenează în worker)
+
+
+@contextmanager
+def _hidden_main():
+    """
+    Streamlit rulează app.py ca `__main__`; la spawn/forkserver, multiprocessing ar re-executa
+    scriptul în fiecare worker. Cât pornesc procesele, `__main__` e un modul gol.
+    Schimbă o variabilă globală a procesului: se folosește doar sub WorkerPool._lock, la pornirea pool-ului.
+    """
+    main = sys.modules.get("__main__")
+    if main is None or not getattr(main, "__file__", None):
+        yield
+        return
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _execute(fn: Callable, args: tuple, submitted_at: float):
+    started = time.time()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, started - submitted_at, time.perf_counter() - t0
+
+
+# ========== pool ==========
+class Job:
+    """Descriptorul unui job: funcție de modul + argumente (ambele trec prin pickle)"""
+    __slots__ = ("fn", "args", "name")
+
+    def __init__(self, fn: Callable, *args, name: Optional[str] = None):
+        self.fn = fn
+        self.args = args
+        self.name = name or fn.__name__
+
+
+def _empty_stats() -> Dict[str, float]:
+    return {"jobs": 0, "inline": 0, "timeouts": 0, "run_s": 0.0, "wait_s": 0.0, "max_run_s": 0.0}
+
+
+class WorkerPool:
+    """
+    ProcessPoolExecutor comun tuturor sesiunilor din proces. Cât timp un job rulează în worker,
+    firul scriptului Streamlit doar așteaptă (fără GIL), deci sesiunile ușoare nu mai stau
+    după codarea PNG/base64 a celor grele. Cu `processes=0` (sau dacă pool-ul cade) joburile
+    rulează inline, cu aceleași statistici.
+    """
+
+    def __init__(self, processes: int = Config.WORKER_PROCESSES,
+                 start_method: str = Config.WORKER_START_METHOD):
+        self.processes = max(0, processes)
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Pool-ul, pornit complet la prima cerere: toate procesele se creează aici, sub lock și cu
+        `__main__` ascuns pe toată durata; după aceea submit() nu mai pornește procese noi
+        (un worker căzut strică pool-ul, care se recreează tot pe aici).
+        """
+        if self.processes == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # forkserver/spawn: workerii nu moștenesc firele și starea Streamlit/torch ale procesului
+                methods = multiprocessing.get_all_start_methods()
+                method = self.start_method if self.start_method in methods else "spawn"
+                context = multiprocessing.get_context(method)
+                if method == "forkserver":
+                    # serverul importă o dată modulele grele; fiecare worker nou e un fork al lui
+                    context.set_forkserver_preload(["workers", "models", "image_handler"])
+                executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=context,
+                    initializer=_warm_worker,
+                )
+                # Un job care ține workerul ocupat per proces: fiecare submit găsește toți workerii
+                # existenți ocupați și pornește încă unul, până la `processes`
+                with _hidden_main():
+                    for _ in range(self.processes):
+                        executor.submit(_hold, 0.2)
+                self._executor = executor
+                print(f"⚙️ WORKER POOL: {self.processes} procese ({method})")
+            return self._executor
+
+    def warm_up(self):
+        """Pornește toate procesele acum (fără să aștepte importurile lor), nu la primul job al unui jucător"""
+        self._get_executor()
+
+    def run(self, job: Job, timeout: Optional[float] = Config.WORKER_JOB_TIMEOUT) -> Any:
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                future = executor.submit(_execute, job.fn, job.args, time.time())
+                result, waited, elapsed = future.result(timeout=timeout)
+                self._record(job.name, waited, elapsed, inline=False)
+                return result
+            except FutureTimeout:
+                # Nu-l rulăm și inline (ar dubla munca): dacă n-a pornit, îl scoatem din coadă
+                started = not future.cancel()
+                with self._stats_lock:
+                    self._stats.setdefault(job.name, _empty_stats())["timeouts"] += 1
+                print(f"⚠️ WORKER JOB TIMEOUT ({job.name}) după {timeout:g}s"
+                      f"{' - încă rulează în pool' if started else ' - anulat din coadă'}")
+                raise WorkerTimeoutError(f"Operația a durat peste {timeout:g}s; încearcă din nou") from None
+            except BrokenProcessPool as e:
+                print(f"⚠️ WORKER POOL BROKEN ({job.name}): {e} - repornim pool-ul, jobul rulează inline")
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+        t0 = time.perf_counter()
+        result = job.fn(*job.args)
+        self._record(job.name, 0.0, time.perf_counter() - t0, inline=True)
+        return result
+
+    def _record(self, name: str, waited: float, elapsed: float, inline: bool):
+        with self._stats_lock:
+            s = self._stats.setdefault(name, _empty_stats())
+            s["jobs"] += 1
+            s["inline"] += int(inline)
+            s["run_s"] += elapsed
+            s["wait_s"] += max(0.0, waited)
+            s["max_run_s"] = max(s["max_run_s"], elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per tip de job: număr, timp mediu de rulare, timp mediu în coadă, maxim"""
+        with self._stats_lock:
+            report = {}
+            for name, s in self._stats.items():
+                report[name] = dict(s)
+                report[name]["avg_run_ms"] = s["run_s"] / s["jobs"] * 1000 if s["jobs"] else 0.0
+                report[name]["avg_wait_ms"] = s["wait_s"] / s["jobs"] * 1000 if s["jobs"] else 0.0
+            return report
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+def get_worker_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+def run_job(fn: Callable, *args, timeout: Optional[float] = Config.WORKER_JOB_TIMEOUT) -> Any:
+    """Scurtătură: rulează `fn(*args)` în pool și întoarce rezultatul"""
+    return get_worker_pool().run(Job(fn, *args), timeout=timeout)